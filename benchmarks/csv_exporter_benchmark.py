@@ -0,0 +1,87 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+"""
+Times the conversion of large synthetic audits to CSV rows. The items of the synthetic audits mix all the item types
+of a real audit, so the rows per second cover the conversion of every item type.
+
+Usage: python benchmarks/csv_exporter_benchmark.py [item counts...]
+"""
+import copy
+import json
+import os
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'tools', 'exporter'))
+import csvExporter
+
+SOURCE_AUDIT = os.path.join(os.path.dirname(__file__), '..', 'tools', 'exporter', 'tests', 'csv_test_files',
+                            'unit_test_SafetyCulture_iAuditor___The_Smartest_Checklist_App_.json')
+
+DEFAULT_ITEM_COUNTS = [1000, 5000, 20000]
+
+# number of items of each synthetic section, which are nested this many sections deep
+ITEMS_PER_SECTION = 50
+SECTION_DEPTH = 5
+
+
+def synthetic_audit(item_count):
+    """
+    Build an audit with item_count items by repeating the items of a real audit under nested sections
+    :param item_count:  number of items of the audit
+    :return:            audit JSON
+    """
+    with open(SOURCE_AUDIT, 'r') as audit_file:
+        audit_json = json.load(audit_file)
+    source_items = [item for item in audit_json['items'] if item.get('type') not in ['section', 'category']]
+    items = []
+    parent_ids = []
+    while len(items) < item_count:
+        index = len(items)
+        if index % ITEMS_PER_SECTION == 0:
+            depth = (index // ITEMS_PER_SECTION) % SECTION_DEPTH
+            del parent_ids[depth:]
+            section = {'item_id': 'section_{0}'.format(index), 'label': 'Section {0}'.format(index),
+                       'type': 'section', 'children': []}
+            if parent_ids:
+                section['parent_id'] = parent_ids[-1]
+            parent_ids.append(section['item_id'])
+            items.append(section)
+            continue
+        item = copy.deepcopy(source_items[index % len(source_items)])
+        item['item_id'] = 'item_{0}'.format(index)
+        item['parent_id'] = parent_ids[-1]
+        items.append(item)
+    audit_json['items'] = items
+    return audit_json
+
+
+def time_conversion(audit_json, repeats=3):
+    """
+    :param audit_json:  audit JSON
+    :param repeats:     number of conversions to take the fastest of
+    :return:            fastest time in seconds to convert the audit to rows
+    """
+    best = None
+    for _ in range(repeats):
+        started = time.time()
+        rows = list(csvExporter.CsvExporter(audit_json, convert=False).iter_rows())
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    assert len(rows) == len(audit_json['header_items']) + len(audit_json['items'])
+    return best
+
+
+def main():
+    item_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ITEM_COUNTS
+    print('{0:>8} {1:>12} {2:>14}'.format('items', 'seconds', 'rows/second'))
+    for item_count in item_counts:
+        audit_json = synthetic_audit(item_count)
+        seconds = time_conversion(audit_json)
+        row_count = len(audit_json['header_items']) + len(audit_json['items'])
+        print('{0:>8} {1:>12.3f} {2:>14.0f}'.format(item_count, seconds, row_count / seconds))
+
+
+if __name__ == '__main__':
+    main()
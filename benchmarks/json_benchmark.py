@@ -0,0 +1,81 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+"""
+Times the decoding and encoding of large synthetic audits with each installed JSON backend, and measures the peak
+memory allocated while decoding. The ordered backend decodes as the SDK did before plain dictionaries were the default.
+
+Usage: python benchmarks/json_benchmark.py [item counts...]
+"""
+import gc
+import os
+import sys
+import time
+
+try:
+    import tracemalloc
+except ImportError:
+    tracemalloc = None
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+import safetypy as sp
+from csv_exporter_benchmark import synthetic_audit
+
+DEFAULT_ITEM_COUNTS = [1000, 5000, 20000]
+
+
+def best_time(function, repeats=3):
+    """
+    :param function:  function to time
+    :param repeats:   number of calls to take the fastest of
+    :return:          fastest time in seconds to call the function
+    """
+    best = None
+    for _ in range(repeats):
+        started = time.time()
+        function()
+        elapsed = time.time() - started
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def peak_memory(function):
+    """
+    :param function:  function to call
+    :return:          peak number of bytes allocated by Python while calling the function, None without tracemalloc
+    """
+    if tracemalloc is None:
+        return None
+    gc.collect()
+    tracemalloc.start()
+    try:
+        result = function()
+        peak = tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+    del result
+    return peak
+
+
+def main():
+    item_counts = [int(arg) for arg in sys.argv[1:]] or DEFAULT_ITEM_COUNTS
+    print('{0:>8} {1:>10} {2:>10} {3:>12} {4:>12} {5:>14}'.format('items', 'backend', 'MB', 'decode s', 'encode s',
+                                                                  'decode peak MB'))
+    for item_count in item_counts:
+        content = sp.JsonCodec('json').encode(synthetic_audit(item_count))
+        for backend in sp.JSON_BACKENDS:
+            try:
+                json_codec = sp.JsonCodec(backend)
+            except ImportError:
+                continue
+            audit_json = json_codec.decode(content)
+            decode_seconds = best_time(lambda: json_codec.decode(content))
+            encode_seconds = best_time(lambda: json_codec.encode(audit_json, indent=True))
+            peak = peak_memory(lambda: json_codec.decode(content))
+            print('{0:>8} {1:>10} {2:>10.1f} {3:>12.3f} {4:>12.3f} {5:>14}'.format(
+                item_count, backend, len(content) / 1048576.0, decode_seconds, encode_seconds,
+                'n/a' if peak is None else '{0:.1f}'.format(peak / 1048576.0)))
+
+
+if __name__ == '__main__':
+    main()
@@ -1 +1,4 @@
-from .safetypy import *
\ No newline at end of file
+from .safetypy import *
+import sys
+if sys.version_info >= (3, 5):
+    from .async_safetypy import AsyncSafetyCulture
@@ -0,0 +1,502 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+
+import asyncio
+import collections
+import json
+import logging
+import requests
+from .safetypy import SafetyCultureBase, RetryPolicy, ExportPoll, ExportDownload, DEFAULT_EXPORT_FORMAT, \
+    DEFAULT_MAX_EXPORTS_IN_FLIGHT, DEFAULT_ACTIONS_PAGE_LENGTH, EXPORT_FAILED, JSON_CONTENT_TYPE_HEADER
+
+try:
+    import aiohttp
+except ImportError:
+    aiohttp = None
+
+# Maximum number of simultaneous connections, in total and to a single host
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 0
+
+# Exceptions retried by the default retry policy, and those raised when a connection could not be made
+ASYNC_RETRY_EXCEPTIONS = (aiohttp.ClientConnectionError, aiohttp.ServerTimeoutError,
+                          asyncio.TimeoutError) if aiohttp is not None else ()
+ASYNC_CONNECTION_EXCEPTIONS = (aiohttp.ClientConnectorError,) if aiohttp is not None else ()
+
+# Fully read response: http status code, raw body and response headers
+AsyncResponse = collections.namedtuple('AsyncResponse', ['status_code', 'content', 'headers'])
+
+
+class AsyncSafetyCulture(SafetyCultureBase):
+    """
+    asyncio client for the iAuditor API, mirroring the methods of SafetyCulture as coroutines
+
+    URL building, validation and response parsing are inherited from SafetyCultureBase, so both clients send the
+    same requests and return the same results. Responses are read completely before being returned, so methods that
+    return a response in SafetyCulture return an AsyncResponse here. Requires aiohttp.
+    """
+
+    def __init__(self, api_token, max_connections=DEFAULT_MAX_CONNECTIONS,
+                 max_connections_per_host=DEFAULT_MAX_CONNECTIONS_PER_HOST, keep_alive=True, rate_limiter=None,
+                 retry_policy=None, poll_policy=None, audit_cache=None, json_codec=None):
+        """
+        :param api_token:                 iAuditor API token
+        :param max_connections:           maximum number of simultaneous connections, 0 for no limit
+        :param max_connections_per_host:  maximum number of simultaneous connections to one host, 0 for no limit
+        :param keep_alive:                if False, every connection is closed after its request completes
+        :param rate_limiter:              RateLimiter applied to every request, defaults to a RateLimiter with
+                                          default settings. May be shared with a SafetyCulture instance.
+        :param retry_policy:              RetryPolicy applied to every request, defaults to a RetryPolicy retrying
+                                          aiohttp connection errors and timeouts
+        :param poll_policy:               PollPolicy applied to every export, defaults to a PollPolicy with default
+                                          settings
+        :param audit_cache:               AuditCache get_audit reads from and saves to, if any. Lookups block the
+                                          event loop briefly.
+        :param json_codec:                JsonCodec responses are decoded with, defaults to a JsonCodec with the
+                                          default backend
+        """
+        if aiohttp is None:
+            raise ImportError('AsyncSafetyCulture requires aiohttp, install it with: pip install aiohttp')
+        if retry_policy is None:
+            retry_policy = RetryPolicy(retry_exceptions=ASYNC_RETRY_EXCEPTIONS,
+                                       connection_exceptions=ASYNC_CONNECTION_EXCEPTIONS)
+        SafetyCultureBase.__init__(self, api_token, keep_alive, rate_limiter, retry_policy, poll_policy, audit_cache,
+                                   json_codec)
+        self.max_connections = max_connections
+        self.max_connections_per_host = max_connections_per_host
+        self.keep_alive = keep_alive
+        self.session = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_value, traceback):
+        await self.close()
+
+    async def close(self):
+        """
+        Close all connections held by this client
+        """
+        if self.session is not None:
+            await self.session.close()
+            self.session = None
+
+    def get_session(self):
+        """
+        :return:  the aiohttp session, created on first use so that it is bound to the running event loop
+        """
+        if self.session is None:
+            connector = aiohttp.TCPConnector(limit=self.max_connections, limit_per_host=self.max_connections_per_host,
+                                             force_close=not self.keep_alive)
+            self.session = aiohttp.ClientSession(connector=connector)
+        return self.session
+
+    async def wait_for_rate_limiter(self):
+        """
+        Wait without blocking the event loop until the rate limiter allows a request
+        """
+        delay = self.rate_limiter.reserve()
+        if delay > 0:
+            self.rate_limiter.wait_started()
+            try:
+                await asyncio.sleep(delay)
+            finally:
+                self.rate_limiter.wait_finished()
+
+    async def authenticated_request(self, method, url, data=None, extra_headers=None, retry_policy=None,
+                                    idempotent=None):
+        """
+        Send a request once the rate limiter allows it, sending it again while it is throttled or while it fails in
+        a way the retry policy allows to retry, and read the complete response
+        :param method:         http method
+        :param url:            URL to request
+        :param data:           request body
+        :param extra_headers:  headers to add to the base header set for this request only
+        :param retry_policy:   RetryPolicy overriding the client's policy for this request
+        :param idempotent:     whether sending the request twice is safe, defaults to deciding by method
+        :return:               AsyncResponse
+        """
+        attempt = 1
+        throttle_retries = 0
+        while True:
+            await self.wait_for_rate_limiter()
+            try:
+                async with self.get_session().request(method, url, data=data,
+                                                      headers=self.request_headers(extra_headers)) as response:
+                    content = await response.read()
+                    result = AsyncResponse(response.status, content, response.headers)
+            except Exception as ex:
+                delay = self.retry_delay(retry_policy, method, url, attempt, idempotent, exception=ex)
+                if delay is None:
+                    raise
+                await asyncio.sleep(delay)
+                attempt += 1
+                continue
+            if self.should_retry_throttled(result.status_code, result.headers.get('Retry-After'), throttle_retries):
+                throttle_retries += 1
+                continue
+            delay = self.retry_delay(retry_policy, method, url, attempt, idempotent, status_code=result.status_code)
+            if delay is None:
+                return result
+            await asyncio.sleep(delay)
+            attempt += 1
+
+    async def authenticated_request_get(self, url, retry_policy=None):
+        return await self.authenticated_request('GET', url, retry_policy=retry_policy)
+
+    async def authenticated_request_post(self, url, data, retry_policy=None, idempotent=None):
+        return await self.authenticated_request('POST', url, data, JSON_CONTENT_TYPE_HEADER, retry_policy,
+                                                idempotent)
+
+    async def authenticated_request_put(self, url, data, retry_policy=None):
+        return await self.authenticated_request('PUT', url, data, JSON_CONTENT_TYPE_HEADER, retry_policy)
+
+    async def authenticated_request_delete(self, url, retry_policy=None):
+        return await self.authenticated_request('DELETE', url, retry_policy=retry_policy)
+
+    async def discover_audits(self, template_id=None, modified_after=None, completed=True):
+        """
+        Return IDs of all completed audits if no parameters are passed, otherwise restrict search
+        based on parameter values
+        :param template_id:     Restrict discovery to this template_id
+        :param modified_after:  Restrict discovery to audits modified after this UTC timestamp
+        :param completed:       Restrict discovery to audits marked as completed, default to True
+        :return:                JSON object containing IDs of all audits returned by API
+        """
+        search_url = self.build_audit_search_url(template_id, modified_after, completed)
+        response = await self.authenticated_request_get(search_url)
+        return self.parse_audit_search_response(response.status_code, response.content, search_url)
+
+    async def discover_templates(self, modified_after=None, modified_before=None):
+        """
+        Query API for all template IDs if no parameters are passed, otherwise restrict search based on parameters
+
+        :param modified_after:   Restrict discovery to templates modified after this UTC timestamp
+        :param modified_before:  Restrict discovery to templates modified before this UTC timestamp
+        :return:                 JSON object containing IDs of all templates returned by API
+        """
+        search_url = self.build_template_search_url(modified_after, modified_before)
+        response = await self.authenticated_request_get(search_url)
+        return self.parse_response(response.status_code, response.content, 'on template discovery using ' + search_url)
+
+    async def get_preference_ids(self, template_id=None):
+        """
+        Query API for all preference IDs if no parameters are passed, else restrict to template_id passed
+        :param template_id: template_id to obtain export preferences for
+        :return:            JSON object containing list of preference objects
+        """
+        response = await self.authenticated_request_get(self.build_preference_search_url(template_id))
+        return self.parse_json(response.content) if response.status_code == requests.codes.ok else None
+
+    async def get_export_job_id(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
+        """
+        Request export job ID from API and return it
+
+        :param audit_id:           audit_id to retrieve export_job_id for
+        :param preference_id:      preference to apply to exports
+        :param export_format:      desired format of exported document
+        :return:                   export job ID obtained from API
+        """
+        export_url, export_data = self.build_export_request(audit_id, preference_id, export_format)
+        response = await self.authenticated_request_post(export_url, export_data)
+        return self.parse_response(response.status_code, response.content, 'on request to ' + export_url)
+
+    async def wait_for_export(self, audit_id, export_job_id, preference_id=None,
+                              export_format=DEFAULT_EXPORT_FORMAT, poll_policy=None):
+        """
+        Poll API for given export job until it succeeds, fails too many times or the poll deadline passes
+        :param audit_id:       audit_id of the export to poll for
+        :param export_job_id:  export_job_id of the export to poll for
+        :param preference_id:  preference applied to the export, used if the export job has to be requested again
+        :param export_format:  format of the export, used to request the export job again and to record its latency
+        :param poll_policy:    PollPolicy overriding the client's policy for this export
+        :return:               ExportPollResult
+        """
+        export_poll = self.start_export_poll(audit_id, poll_policy)
+        while True:
+            step, export_job_id = await self.poll_export_job(export_poll, export_job_id, preference_id, export_format)
+            if step == ExportPoll.DONE:
+                return self.finish_export_poll(export_poll, export_format)
+            if step == ExportPoll.WAIT:
+                await asyncio.sleep(export_poll.delay)
+
+    async def poll_export_job(self, export_poll, export_job_id, preference_id=None,
+                              export_format=DEFAULT_EXPORT_FORMAT):
+        """
+        Poll an export job once, and request a new export job if the poll says to
+        :param export_poll:    ExportPoll tracking the wait for the export
+        :param export_job_id:  export_job_id of the export to poll for
+        :param preference_id:  preference applied to the export, used if the export job has to be requested again
+        :param export_format:  format of the export, used if the export job has to be requested again
+        :return:               tuple of the next step given by export_poll and the export_job_id to poll next
+        """
+        poll_url = self.build_export_poll_url(export_poll.audit_id, export_job_id)
+        if poll_url is None:
+            return export_poll.finish(EXPORT_FAILED), export_job_id
+        response = await self.authenticated_request_get(poll_url)
+        status = self.parse_response(response.status_code, response.content, 'on GET for ' + poll_url)
+        step = export_poll.next_step(status)
+        if step == ExportPoll.RESUBMIT:
+            export_job = await self.get_export_job_id(export_poll.audit_id, preference_id, export_format)
+            export_job_id = export_job.get('messageId') if export_job is not None else None
+        return step, export_job_id
+
+    async def poll_for_export(self, audit_id, export_job_id, poll_policy=None):
+        """
+        Poll API for given export job until job is complete or excessive failed attempts occur
+        :param audit_id:       audit_id of the export to poll for
+        :param export_job_id:  export_job_id of the export to poll for
+        :param poll_policy:    PollPolicy overriding the client's policy for this export
+        :return:               href for export download, None if the export failed or timed out
+        """
+        return (await self.wait_for_export(audit_id, export_job_id, poll_policy=poll_policy)).url
+
+    async def download_export(self, export_href, retry_policy=None):
+        """
+
+        :param export_href:   href for export document to download
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :return:              String representation of exported document
+        """
+        try:
+            response = await self.authenticated_request_get(export_href, retry_policy)
+            result = response.content if response.status_code == requests.codes.ok else None
+            self.log_http_status(response.status_code, 'on GET for href: ' + export_href)
+            return result
+
+        except Exception as ex:
+            self.log_critical_error(ex, 'Exception occurred while attempting download_export({0})'.format(export_href))
+
+    async def get_export(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
+        """
+        Obtain exported document from API and return string representation of it
+
+        :param audit_id:           audit_id of export to obtain
+        :param preference_id:      ID of preference to apply to exports
+        :param export_format:      desired format of exported document
+        :return:                   String representation of exported document
+        """
+        export_job = await self.get_export_job_id(audit_id, preference_id, export_format)
+        if export_job is None:
+            return None
+        result = await self.wait_for_export(audit_id, export_job['messageId'], preference_id, export_format)
+        if result.url is None:
+            return None
+        return await self.download_export(result.url)
+
+    def export_audits(self, export_requests, max_in_flight=DEFAULT_MAX_EXPORTS_IN_FLIGHT, poll_policy=None):
+        """
+        Export many audits at once, up to max_in_flight at a time, each polled on its own PollPolicy schedule
+        :param export_requests:  iterable of ExportRequest
+        :param max_in_flight:    maximum number of exports requested, polled or downloading at once
+        :param poll_policy:      PollPolicy overriding the client's policy for these exports
+        :return:                 iterator of awaitables in order of completion, each returning an ExportDownload whose
+                                 content is None if the export failed or timed out
+        """
+        semaphore = asyncio.Semaphore(max_in_flight)
+
+        async def export(request):
+            async with semaphore:
+                export_job = await self.get_export_job_id(request.audit_id, request.preference_id,
+                                                          request.export_format)
+                if export_job is None:
+                    export_poll = self.start_export_poll(request.audit_id, poll_policy)
+                    export_poll.finish(EXPORT_FAILED)
+                    return ExportDownload(request, self.finish_export_poll(export_poll, request.export_format), None,
+                                          None)
+                result = await self.wait_for_export(request.audit_id, export_job.get('messageId'),
+                                                    request.preference_id, request.export_format, poll_policy)
+                content = await self.download_export(result.url) if result.url is not None else None
+                return ExportDownload(request, result, content, None)
+
+        return asyncio.as_completed([export(request) for request in export_requests])
+
+    async def get_media(self, audit_id, media_id, retry_policy=None):
+        """
+        Get media item associated with a specified audit and media ID
+        :param audit_id:      audit ID of document that contains media
+        :param media_id:      media ID of image to fetch
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :return:              AsyncResponse whose Content-Type header is the MIME type associated with the media,
+                              and whose content is the media itself.
+        """
+        response = await self.authenticated_request_get(self.build_media_url(audit_id, media_id), retry_policy)
+        if response.status_code == requests.codes.ok:
+            return response
+        else:
+            self.log_http_status(response.status_code, "on GET for media {0}".format(response.content))
+            return None
+
+    async def get_web_report(self, audit_id):
+        """
+        Generate Web Report link associated with a specified audit
+        :param audit_id:   Audit ID
+        :return:           Web Report link
+        """
+        response = await self.authenticated_request_get(self.build_web_report_url(audit_id))
+        result = self.parse_response(response.status_code, response.content, 'on GET web report for ' + audit_id)
+        return result.get('url') if result else None
+
+    async def get_audit_actions(self, date_modified, offset=0, page_length=DEFAULT_ACTIONS_PAGE_LENGTH):
+        """
+        Get all actions created after a specified date, paging until all actions have been collected
+
+        :param date_modified:   ISO formatted date/time string. Only actions created after this date are are returned.
+        :param offset:          The index to start retrieving actions from
+        :param page_length:     How many actions to fetch for each page of action results
+        :return:                Array of action objects
+        """
+        logger = logging.getLogger('sp_logger')
+        actions = []
+        while True:
+            actions_url, actions_data = self.build_actions_search_request(date_modified, offset, page_length)
+            # the actions search only reads data, so it is safe to retry
+            response = await self.authenticated_request_post(actions_url, actions_data, idempotent=True)
+            page = self.parse_response(response.status_code, response.content, 'GET actions')
+            if not self.is_valid_actions_page(page):
+                return None
+            actions.extend(page['actions'])
+            offset = page['offset'] + page['count']
+            if page['count'] == 0 or offset >= page['total']:
+                return actions
+            logger.info('Paging Actions. Offset: ' + str(offset) + '. Total: ' + str(page['total']))
+
+    async def get_audit(self, audit_id, retry_policy=None, modified_at=None):
+        """
+        Request JSON representation of a single specified audit and return it
+
+        :param audit_id:      audit_id of document to fetch
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :param modified_at:   modified_at of the audit, as returned by an audit search. If given, the audit is read from
+                              the audit cache when that version of it is cached.
+        :return:              JSON audit object
+        """
+        audit_json = self.cached_audit(audit_id, modified_at)
+        if audit_json is not None:
+            return audit_json
+        response = await self.authenticated_request_get(self.audit_url + audit_id, retry_policy)
+        audit_json = self.parse_response(response.status_code, response.content, 'on GET for ' + audit_id)
+        self.cache_audit(audit_json)
+        return audit_json
+
+    async def create_response_set(self, name, responses):
+        """
+        Create new response_set
+        :param name:       Name of response_set to create
+        :param responses:  responses of response_set to create
+        """
+        payload = json.dumps({'name': name, 'responses': responses})
+        response = await self.authenticated_request_post(self.response_set_url, payload)
+        self.log_http_status(response.status_code, 'on POST for new response_set: {0}'.format(name))
+
+    async def get_response_sets(self):
+        """
+        GET and return all response_sets
+        :return: response_sets accessible to user
+        """
+        response = await self.authenticated_request_get(self.response_set_url)
+        return self.parse_response(response.status_code, response.content, 'on GET for response_sets')
+
+    async def get_response_set(self, responseset_id):
+        """
+        GET individual response_set by id
+        :param responseset_id:  responseset_id of response_set to GET
+        :return: response_set
+        """
+        response = await self.authenticated_request_get('{0}/{1}'.format(self.response_set_url, responseset_id))
+        return self.parse_response(response.status_code, response.content, 'on GET for {0}'.format(responseset_id))
+
+    async def create_response(self, responseset_id, response):
+        """
+        Create response in existing response_set
+        :param responseset_id: id of response_set to add response to
+        :param response:       response to add
+        """
+        url = '{0}/{1}/responses'.format(self.response_set_url, responseset_id)
+        response = await self.authenticated_request_post(url, json.dumps(response))
+        self.log_http_status(response.status_code, 'on POST for new response to: {0}'.format(responseset_id))
+
+    async def delete_response(self, responseset_id, response_id):
+        """
+        DELETE individual response by id
+        :param responseset_id: responseset_id of response_set containing response to be deleted
+        :param response_id:    id of response to be deleted
+        """
+        url = '{0}/{1}/responses/{2}'.format(self.response_set_url, responseset_id, response_id)
+        response = await self.authenticated_request_delete(url)
+        self.log_http_status(response.status_code, 'on DELETE for response_set: {0}'.format(responseset_id))
+
+    async def get_my_org(self):
+        """
+        GET the organisation ID of the requesting user
+        :return: The organisation ID of the user
+        """
+        response = await self.authenticated_request_get(self.get_my_groups_url)
+        self.log_http_status(response.status_code, 'on GET for organisations and groups of requesting user')
+        return self.parse_org_id(json.loads(response.content.decode('utf-8')))
+
+    async def get_all_groups_in_org(self):
+        """
+        GET all the groups in the requesting user's organisation
+        :return: all the groups of the organisation
+        """
+        response = await self.authenticated_request_get(self.all_groups_url)
+        self.log_http_status(response.status_code, 'on GET for all groups of organisation')
+        return response if response.status_code == requests.codes.ok else None
+
+    async def get_users_of_group(self, group_id):
+        """
+        GET all the users of the organisations or group
+        :param group_id: ID of organisation or group
+        :return: array of users
+        """
+        response = await self.authenticated_request_get('{0}/{1}/users'.format(self.all_groups_url, group_id))
+        self.log_http_status(response.status_code, 'on GET for users of group: {0}'.format(group_id))
+        return response.content if response.status_code == requests.codes.ok else None
+
+    async def add_user_to_org(self, user_data):
+        """
+        POST adds a user to organisation
+        :param user_data: data of the user to be added
+        :return: userID of the user created in the organisation
+        """
+        response = await self.authenticated_request_post(self.add_users_url, json.dumps(user_data))
+        self.log_http_status(response.status_code, 'on POST for adding a user to organisation')
+        return response.content if response.status_code == requests.codes.ok else None
+
+    async def add_user_to_group(self, group_id, user_data):
+        """
+        POST adds a user to a group
+        :param group_id:  ID of the group
+        :param user_data: contains user ID of user to be added
+        :return: userID of the user added to the group
+        """
+        url = '{0}/{1}/users'.format(self.all_groups_url, group_id)
+        response = await self.authenticated_request_post(url, json.dumps(user_data))
+        self.log_http_status(response.status_code, 'on POST for adding a user to group')
+        return response.content if response.status_code == requests.codes.ok else None
+
+    async def update_user(self, user_id, user_data):
+        """
+        PUT updates user details such as user status(active/inactive)
+        :param user_id:   The ID of the user to update
+        :param user_data: user details to update
+        :return: response if the update succeeded, else None
+        """
+        url = '{0}/{1}'.format(self.add_users_url, user_id)
+        response = await self.authenticated_request_put(url, json.dumps(user_data))
+        self.log_http_status(response.status_code, 'on PUT for updating a user')
+        return response if response.status_code == requests.codes.ok else None
+
+    async def remove_user(self, role_id, user_id):
+        """
+        Removes a user from an group/organisation
+        :param role_id: The ID of the group or organisation
+        :param user_id: The ID of the user to remove
+        :return: response if the user was removed, else None
+        """
+        url = '{0}/{1}/users/{2}'.format(self.all_groups_url, role_id, user_id)
+        response = await self.authenticated_request_delete(url)
+        self.log_http_status(response.status_code, 'on DELETE for user from group')
+        return response if response.status_code == requests.codes.ok else None
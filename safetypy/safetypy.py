@@ -7,18 +7,103 @@ import collections
 import json
 import logging
 import os
+import random
 import re
+import sqlite3
 import sys
+import threading
 import time
+import zlib
 import errno
+import hashlib
+import tempfile
 from builtins import input
+from concurrent import futures
 from datetime import datetime
+from email.utils import parsedate_tz, mktime_tz
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 from getpass import getpass
 
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+try:
+    import ujson
+except ImportError:
+    ujson = None
+
 DEFAULT_EXPORT_FORMAT = 'PDF'
 GUID_PATTERN = '[A-Fa-f0-9]{8}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{4}-[A-Fa-f0-9]{12}$'
 HTTP_USER_AGENT_ID = 'safetyculture-python-sdk'
+JSON_CONTENT_TYPE_HEADER = {'content-type': 'application/json'}
+
+# Number of per-host connection pools to cache, and the maximum number of connections kept alive per host
+DEFAULT_POOL_CONNECTIONS = 10
+DEFAULT_POOL_MAXSIZE = 10
+
+# Client-side rate limit in requests per second: starting rate, bounds for adaptation, and burst size
+DEFAULT_RATE_LIMIT = 10.0
+DEFAULT_MIN_RATE_LIMIT = 0.5
+DEFAULT_MAX_RATE_LIMIT = 50.0
+DEFAULT_RATE_LIMIT_BURST = 10
+
+# Responses telling the client to slow down, and how many times a throttled request is re-sent
+THROTTLE_STATUS_CODES = (429, 503)
+DEFAULT_MAX_THROTTLE_RETRIES = 5
+
+# Retry policy defaults: attempts per call, exponential backoff base and cap in seconds, and what to retry
+DEFAULT_MAX_ATTEMPTS = 3
+DEFAULT_BACKOFF_BASE = 0.5
+DEFAULT_BACKOFF_CAP = 30.0
+DEFAULT_RETRY_STATUS_CODES = (500, 502, 504)
+DEFAULT_RETRY_EXCEPTIONS = (requests.exceptions.ConnectionError, requests.exceptions.Timeout)
+DEFAULT_CONNECTION_EXCEPTIONS = (requests.exceptions.ConnectionError,)
+IDEMPOTENT_HTTP_METHODS = ('GET', 'HEAD', 'OPTIONS', 'PUT', 'DELETE')
+
+# Export polling defaults: first wait and its growth in seconds, and the total time to wait for one export
+DEFAULT_POLL_INITIAL_DELAY = 0.5
+DEFAULT_POLL_GROWTH_FACTOR = 1.5
+DEFAULT_POLL_MAX_DELAY = 10.0
+DEFAULT_POLL_DEADLINE = 600.0
+DEFAULT_MAX_EXPORT_ATTEMPTS = 2
+
+# Number of exports requested, polled or downloading at once by SafetyCulture.export_audits
+DEFAULT_MAX_EXPORTS_IN_FLIGHT = 10
+
+# Number of audits requested per page of audit search results, the most the API returns at once
+DEFAULT_AUDIT_PAGE_SIZE = 1000
+
+# Number of actions requested per page of action search results
+DEFAULT_ACTIONS_PAGE_LENGTH = 100
+
+# Number of bytes read from the network and written to disk at a time when streaming a download to a file
+DEFAULT_DOWNLOAD_CHUNK_SIZE = 64 * 1024
+
+# Number of media items downloaded at once by a MediaDownloader, in total and from any one audit
+DEFAULT_MEDIA_DOWNLOADS_IN_FLIGHT = 16
+DEFAULT_MEDIA_DOWNLOADS_PER_AUDIT = 4
+
+# Size the compressed audits of an AuditCache are kept under
+DEFAULT_AUDIT_CACHE_MAX_BYTES = 512 * 1024 * 1024
+
+# JSON libraries a JsonCodec can decode and encode with, fastest first. ordered is the json module decoding objects
+# to OrderedDicts, which keep the order of their keys on Python versions before 3.7.
+JSON_BACKENDS = ['orjson', 'ujson', 'json', 'ordered']
+
+# auto picks the fastest installed JSON library, orjson and ujson being optional
+DEFAULT_JSON_BACKEND = 'auto'
+
+# Outcomes of waiting for an export job
+EXPORT_SUCCESS = 'SUCCESS'
+EXPORT_FAILED = 'FAILED'
+EXPORT_TIMEOUT = 'TIMEOUT'
+
+monotonic = getattr(time, 'monotonic', time.time)
+replace_file = getattr(os, 'replace', os.rename)
 
 def get_user_api_token(logger):
     """
@@ -44,8 +129,802 @@ def get_user_api_token(logger):
         return None
 
 
-class SafetyCulture:
-    def __init__(self, api_token):
+class ConnectionPoolStats(object):
+    """
+    Thread-safe counters of connection pool usage. A hit is a request served by a kept-alive connection taken
+    from the pool, a miss is a request that had to open a new TCP (and TLS) connection.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record_checkout(self, reused):
+        """
+        :param reused:  True if the connection checked out of the pool is already connected
+        """
+        with self._lock:
+            if reused:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the number of hits, misses and total connection checkouts
+        """
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'checkouts': self.hits + self.misses}
+
+
+def counting_pool_class(pool_class, pool_stats):
+    """
+    Derive a urllib3 connection pool class that records whether each connection checkout reuses an open socket
+    :param pool_class:  urllib3 HTTPConnectionPool or HTTPSConnectionPool
+    :param pool_stats:  ConnectionPoolStats instance to record to
+    :return:            connection pool class
+    """
+    class CountingConnectionPool(pool_class):
+        def _get_conn(self, timeout=None):
+            conn = pool_class._get_conn(self, timeout=timeout)
+            pool_stats.record_checkout(getattr(conn, 'sock', None) is not None)
+            return conn
+
+    return CountingConnectionPool
+
+
+class PooledHTTPAdapter(HTTPAdapter):
+    """
+    requests transport adapter keeping connections alive in per-host pools and recording pool hits and misses
+    """
+
+    def __init__(self, *args, **kwargs):
+        self.pool_stats = ConnectionPoolStats()
+        super(PooledHTTPAdapter, self).__init__(*args, **kwargs)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super(PooledHTTPAdapter, self).init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            'http': counting_pool_class(HTTPConnectionPool, self.pool_stats),
+            'https': counting_pool_class(HTTPSConnectionPool, self.pool_stats)
+        }
+
+
+def parse_retry_after(retry_after, now=None):
+    """
+    Parse the value of a Retry-After header
+    :param retry_after:  header value, either a number of seconds or an HTTP date
+    :param now:          current UNIX time, defaults to time.time()
+    :return:             number of seconds to wait, None if the header is missing or malformed
+    """
+    if not retry_after:
+        return None
+    try:
+        return max(0.0, float(retry_after))
+    except ValueError:
+        parsed_date = parsedate_tz(retry_after)
+        if parsed_date is None:
+            return None
+        return max(0.0, mktime_tz(parsed_date) - (now if now is not None else time.time()))
+
+
+class RateLimiter(object):
+    """
+    Thread-safe token bucket limiting the rate of API requests
+
+    The rate adapts to the API: every throttled response (429 or 503) multiplies the rate by decrease_factor, at most
+    once per rate_decrease_interval seconds so that a burst of throttled responses to requests already in flight
+    counts once, and every other response increases the rate by increase_step, up to max_rate. A Retry-After header
+    on a throttled response holds back all requests until the time it gives.
+    """
+
+    def __init__(self, rate=DEFAULT_RATE_LIMIT, min_rate=DEFAULT_MIN_RATE_LIMIT, max_rate=DEFAULT_MAX_RATE_LIMIT,
+                 burst=DEFAULT_RATE_LIMIT_BURST, decrease_factor=0.5, increase_step=0.1, rate_decrease_interval=1.0,
+                 max_throttle_retries=DEFAULT_MAX_THROTTLE_RETRIES, clock=monotonic):
+        """
+        :param rate:                    initial number of requests per second
+        :param min_rate:                lowest rate the limiter backs off to
+        :param max_rate:                highest rate the limiter ramps up to
+        :param burst:                   number of requests that can be sent at once after a quiet period
+        :param decrease_factor:         factor applied to the rate on a throttled response
+        :param increase_step:           requests per second added to the rate on every other response
+        :param rate_decrease_interval:  minimum number of seconds between two rate decreases
+        :param max_throttle_retries:    number of times a throttled request is sent again before giving up
+        :param clock:                   function returning the current time in seconds
+        """
+        self.rate = float(rate)
+        self.min_rate = float(min_rate)
+        self.max_rate = float(max_rate)
+        self.burst = float(burst)
+        self.decrease_factor = decrease_factor
+        self.increase_step = increase_step
+        self.rate_decrease_interval = rate_decrease_interval
+        self.max_throttle_retries = max_throttle_retries
+        self.clock = clock
+        self._lock = threading.Lock()
+        self.tokens = self.burst
+        self.last_refill = clock()
+        self.blocked_until = 0.0
+        self.last_decrease = None
+        self.queued = 0
+        self.requests = 0
+        self.throttle_events = 0
+
+    def reserve(self):
+        """
+        Take a token for one request
+        :return:  number of seconds to wait before sending the request
+        """
+        with self._lock:
+            now = self.clock()
+            self.tokens = min(self.burst, self.tokens + (now - self.last_refill) * self.rate)
+            self.last_refill = now
+            self.tokens -= 1
+            self.requests += 1
+            return max(0.0, -self.tokens / self.rate, self.blocked_until - now)
+
+    def acquire(self, sleep=time.sleep):
+        """
+        Block until a request may be sent
+        :param sleep:  function used to wait
+        """
+        delay = self.reserve()
+        if delay > 0:
+            self.wait_started()
+            try:
+                sleep(delay)
+            finally:
+                self.wait_finished()
+
+    def wait_started(self):
+        with self._lock:
+            self.queued += 1
+
+    def wait_finished(self):
+        with self._lock:
+            self.queued -= 1
+
+    def record_response(self, status_code, retry_after=None):
+        """
+        Adapt the rate to a response received from the API
+        :param status_code:  http status code of the response
+        :param retry_after:  value of the Retry-After header of the response, if any
+        :return:             True if the response was throttled
+        """
+        with self._lock:
+            if status_code not in THROTTLE_STATUS_CODES:
+                self.rate = min(self.max_rate, self.rate + self.increase_step)
+                return False
+            now = self.clock()
+            self.throttle_events += 1
+            if self.last_decrease is None or now - self.last_decrease >= self.rate_decrease_interval:
+                self.rate = max(self.min_rate, self.rate * self.decrease_factor)
+                self.last_decrease = now
+            retry_after_seconds = parse_retry_after(retry_after)
+            if retry_after_seconds is not None:
+                self.blocked_until = max(self.blocked_until, now + retry_after_seconds)
+            return True
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the current rate in requests per second, the number of requests waiting
+                  to be sent, the number of requests sent and the number of throttled responses received
+        """
+        with self._lock:
+            return {'rate': self.rate, 'queued': self.queued, 'requests': self.requests,
+                    'throttle_events': self.throttle_events}
+
+
+class RetryPolicy(object):
+    """
+    Decides whether a failed request is sent again and how long to wait before doing so
+
+    Waits grow exponentially from backoff_base up to backoff_cap. With jitter, the wait is drawn uniformly between
+    zero and that value, so that clients failing together do not retry together. Requests with a non-idempotent
+    method (POST) are only retried after connection errors, which happen before the request reaches the API, unless
+    the call is marked idempotent or retry_non_idempotent is set.
+    """
+
+    def __init__(self, max_attempts=DEFAULT_MAX_ATTEMPTS, backoff_base=DEFAULT_BACKOFF_BASE,
+                 backoff_cap=DEFAULT_BACKOFF_CAP, jitter=True, retry_status_codes=DEFAULT_RETRY_STATUS_CODES,
+                 retry_exceptions=DEFAULT_RETRY_EXCEPTIONS, connection_exceptions=DEFAULT_CONNECTION_EXCEPTIONS,
+                 retry_non_idempotent=False):
+        """
+        :param max_attempts:           total number of times a request is sent, 1 disables retries
+        :param backoff_base:           seconds to wait before the first retry
+        :param backoff_cap:            maximum number of seconds to wait between two attempts
+        :param jitter:                 if True, randomise each wait between zero and its exponential value
+        :param retry_status_codes:     http status codes of responses to retry
+        :param retry_exceptions:       exception types to retry
+        :param connection_exceptions:  exception types raised when a connection could not be made, which are safe to
+                                       retry for non-idempotent requests
+        :param retry_non_idempotent:   if True, retry non-idempotent requests on any retryable failure
+        """
+        self.max_attempts = max_attempts
+        self.backoff_base = backoff_base
+        self.backoff_cap = backoff_cap
+        self.jitter = jitter
+        self.retry_status_codes = tuple(retry_status_codes)
+        self.retry_exceptions = tuple(retry_exceptions)
+        self.connection_exceptions = tuple(connection_exceptions)
+        self.retry_non_idempotent = retry_non_idempotent
+
+    def backoff(self, attempt):
+        """
+        :param attempt:  number of the attempt that failed, starting at 1
+        :return:         number of seconds to wait before the next attempt
+        """
+        delay = min(self.backoff_cap, self.backoff_base * (2 ** (attempt - 1)))
+        return random.uniform(0, delay) if self.jitter else delay
+
+    def should_retry(self, method, attempt, idempotent=None, status_code=None, exception=None):
+        """
+        :param method:       http method of the failed request
+        :param attempt:      number of the attempt that failed, starting at 1
+        :param idempotent:   whether sending the request twice is safe, defaults to deciding by method
+        :param status_code:  http status code of the response, if one was received
+        :param exception:    exception raised while sending the request, if any
+        :return:             True if the request should be sent again
+        """
+        if attempt >= self.max_attempts:
+            return False
+        if exception is not None:
+            if not isinstance(exception, self.retry_exceptions):
+                return False
+            connection_failed = isinstance(exception, self.connection_exceptions)
+        elif status_code in self.retry_status_codes:
+            connection_failed = False
+        else:
+            return False
+        if idempotent is None:
+            idempotent = method.upper() in IDEMPOTENT_HTTP_METHODS
+        return idempotent or connection_failed or self.retry_non_idempotent
+
+
+class RetryStats(object):
+    """
+    Thread-safe counters of retried requests, by cause, and of requests that failed after their last attempt
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.retries = 0
+        self.retries_by_cause = collections.Counter()
+        self.failures = 0
+
+    def record_retry(self, cause):
+        """
+        :param cause:  http status code or exception class name that caused the retry
+        """
+        with self._lock:
+            self.retries += 1
+            self.retries_by_cause[str(cause)] += 1
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the number of retries, retries per cause and requests that failed after
+                  their last attempt
+        """
+        with self._lock:
+            return {'retries': self.retries, 'retries_by_cause': dict(self.retries_by_cause),
+                    'failures': self.failures}
+
+
+class PollPolicy(object):
+    """
+    How often and for how long to poll an export job
+
+    The wait between two polls starts at initial_delay and is multiplied by growth_factor after every poll, up to
+    max_delay. Polling gives up once deadline seconds have passed since the export was requested. A failed export
+    job is requested again until max_export_attempts jobs have failed.
+    """
+
+    def __init__(self, initial_delay=DEFAULT_POLL_INITIAL_DELAY, growth_factor=DEFAULT_POLL_GROWTH_FACTOR,
+                 max_delay=DEFAULT_POLL_MAX_DELAY, deadline=DEFAULT_POLL_DEADLINE,
+                 max_export_attempts=DEFAULT_MAX_EXPORT_ATTEMPTS):
+        """
+        :param initial_delay:        seconds to wait before the second poll
+        :param growth_factor:        factor applied to the wait after every poll
+        :param max_delay:            maximum number of seconds between two polls
+        :param deadline:             maximum number of seconds to wait for one export
+        :param max_export_attempts:  number of export jobs requested before giving up on a failing export
+        """
+        self.initial_delay = initial_delay
+        self.growth_factor = growth_factor
+        self.max_delay = max_delay
+        self.deadline = deadline
+        self.max_export_attempts = max_export_attempts
+
+    def delay(self, poll):
+        """
+        :param poll:  number of polls of the current export job so far, starting at 1
+        :return:      number of seconds to wait before the next poll
+        """
+        return min(self.max_delay, self.initial_delay * (self.growth_factor ** (poll - 1)))
+
+
+ExportPollResult = collections.namedtuple('ExportPollResult', ['status', 'url', 'elapsed', 'polls', 'attempts'])
+
+
+class ExportPoll(object):
+    """
+    State of one wait for an export, from the first poll until the export succeeds, fails or times out
+
+    The clients feed every poll response to next_step and follow its answer, so that the synchronous and asynchronous
+    pollers share the same schedule.
+    """
+    WAIT = 'WAIT'
+    RESUBMIT = 'RESUBMIT'
+    DONE = 'DONE'
+
+    def __init__(self, audit_id, poll_policy, clock=monotonic):
+        """
+        :param audit_id:     audit_id of the export being polled
+        :param poll_policy:  PollPolicy to follow
+        :param clock:        function returning the current time in seconds
+        """
+        self.audit_id = audit_id
+        self.poll_policy = poll_policy
+        self.clock = clock
+        self.started = clock()
+        self.polls = 0
+        self.job_polls = 0
+        self.attempts = 1
+        self.delay = None
+        self.result = None
+
+    def elapsed(self):
+        return self.clock() - self.started
+
+    def finish(self, status, url=None):
+        """
+        :param status:  EXPORT_SUCCESS, EXPORT_FAILED or EXPORT_TIMEOUT
+        :param url:     download URL of a successful export
+        :return:        ExportPoll.DONE
+        """
+        self.result = ExportPollResult(status, url, self.elapsed(), self.polls, self.attempts)
+        return self.DONE
+
+    def next_step(self, status):
+        """
+        Decide what to do after a poll
+        :param status:  parsed poll response, None if the poll failed
+        :return:        WAIT to poll again after self.delay seconds, RESUBMIT to request a new export job, or DONE
+                        once self.result is set
+        """
+        logger = logging.getLogger('sp_logger')
+        self.polls += 1
+        self.job_polls += 1
+        if status is not None and 'status' not in status:
+            logger.critical('Unexpected response from API: {0}'.format(status))
+            return self.finish(EXPORT_FAILED)
+        job_status = status['status'] if status is not None else None
+        if job_status == 'SUCCESS':
+            logger.info(job_status + ' : ' + self.audit_id)
+            return self.finish(EXPORT_SUCCESS, status['url'])
+        remaining = self.poll_policy.deadline - self.elapsed()
+        if remaining <= 0:
+            logger.error('export for {0} not ready after {1:.1f} seconds - skipping'.format(self.audit_id,
+                                                                                          self.elapsed()))
+            return self.finish(EXPORT_TIMEOUT)
+        if job_status == 'IN_PROGRESS':
+            logger.info(job_status + ' : ' + self.audit_id)
+            self.delay = min(remaining, self.poll_policy.delay(self.job_polls))
+            return self.WAIT
+        if self.attempts < self.poll_policy.max_export_attempts:
+            self.attempts += 1
+            self.job_polls = 0
+            logger.info('attempt # {0} exporting report for: {1}'.format(self.attempts, self.audit_id))
+            return self.RESUBMIT
+        logger.error('export for {0} failed {1} times - skipping'.format(self.audit_id, self.attempts))
+        return self.finish(EXPORT_FAILED)
+
+
+ExportRequest = collections.namedtuple('ExportRequest', ['audit_id', 'export_format', 'preference_id'])
+ExportDownload = collections.namedtuple('ExportDownload', ['request', 'result', 'content', 'file_path'])
+
+
+class ExportJob(object):
+    """
+    An export job outstanding in SafetyCulture.export_audits: the request it serves, the job to poll, its poll
+    state and when to poll it next
+    """
+
+    def __init__(self, request, export_job_id, export_poll):
+        self.request = request
+        self.export_job_id = export_job_id
+        self.export_poll = export_poll
+        self.poll_at = monotonic()
+
+
+class ExportLatencyStats(object):
+    """
+    Thread-safe counters of export outcomes and of the time exports took to become ready, per export format
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.formats = {}
+
+    def record(self, export_format, result):
+        """
+        :param export_format:  format of the export
+        :param result:         ExportPollResult of the wait for the export
+        """
+        with self._lock:
+            counters = self.formats.setdefault(export_format, {
+                'ready': 0, 'failed': 0, 'timed_out': 0, 'polls': 0, 'total_seconds': 0.0,
+                'min_seconds': None, 'max_seconds': None})
+            counters['polls'] += result.polls
+            if result.status == EXPORT_SUCCESS:
+                counters['ready'] += 1
+                counters['total_seconds'] += result.elapsed
+                if counters['min_seconds'] is None or result.elapsed < counters['min_seconds']:
+                    counters['min_seconds'] = result.elapsed
+                if counters['max_seconds'] is None or result.elapsed > counters['max_seconds']:
+                    counters['max_seconds'] = result.elapsed
+            elif result.status == EXPORT_TIMEOUT:
+                counters['timed_out'] += 1
+            else:
+                counters['failed'] += 1
+
+    def as_dict(self):
+        """
+        :return:  dictionary of export format to the number of exports that were ready, failed and timed out, the
+                  number of polls, and the mean, minimum and maximum seconds until an export was ready
+        """
+        with self._lock:
+            stats = {}
+            for export_format, counters in self.formats.items():
+                stats[export_format] = dict(counters)
+                stats[export_format]['mean_seconds'] = (
+                    counters['total_seconds'] / counters['ready'] if counters['ready'] else None)
+            return stats
+
+
+class DownloadStats(object):
+    """
+    Thread-safe counters of downloads streamed to disk, the bytes they wrote and the time they took
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.downloads = 0
+        self.skipped = 0
+        self.failures = 0
+        self.bytes = 0
+        self.seconds = 0.0
+
+    def record(self, byte_count, seconds, failed=False, skipped=False):
+        """
+        :param byte_count:  number of bytes received
+        :param seconds:     time the download took
+        :param failed:      True if the download was not saved
+        :param skipped:     True if an existing file was kept instead of downloading it again
+        """
+        with self._lock:
+            if failed:
+                self.failures += 1
+            elif skipped:
+                self.skipped += 1
+            else:
+                self.downloads += 1
+            self.bytes += byte_count
+            self.seconds += seconds
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the number of downloads saved, skipped and failed, the bytes received, the
+                  seconds spent downloading and the resulting bytes per second
+        """
+        with self._lock:
+            return {'downloads': self.downloads, 'skipped': self.skipped, 'failures': self.failures,
+                    'bytes': self.bytes, 'seconds': self.seconds,
+                    'bytes_per_second': self.bytes / self.seconds if self.seconds else None}
+
+
+class MediaDownloader(object):
+    """
+    Downloads audit media to disk on a pool of threads shared by every audit
+
+    At most max_in_flight media items download at once, and at most max_in_flight_per_audit from any one audit, so
+    an audit with hundreds of photos does not hold up the others. Media already on disk with the size the API reports
+    is not downloaded again. Throughput is measured over the time at least one download is running, so downloads
+    running side by side are not counted twice.
+    """
+
+    def __init__(self, sc_client, max_in_flight=DEFAULT_MEDIA_DOWNLOADS_IN_FLIGHT,
+                 max_in_flight_per_audit=DEFAULT_MEDIA_DOWNLOADS_PER_AUDIT, retry_policy=None, clock=monotonic):
+        """
+        :param sc_client:                SafetyCulture instance to download with
+        :param max_in_flight:            maximum number of media items downloading at once
+        :param max_in_flight_per_audit:  maximum number of media items of one audit downloading at once
+        :param retry_policy:             RetryPolicy overriding the client's policy for media downloads
+        :param clock:                    function returning the current time in seconds
+        """
+        self.sc_client = sc_client
+        self.max_in_flight_per_audit = max_in_flight_per_audit
+        self.retry_policy = retry_policy
+        self.clock = clock
+        self.executor = futures.ThreadPoolExecutor(max_workers=max_in_flight)
+        self._lock = threading.Lock()
+        self.active = 0
+        self.active_since = None
+        self.busy_seconds = 0.0
+        self.downloaded = 0
+        self.skipped = 0
+        self.failed = 0
+        self.bytes = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        self.executor.shutdown()
+
+    def download(self, audit_id, media_files):
+        """
+        Download the media of one audit, returning once every item is saved or has failed
+        :param audit_id:     audit ID of document that contains media
+        :param media_files:  dictionary of media ID to the path to save the media at
+        :return:             dictionary of media ID to the number of bytes written, 0 for media already on disk, None
+                             for media that could not be saved
+        """
+        media_files = iter(list(media_files.items()))
+        running = {}
+        results = {}
+        while True:
+            while len(running) < self.max_in_flight_per_audit:
+                media_file = next(media_files, None)
+                if media_file is None:
+                    break
+                media_id, file_path = media_file
+                running[self.executor.submit(self.download_media, audit_id, media_id, file_path)] = media_id
+            if not running:
+                return results
+            done, _ = futures.wait(list(running), return_when=futures.FIRST_COMPLETED)
+            for future in done:
+                results[running.pop(future)] = future.result()
+
+    def download_media(self, audit_id, media_id, file_path):
+        """
+        Download one media item, recording its outcome and the time spent downloading
+        """
+        with self._lock:
+            if self.active == 0:
+                self.active_since = self.clock()
+            self.active += 1
+        byte_count = None
+        try:
+            byte_count = self.sc_client.download_media_to_file(audit_id, media_id, file_path,
+                                                               retry_policy=self.retry_policy)
+            return byte_count
+        finally:
+            with self._lock:
+                self.active -= 1
+                if self.active == 0:
+                    self.busy_seconds += self.clock() - self.active_since
+                if byte_count is None:
+                    self.failed += 1
+                elif byte_count == 0:
+                    self.skipped += 1
+                else:
+                    self.downloaded += 1
+                    self.bytes += byte_count
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the number of media items downloaded, skipped and failed, the bytes written,
+                  the seconds during which media was downloading, and the resulting bytes and items per second
+        """
+        with self._lock:
+            seconds = self.busy_seconds
+            if self.active:
+                seconds += self.clock() - self.active_since
+            items = self.downloaded + self.skipped
+            return {'downloaded': self.downloaded, 'skipped': self.skipped, 'failed': self.failed,
+                    'bytes': self.bytes, 'seconds': seconds,
+                    'bytes_per_second': self.bytes / seconds if seconds else None,
+                    'items_per_second': items / seconds if seconds else None}
+
+
+class JsonCodec(object):
+    """
+    Decodes and encodes JSON with one of JSON_BACKENDS. JSON objects are decoded to plain dictionaries, except by the
+    ordered backend. orjson indents encoded documents by 2 spaces, the other backends by 4.
+    """
+
+    def __init__(self, backend=DEFAULT_JSON_BACKEND):
+        """
+        :param backend:  one of JSON_BACKENDS, or auto for orjson or ujson if installed, else json
+        """
+        if backend == 'auto':
+            backend = 'orjson' if orjson is not None else 'ujson' if ujson is not None else 'json'
+        if backend not in JSON_BACKENDS:
+            raise ValueError('Unsupported JSON backend: ' + str(backend))
+        if backend == 'orjson' and orjson is None:
+            raise ImportError('The orjson JSON backend requires orjson, install it with: pip install orjson')
+        if backend == 'ujson' and ujson is None:
+            raise ImportError('The ujson JSON backend requires ujson, install it with: pip install ujson')
+        self.backend = backend
+
+    def decode(self, content):
+        """
+        :param content:  JSON document, as UTF-8 encoded bytes or a string
+        :return:         the decoded document
+        """
+        if self.backend == 'orjson':
+            return orjson.loads(content)
+        if isinstance(content, bytes):
+            content = content.decode('utf-8')
+        if self.backend == 'ujson':
+            return ujson.loads(content)
+        if self.backend == 'ordered':
+            return json.JSONDecoder(object_pairs_hook=collections.OrderedDict).decode(content)
+        return json.loads(content)
+
+    def encode(self, document, indent=False):
+        """
+        :param document:  JSON document
+        :param indent:    if True, the document is indented to be read by people, else it has no whitespace
+        :return:          the encoded document, as UTF-8 encoded bytes
+        """
+        if self.backend == 'orjson':
+            return orjson.dumps(document, option=orjson.OPT_INDENT_2 if indent else 0)
+        if self.backend == 'ujson':
+            return ujson.dumps(document, indent=4 if indent else 0).encode('utf-8')
+        if indent:
+            return json.dumps(document, indent=4).encode('utf-8')
+        return json.dumps(document, separators=(',', ':')).encode('utf-8')
+
+
+class AuditCache(object):
+    """
+    On-disk cache of audit JSON, keyed by audit ID and modified_at
+
+    Audits are kept zlib-compressed in an sqlite database. Only the latest version of each audit is kept, and a
+    lookup for any other modified_at is a miss. Once the compressed audits take more than max_bytes, the least
+    recently used are evicted. The cache may be shared by threads.
+    """
+
+    def __init__(self, path, max_bytes=DEFAULT_AUDIT_CACHE_MAX_BYTES, json_codec=None):
+        """
+        :param path:        path of the sqlite database, created if it does not exist
+        :param max_bytes:   size the compressed audits are kept under
+        :param json_codec:  JsonCodec the audits are decoded and encoded with, defaults to a JsonCodec with the default
+                            backend
+        """
+        self.max_bytes = max_bytes
+        self.json_codec = json_codec if json_codec is not None else JsonCodec()
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        self.db.execute('CREATE TABLE IF NOT EXISTS audits (audit_id TEXT PRIMARY KEY, modified_at TEXT NOT NULL, '
+                        'audit BLOB NOT NULL, size INTEGER NOT NULL, json_size INTEGER NOT NULL, '
+                        'last_used REAL NOT NULL)')
+        self.db.execute('CREATE INDEX IF NOT EXISTS audits_last_used ON audits (last_used)')
+        self.db.commit()
+        self.size = self.db.execute('SELECT COALESCE(SUM(size), 0) FROM audits').fetchone()[0]
+        self.hits = 0
+        self.misses = 0
+        self.bytes_saved = 0
+        self.evictions = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def get(self, audit_id, modified_at):
+        """
+        :param audit_id:     audit_id of the audit
+        :param modified_at:  modified_at of the version of the audit wanted
+        :return:             JSON audit object, None if that version of the audit is not cached
+        """
+        with self._lock:
+            row = self.db.execute('SELECT audit, json_size FROM audits WHERE audit_id = ? AND modified_at = ?',
+                                  (audit_id, modified_at)).fetchone()
+            if row is None:
+                self.misses += 1
+                return None
+            self.db.execute('UPDATE audits SET last_used = ? WHERE audit_id = ?', (time.time(), audit_id))
+            self.db.commit()
+            self.hits += 1
+            self.bytes_saved += row[1]
+        return self.json_codec.decode(zlib.decompress(row[0]))
+
+    def put(self, audit_json):
+        """
+        Cache an audit, replacing any other version of it
+        :param audit_json:  JSON audit object containing audit_id and modified_at
+        """
+        content = self.json_codec.encode(audit_json)
+        compressed = zlib.compress(content)
+        with self._lock:
+            row = self.db.execute('SELECT size FROM audits WHERE audit_id = ?', (audit_json['audit_id'],)).fetchone()
+            if row is not None:
+                self.size -= row[0]
+            self.db.execute('INSERT OR REPLACE INTO audits (audit_id, modified_at, audit, size, json_size, last_used) '
+                            'VALUES (?, ?, ?, ?, ?, ?)', (audit_json['audit_id'], audit_json['modified_at'],
+                                                          sqlite3.Binary(compressed), len(compressed), len(content),
+                                                          time.time()))
+            self.size += len(compressed)
+            self.evict()
+            self.db.commit()
+
+    def evict(self):
+        """
+        Delete the least recently used audits until the cache fits in max_bytes. Called with the lock held.
+        """
+        while self.size > self.max_bytes:
+            row = self.db.execute('SELECT audit_id, size FROM audits ORDER BY last_used LIMIT 1').fetchone()
+            if row is None:
+                break
+            self.db.execute('DELETE FROM audits WHERE audit_id = ?', (row[0],))
+            self.size -= row[1]
+            self.evictions += 1
+
+    def iter_audits(self):
+        """
+        Yield every cached audit in the order they were modified, without counting them as hits
+        :return:  generator of JSON audit objects
+        """
+        with self._lock:
+            audit_ids = [row[0] for row in self.db.execute('SELECT audit_id FROM audits ORDER BY modified_at')]
+        for audit_id in audit_ids:
+            with self._lock:
+                row = self.db.execute('SELECT audit FROM audits WHERE audit_id = ?', (audit_id,)).fetchone()
+            if row is not None:
+                yield self.json_codec.decode(zlib.decompress(row[0]))
+
+    def as_dict(self):
+        """
+        :return:  dictionary containing the number of hits, misses and evictions, the bytes of audit JSON served from
+                  the cache instead of downloaded, and the number and compressed size of the audits cached
+        """
+        with self._lock:
+            audits = self.db.execute('SELECT COUNT(*) FROM audits').fetchone()[0]
+            return {'hits': self.hits, 'misses': self.misses, 'evictions': self.evictions,
+                    'bytes_saved': self.bytes_saved, 'audits': audits, 'size': self.size}
+
+
+class SafetyCultureBase(object):
+    """
+    URL building, validation and response parsing shared by the SafetyCulture and AsyncSafetyCulture clients.
+    Subclasses only provide the transport that sends the requests.
+    """
+
+    def __init__(self, api_token, keep_alive=True, rate_limiter=None, retry_policy=None, poll_policy=None,
+                 audit_cache=None, json_codec=None):
+        """
+        :param api_token:     iAuditor API token
+        :param keep_alive:    if False, every connection is closed after its request completes
+        :param rate_limiter:  RateLimiter applied to every request, defaults to a RateLimiter with default settings
+        :param retry_policy:  RetryPolicy applied to every request, defaults to a RetryPolicy with default settings
+        :param poll_policy:   PollPolicy applied to every export, defaults to a PollPolicy with default settings
+        :param audit_cache:   AuditCache get_audit reads from and saves to, if any
+        :param json_codec:    JsonCodec responses are decoded with, defaults to a JsonCodec with the default backend
+        """
+        self.audit_cache = audit_cache
+        self.json_codec = json_codec if json_codec is not None else JsonCodec()
+        self.rate_limiter = rate_limiter if rate_limiter is not None else RateLimiter()
+        self.retry_policy = retry_policy if retry_policy is not None else RetryPolicy()
+        self.retry_counters = RetryStats()
+        self.poll_policy = poll_policy if poll_policy is not None else PollPolicy()
+        self.export_latency = ExportLatencyStats()
+        self.download_counters = DownloadStats()
         self.current_dir = os.getcwd()
         self.log_dir = self.current_dir + '/log/'
         self.api_url = 'https://api.safetyculture.io/'
@@ -70,42 +949,160 @@ class SafetyCulture:
             self.log_critical_error(ex, 'API token is missing or invalid. Exiting.')
             exit()
         if self.api_token:
-            self.custom_http_headers = {
+            base_http_headers = {
                 'User-Agent': HTTP_USER_AGENT_ID,
                 'Authorization': 'Bearer ' + self.api_token,
                 'sc-integration-id': "safetyculture-sdk-python",
                 'sc-integration-version': "4.x",
             }
+            if not keep_alive:
+                base_http_headers['Connection'] = 'close'
+            self._base_http_headers = tuple(base_http_headers.items())
         else:
             logger.error('No valid API token parsed! Exiting.')
             sys.exit(1)
 
-    def authenticated_request_get(self, url):
-        return requests.get(url, headers=self.custom_http_headers)
+    @property
+    def custom_http_headers(self):
+        """
+        :return:  a copy of the headers sent with every request. Changing it has no effect on requests made.
+        """
+        return dict(self._base_http_headers)
+
+    def request_headers(self, extra_headers=None):
+        """
+        Compose the headers for a single request without touching the headers shared by other requests
+        :param extra_headers:  headers to add to, or override in, the base header set for this request only
+        :return:               new dictionary of request headers
+        """
+        headers = dict(self._base_http_headers)
+        if extra_headers:
+            headers.update(extra_headers)
+        return headers
 
-    def authenticated_request_post(self, url, data):
-        self.custom_http_headers['content-type'] = 'application/json'
-        response = requests.post(url, data, headers=self.custom_http_headers)
-        del self.custom_http_headers['content-type']
-        return response
+    def rate_limiter_stats(self):
+        """
+        :return:  dictionary containing the current request rate, queued requests, requests sent and throttle events
+        """
+        return self.rate_limiter.as_dict()
+
+    def should_retry_throttled(self, status_code, retry_after, throttle_retries):
+        """
+        Record a response with the rate limiter and decide whether to send the request again
+        :param status_code:       http status code of the response
+        :param retry_after:       value of the Retry-After header of the response, if any
+        :param throttle_retries:  number of times the request has already been sent again after being throttled
+        :return:                  True if the request was throttled and should be sent again
+        """
+        throttled = self.rate_limiter.record_response(status_code, retry_after)
+        if throttled:
+            logging.getLogger('sp_logger').warning(
+                '{0} received, throttling requests to {1:.2f} per second'.format(status_code, self.rate_limiter.rate))
+        return throttled and throttle_retries < self.rate_limiter.max_throttle_retries
 
-    def authenticated_request_put(self, url, data):
-        self.custom_http_headers['content-type'] = 'application/json'
-        response = requests.put(url, data, headers=self.custom_http_headers)
-        del self.custom_http_headers['content-type']
-        return response
+    def retry_stats(self):
+        """
+        :return:  dictionary containing the number of retries, retries per cause and requests that failed after
+                  their last attempt
+        """
+        return self.retry_counters.as_dict()
 
-    def authenticated_request_delete(self, url):
-        return requests.delete(url, headers=self.custom_http_headers)
+    def start_export_poll(self, audit_id, poll_policy=None):
+        """
+        :param audit_id:     audit_id of the export to poll for
+        :param poll_policy:  PollPolicy overriding the client's policy for this export
+        :return:             ExportPoll tracking the wait for the export
+        """
+        return ExportPoll(audit_id, poll_policy or self.poll_policy)
 
-    @staticmethod
-    def parse_json(json_to_parse):
+    def finish_export_poll(self, export_poll, export_format):
+        """
+        Record the outcome of a finished wait for an export
+        :param export_poll:    finished ExportPoll
+        :param export_format:  format of the export
+        :return:               ExportPollResult of the wait
+        """
+        self.export_latency.record(self.normalize_export_format(export_format), export_poll.result)
+        return export_poll.result
+
+    def export_latency_stats(self):
+        """
+        :return:  dictionary of export format to export outcomes and seconds until exports were ready
+        """
+        return self.export_latency.as_dict()
+
+    def download_stats(self):
+        """
+        :return:  dictionary containing the number of downloads streamed to disk, bytes received and throughput
+        """
+        return self.download_counters.as_dict()
+
+    def audit_cache_stats(self):
+        """
+        :return:  dictionary containing the hits, misses and bytes saved by the audit cache, None if there is none
+        """
+        return self.audit_cache.as_dict() if self.audit_cache is not None else None
+
+    def cached_audit(self, audit_id, modified_at):
+        """
+        :param audit_id:     audit_id of document to fetch
+        :param modified_at:  modified_at of the version of the audit wanted, None to skip the cache
+        :return:             JSON audit object from the audit cache, None if it is not cached
+        """
+        if self.audit_cache is None or modified_at is None:
+            return None
+        return self.audit_cache.get(audit_id, modified_at)
+
+    def cache_audit(self, audit_json):
         """
-        Parse JSON string to OrderedDict and return
+        :param audit_json:  JSON audit object fetched from the API, saved to the audit cache if there is one
+        """
+        if self.audit_cache is not None and audit_json is not None and 'modified_at' in audit_json:
+            self.audit_cache.put(audit_json)
+
+    def retry_delay(self, retry_policy, method, url, attempt, idempotent=None, status_code=None, exception=None):
+        """
+        Decide whether to send a failed request again and record the decision
+        :param retry_policy:  RetryPolicy overriding the client's policy for this request, if any
+        :param method:        http method of the failed request
+        :param url:           URL of the failed request
+        :param attempt:       number of the attempt that failed, starting at 1
+        :param idempotent:    whether sending the request twice is safe, defaults to deciding by method
+        :param status_code:   http status code of the response, if one was received
+        :param exception:     exception raised while sending the request, if any
+        :return:              number of seconds to wait before sending the request again, None to give up
+        """
+        retry_policy = retry_policy or self.retry_policy
+        cause = status_code if exception is None else type(exception).__name__
+        if not retry_policy.should_retry(method, attempt, idempotent, status_code, exception):
+            if exception is not None or status_code in retry_policy.retry_status_codes:
+                self.retry_counters.record_failure()
+            return None
+        delay = retry_policy.backoff(attempt)
+        self.retry_counters.record_retry(cause)
+        logging.getLogger('sp_logger').warning('{0} on {1} {2}, attempt {3} of {4}, retrying in {5:.2f} seconds'.format(
+            cause, method, url, attempt, retry_policy.max_attempts, delay))
+        return delay
+
+    def parse_json(self, json_to_parse):
+        """
+        Parse JSON string with the JSON codec of the client and return
         :param json_to_parse:  string representation of JSON
-        :return:               OrderedDict representation of JSON
+        :return:               decoded JSON, objects being dictionaries
         """
-        return json.JSONDecoder(object_pairs_hook=collections.OrderedDict).decode(json_to_parse.decode('utf-8'))
+        return self.json_codec.decode(json_to_parse)
+
+    def parse_response(self, status_code, content, log_message):
+        """
+        Log the http status of a response and parse its JSON body if the request succeeded
+        :param status_code:  http status code of the response
+        :param content:      raw response body
+        :param log_message:  to describe where the status code was obtained
+        :return:             parsed JSON body if status code is 200, else None
+        """
+        result = self.parse_json(content) if status_code == requests.codes.ok else None
+        self.log_http_status(status_code, log_message)
+        return result
 
     @staticmethod
     def log_critical_error(ex, message):
@@ -159,22 +1156,21 @@ class SafetyCulture:
                 self.log_critical_error(ex, 'An error happened trying to create ' + path)
                 raise
 
-    def discover_audits(self, template_id=None, modified_after=None, completed=True):
+    def build_audit_search_url(self, template_id=None, modified_after=None, completed=True, limit=None):
         """
-        Return IDs of all completed audits if no parameters are passed, otherwise restrict search
-        based on parameter values
+        Build the audit search URL for the given restrictions and log the search parameters
         :param template_id:     Restrict discovery to this template_id
         :param modified_after:  Restrict discovery to audits modified after this UTC timestamp
         :param completed:       Restrict discovery to audits marked as completed, default to True
-        :return:                JSON object containing IDs of all audits returned by API
+        :param limit:           maximum number of audits to return, defaults to the API's limit
+        :return:                audit search URL
         """
-
         logger = logging.getLogger('sp_logger')
 
         last_modified = modified_after if modified_after is not None else '2000-01-01T00:00:00.000Z'
 
-        search_url = self.audit_url + 'search?field=audit_id&field=modified_at&order=asc&modified_after=' \
-            + last_modified
+        search_url = self.audit_url + 'search?field=audit_id&field=modified_at&field=template_id&order=asc' \
+            '&modified_after=' + last_modified
         log_string = '\nInitiating audit_discovery with the parameters: ' + '\n'
         log_string += 'template_id    = ' + str(template_id) + '\n'
         log_string += 'modified_after = ' + str(last_modified) + '\n'
@@ -185,62 +1181,58 @@ class SafetyCulture:
             search_url += '&template=' + template_id
         if completed is not False:
             search_url += '&completed=true'
+        if limit is not None:
+            search_url += '&limit=' + str(limit)
+        return search_url
 
-        response = self.authenticated_request_get(search_url)
-        result = response.json() if response.status_code == requests.codes.ok else None
+    def parse_audit_search_response(self, status_code, content, search_url):
+        """
+        :param status_code:  http status code of the audit search response
+        :param content:      raw response body
+        :param search_url:   URL the search was made with
+        :return:             JSON object containing IDs of all audits returned by API, None if the search failed
+        """
+        result = self.parse_json(content) if status_code == requests.codes.ok else None
         number_discovered = str(result['total']) if result is not None else '0'
         log_message = 'on audit_discovery: ' + number_discovered + ' discovered using ' + search_url
 
-        self.log_http_status(response.status_code, log_message)
+        self.log_http_status(status_code, log_message)
         return result
 
-    def discover_templates(self, modified_after=None, modified_before=None):
+    def build_template_search_url(self, modified_after=None, modified_before=None):
         """
-        Query API for all template IDs if no parameters are passed, otherwise restrict search based on parameters
-
         :param modified_after:   Restrict discovery to templates modified after this UTC timestamp
         :param modified_before:  Restrict discovery to templates modified before this UTC timestamp
-        :return:                 JSON object containing IDs of all templates returned by API
+        :return:                 template search URL
         """
         search_url = self.template_search_url
         if modified_before is not None:
             search_url += '&modified_before=' + modified_before
         if modified_after is not None:
             search_url += '&modified_after=' + modified_after
+        return search_url
 
-        response = self.authenticated_request_get(search_url)
-        result = response.json() if response.status_code == requests.codes.ok else None
-        log_message = 'on template discovery using ' + search_url
-
-        self.log_http_status(response.status_code, log_message)
-        return result
-
-    def get_preference_ids(self, template_id=None):
+    def build_preference_search_url(self, template_id=None):
         """
-        Query API for all preference IDs if no parameters are passed, else restrict to template_id passed
         :param template_id: template_id to obtain export preferences for
-        :return:            JSON object containing list of preference objects
+        :return:            preference search URL
         """
         preference_search_url = self.api_url + 'preferences/search'
         if template_id is not None:
             preference_search_url += '?template_id=' + template_id
-        response = self.authenticated_request_get(preference_search_url)
-        result = response.json() if response.status_code == requests.codes.ok else None
-        return result
+        return preference_search_url
 
-    def get_export_job_id(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
+    def build_export_request(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
         """
-        Request export job ID from API and return it
+        Build the URL and JSON payload requesting an export job
 
         :param audit_id:           audit_id to retrieve export_job_id for
         :param preference_id:      preference to apply to exports
         :param export_format:      desired format of exported document
-        :return:                   export job ID obtained from API
+        :return:                   tuple of export URL and JSON payload
         """
         export_url = self.audit_url + audit_id + '/report'
-        if export_format == 'docx': # convert old command line format
-            export_format = 'WORD'
-        export_data = {'format': export_format.upper()}
+        export_data = {'format': self.normalize_export_format(export_format)}
 
         if preference_id is not None:
             preference_id_pattern = '^template_[a-fA-F0-9]{32}:' + GUID_PATTERN
@@ -251,65 +1243,363 @@ class SafetyCulture:
                 self.log_critical_error(ValueError,
                                         'preference_id {0} does not match expected pattern'.format(
                                             preference_id))
+        return export_url, json.dumps(export_data)
 
-        response = self.authenticated_request_post(export_url, data=json.dumps(export_data))
-        result = response.json() if response.status_code == requests.codes.ok else None
-        log_message = 'on request to ' + export_url
-
-        self.log_http_status(response.status_code, log_message)
-        return result
+    @staticmethod
+    def normalize_export_format(export_format):
+        """
+        :param export_format:  export format as given on the command line or by the caller
+        :return:               export format as named by the API
+        """
+        if export_format == 'docx': # convert old command line format
+            export_format = 'WORD'
+        return export_format.upper()
 
-    def poll_for_export(self, audit_id, export_job_id):
+    def build_export_poll_url(self, audit_id, export_job_id):
         """
-        Poll API for given export job until job is complete or excessive failed attempts occur
         :param audit_id:       audit_id of the export to poll for
         :param export_job_id:  export_job_id of the export to poll for
-        :return:               href for export download
+        :return:               URL to poll the export job status at, None if export_job_id is malformed
         """
         job_id_pattern = '^' + GUID_PATTERN
-        job_id_is_valid = re.match(job_id_pattern, export_job_id)
-
-        if job_id_is_valid:
-            delay_in_seconds = 5
-            poll_url = self.audit_url + audit_id + '/report/' + export_job_id
-            export_attempts = 1
-            poll_status = self.authenticated_request_get(poll_url)
-            status = poll_status.json()
-            logger = logging.getLogger('sp_logger')
-            if 'status' in status.keys():
-                if status['status'] == 'IN_PROGRESS':
-                    logger.info(str(status['status']) + ' : ' + audit_id)
-                    time.sleep(delay_in_seconds)
-                    return self.poll_for_export(audit_id, export_job_id)
-
-                elif status['status'] == 'SUCCESS':
-                    logger.info(str(status['status']) + ' : ' + audit_id)
-                    return status['url']
-
-                else:
-                    if export_attempts < 2:
-                        export_attempts += 1
-                        logger.info('attempt # {0} exporting report for: ' + audit_id.format(str(export_attempts)))
-                        retry_id = self.get_export_job_id(audit_id)
-                        return self.poll_for_export(audit_id, retry_id['messageId'])
-                    else:
-                        logger.error('export for ' + audit_id + ' failed {0} times - skipping'.format(export_attempts))
-            else:
-                logger.critical('Unexpected response from API: {0}'.format(status))
-
-        else:
+        job_id_is_valid = export_job_id is not None and re.match(job_id_pattern, export_job_id)
+        if not job_id_is_valid:
             self.log_critical_error(ValueError,
                                     'export_job_id {0} does not match expected pattern'.format(export_job_id))
+            return None
+        return self.audit_url + audit_id + '/report/' + export_job_id
+
+    def build_media_url(self, audit_id, media_id):
+        """
+        :param audit_id:    audit ID of document that contains media
+        :param media_id:    media ID of image to fetch
+        :return:            media URL
+        """
+        return self.audit_url + audit_id + '/media/' + media_id
+
+    def build_web_report_url(self, audit_id):
+        """
+        :param audit_id:   Audit ID
+        :return:           URL generating the Web Report link
+        """
+        return self.audit_url + audit_id + '/web_report_link'
+
+    def build_actions_search_request(self, date_modified, offset=0, page_length=DEFAULT_ACTIONS_PAGE_LENGTH):
+        """
+        :param date_modified:   ISO formatted date/time string. Only actions created after this date are are returned.
+        :param offset:          The index to start retrieving actions from
+        :param page_length:     How many actions to fetch for the page of action results
+        :return:                tuple of actions search URL and JSON payload
+        """
+        actions_url = self.api_url + 'actions/search'
+        return actions_url, json.dumps({
+            "modified_at": {"from": str(date_modified)},
+            "offset": offset,
+            "page_length": page_length,
+            "status": [0, 10, 50, 60]
+        })
+
+    @staticmethod
+    def is_valid_actions_page(page):
+        """
+        :param page:  a page of action search results
+        :return:      True if the page contains the paging properties and actions
+        """
+        return page is not None and None not in [page.get('count'), page.get('offset'), page.get('total'),
+                                                 page.get('actions')]
+
+    @staticmethod
+    def parse_org_id(my_groups_and_orgs):
+        """
+        :param my_groups_and_orgs:  JSON listing the groups and organisations of the requesting user
+        :return:                    The organisation ID of the user
+        """
+        return [group['id'] for group in my_groups_and_orgs['groups'] if group['type'] == "organisation"][0]
+
+    @staticmethod
+    def log_http_status(status_code, message):
+        """
+        Write http status code and descriptive message to log
+
+        :param status_code:  http status code to log
+        :param message:      to describe where the status code was obtained
+        """
+        logger = logging.getLogger('sp_logger')
+        status_description = requests.status_codes._codes[status_code][0]
+        log_string = str(status_code) + ' [' + status_description + '] status received ' + message
+        logger.info(log_string) if status_code == requests.codes.ok else logger.error(log_string)
+
+
+class SafetyCulture(SafetyCultureBase):
+    """
+    Client for the iAuditor API
+
+    A single instance can be shared by any number of threads: the headers sent with every request are an immutable
+    base set that is copied and extended per request, and the pooled connections are handed out to one request at a
+    time. Sharing one instance across a thread pool lets concurrent exports reuse the same kept-alive connections.
+    """
+
+    def __init__(self, api_token, pool_connections=DEFAULT_POOL_CONNECTIONS, pool_maxsize=DEFAULT_POOL_MAXSIZE,
+                 pool_block=False, keep_alive=True, http_adapter=None, rate_limiter=None, retry_policy=None,
+                 poll_policy=None, audit_cache=None, json_codec=None):
+        """
+        :param api_token:         iAuditor API token
+        :param pool_connections:  number of per-host connection pools to cache
+        :param pool_maxsize:      maximum number of connections kept alive per host
+        :param pool_block:        if True, wait for a free connection instead of opening more than pool_maxsize
+                                  connections to a single host
+        :param keep_alive:        if False, every connection is closed after its request completes
+        :param http_adapter:      requests transport adapter to use instead of the default PooledHTTPAdapter
+        :param rate_limiter:      RateLimiter applied to every request, defaults to a RateLimiter with default settings
+        :param retry_policy:      RetryPolicy applied to every request, defaults to a RetryPolicy with default settings
+        :param poll_policy:       PollPolicy applied to every export, defaults to a PollPolicy with default settings
+        :param audit_cache:       AuditCache get_audit reads from and saves to, if any
+        :param json_codec:        JsonCodec responses are decoded with, defaults to a JsonCodec with the default
+                                  backend
+        """
+        SafetyCultureBase.__init__(self, api_token, keep_alive, rate_limiter, retry_policy, poll_policy, audit_cache,
+                                   json_codec)
+
+        if http_adapter is None:
+            http_adapter = PooledHTTPAdapter(pool_connections=pool_connections, pool_maxsize=pool_maxsize,
+                                             pool_block=pool_block)
+        self.http_adapter = http_adapter
+        self.session = requests.Session()
+        self.session.mount('https://', http_adapter)
+        self.session.mount('http://', http_adapter)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def close(self):
+        """
+        Close all pooled connections held by this client
+        """
+        self.session.close()
+
+    def connection_pool_stats(self):
+        """
+        :return:  dictionary containing connection pool hits, misses and checkouts, or None if the HTTP adapter
+                  in use does not record them
+        """
+        pool_stats = getattr(self.http_adapter, 'pool_stats', None)
+        return pool_stats.as_dict() if pool_stats is not None else None
+
+    def authenticated_request(self, method, url, data=None, extra_headers=None, stream=False, retry_policy=None,
+                              idempotent=None):
+        """
+        Send a request once the rate limiter allows it, sending it again while it is throttled or while it fails in
+        a way the retry policy allows to retry
+        :param method:         http method
+        :param url:            URL to request
+        :param data:           request body
+        :param extra_headers:  headers to add to the base header set for this request only
+        :param stream:         if True, do not read the response body before returning
+        :param retry_policy:   RetryPolicy overriding the client's policy for this request
+        :param idempotent:     whether sending the request twice is safe, defaults to deciding by method
+        :return:               requests response
+        """
+        attempt = 1
+        throttle_retries = 0
+        while True:
+            self.rate_limiter.acquire()
+            try:
+                response = self.session.request(method, url, data=data, headers=self.request_headers(extra_headers),
+                                                stream=stream)
+            except Exception as ex:
+                delay = self.retry_delay(retry_policy, method, url, attempt, idempotent, exception=ex)
+                if delay is None:
+                    raise
+                time.sleep(delay)
+                attempt += 1
+                continue
+            if self.should_retry_throttled(response.status_code, response.headers.get('Retry-After'),
+                                           throttle_retries):
+                response.close()
+                throttle_retries += 1
+                continue
+            delay = self.retry_delay(retry_policy, method, url, attempt, idempotent, status_code=response.status_code)
+            if delay is None:
+                return response
+            response.close()
+            time.sleep(delay)
+            attempt += 1
+
+    def authenticated_request_get(self, url, retry_policy=None):
+        return self.authenticated_request('GET', url, retry_policy=retry_policy)
+
+    def authenticated_request_post(self, url, data, retry_policy=None, idempotent=None):
+        return self.authenticated_request('POST', url, data, JSON_CONTENT_TYPE_HEADER, retry_policy=retry_policy,
+                                          idempotent=idempotent)
+
+    def authenticated_request_put(self, url, data, retry_policy=None):
+        return self.authenticated_request('PUT', url, data, JSON_CONTENT_TYPE_HEADER, retry_policy=retry_policy)
+
+    def authenticated_request_delete(self, url, retry_policy=None):
+        return self.authenticated_request('DELETE', url, retry_policy=retry_policy)
+
+    def discover_audits(self, template_id=None, modified_after=None, completed=True):
+        """
+        Return IDs of all completed audits if no parameters are passed, otherwise restrict search
+        based on parameter values
+        :param template_id:     Restrict discovery to this template_id
+        :param modified_after:  Restrict discovery to audits modified after this UTC timestamp
+        :param completed:       Restrict discovery to audits marked as completed, default to True
+        :return:                JSON object containing the audit_id, modified_at and template_id of all audits
+                                returned by API
+        """
+        search_url = self.build_audit_search_url(template_id, modified_after, completed)
+        response = self.authenticated_request_get(search_url)
+        return self.parse_audit_search_response(response.status_code, response.content, search_url)
+
+    def iter_audits(self, template_id=None, modified_after=None, completed=True, page_size=DEFAULT_AUDIT_PAGE_SIZE,
+                    prefetch=True):
+        """
+        Yield the audits matching the search one page at a time, in order of modification
+
+        Each page is searched for with modified_after set to the modified_at of the last audit of the previous page,
+        so the search is not capped by the API's result limit. Audits already yielded with that same modified_at are
+        skipped. With prefetch, the next page is requested in a background thread while the current one is consumed.
+        :param template_id:     Restrict discovery to this template_id
+        :param modified_after:  Restrict discovery to audits modified after this UTC timestamp
+        :param completed:       Restrict discovery to audits marked as completed, default to True
+        :param page_size:       number of audits requested per page
+        :param prefetch:        if True, request the next page before the current one is consumed
+        :return:                iterator of audit objects containing audit_id and modified_at
+        """
+        def search(cursor):
+            search_url = self.build_audit_search_url(template_id, cursor, completed, page_size)
+            response = self.authenticated_request_get(search_url)
+            return self.parse_audit_search_response(response.status_code, response.content, search_url)
+
+        executor = futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            cursor = modified_after
+            seen_at_cursor = set()
+            next_page = executor.submit(search, cursor) if prefetch else None
+            while True:
+                page = next_page.result() if prefetch else search(cursor)
+                if page is None:
+                    return
+                audits = [audit for audit in page['audits'] if audit['audit_id'] not in seen_at_cursor]
+                more_pages = len(page['audits']) >= page_size
+                if more_pages and not audits:
+                    logging.getLogger('sp_logger').warning(
+                        'More than {0} audits modified at {1}, increase page_size to discover them all'.format(
+                            page_size, cursor))
+                    return
+                if audits:
+                    if audits[-1]['modified_at'] != cursor:
+                        cursor = audits[-1]['modified_at']
+                        seen_at_cursor = set()
+                    seen_at_cursor.update(audit['audit_id'] for audit in audits if audit['modified_at'] == cursor)
+                if more_pages and prefetch:
+                    next_page = executor.submit(search, cursor)
+                for audit in audits:
+                    yield audit
+                if not more_pages:
+                    return
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def discover_templates(self, modified_after=None, modified_before=None):
+        """
+        Query API for all template IDs if no parameters are passed, otherwise restrict search based on parameters
+
+        :param modified_after:   Restrict discovery to templates modified after this UTC timestamp
+        :param modified_before:  Restrict discovery to templates modified before this UTC timestamp
+        :return:                 JSON object containing IDs of all templates returned by API
+        """
+        search_url = self.build_template_search_url(modified_after, modified_before)
+        response = self.authenticated_request_get(search_url)
+        return self.parse_response(response.status_code, response.content, 'on template discovery using ' + search_url)
+
+    def get_preference_ids(self, template_id=None):
+        """
+        Query API for all preference IDs if no parameters are passed, else restrict to template_id passed
+        :param template_id: template_id to obtain export preferences for
+        :return:            JSON object containing list of preference objects
+        """
+        response = self.authenticated_request_get(self.build_preference_search_url(template_id))
+        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
+        return result
+
+    def get_export_job_id(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
+        """
+        Request export job ID from API and return it
+
+        :param audit_id:           audit_id to retrieve export_job_id for
+        :param preference_id:      preference to apply to exports
+        :param export_format:      desired format of exported document
+        :return:                   export job ID obtained from API
+        """
+        export_url, export_data = self.build_export_request(audit_id, preference_id, export_format)
+        response = self.authenticated_request_post(export_url, data=export_data)
+        return self.parse_response(response.status_code, response.content, 'on request to ' + export_url)
+
+    def wait_for_export(self, audit_id, export_job_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT,
+                        poll_policy=None):
+        """
+        Poll API for given export job until it succeeds, fails too many times or the poll deadline passes
+        :param audit_id:       audit_id of the export to poll for
+        :param export_job_id:  export_job_id of the export to poll for
+        :param preference_id:  preference applied to the export, used if the export job has to be requested again
+        :param export_format:  format of the export, used to request the export job again and to record its latency
+        :param poll_policy:    PollPolicy overriding the client's policy for this export
+        :return:               ExportPollResult
+        """
+        export_poll = self.start_export_poll(audit_id, poll_policy)
+        while True:
+            step, export_job_id = self.poll_export_job(export_poll, export_job_id, preference_id, export_format)
+            if step == ExportPoll.DONE:
+                return self.finish_export_poll(export_poll, export_format)
+            if step == ExportPoll.WAIT:
+                time.sleep(export_poll.delay)
+
+    def poll_export_job(self, export_poll, export_job_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
+        """
+        Poll an export job once, and request a new export job if the poll says to
+        :param export_poll:    ExportPoll tracking the wait for the export
+        :param export_job_id:  export_job_id of the export to poll for
+        :param preference_id:  preference applied to the export, used if the export job has to be requested again
+        :param export_format:  format of the export, used if the export job has to be requested again
+        :return:               tuple of the next step given by export_poll and the export_job_id to poll next
+        """
+        poll_url = self.build_export_poll_url(export_poll.audit_id, export_job_id)
+        if poll_url is None:
+            return export_poll.finish(EXPORT_FAILED), export_job_id
+        response = self.authenticated_request_get(poll_url)
+        status = self.parse_response(response.status_code, response.content, 'on GET for ' + poll_url)
+        step = export_poll.next_step(status)
+        if step == ExportPoll.RESUBMIT:
+            export_job = self.get_export_job_id(export_poll.audit_id, preference_id, export_format)
+            export_job_id = export_job.get('messageId') if export_job is not None else None
+        return step, export_job_id
+
+    def poll_for_export(self, audit_id, export_job_id, poll_policy=None):
+        """
+        Poll API for given export job until job is complete or excessive failed attempts occur
+        :param audit_id:       audit_id of the export to poll for
+        :param export_job_id:  export_job_id of the export to poll for
+        :param poll_policy:    PollPolicy overriding the client's policy for this export
+        :return:               href for export download, None if the export failed or timed out
+        """
+        return self.wait_for_export(audit_id, export_job_id, poll_policy=poll_policy).url
 
-    def download_export(self, export_href):
+    def download_export(self, export_href, retry_policy=None):
         """
 
-        :param export_href:  href for export document to download
-        :return:             String representation of exported document
+        :param export_href:   href for export document to download
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :return:              String representation of exported document
         """
 
         try:
-            response = self.authenticated_request_get(export_href)
+            response = self.authenticated_request_get(export_href, retry_policy)
             result = response.content if response.status_code == requests.codes.ok else None
             log_message = 'on GET for href: ' + export_href
 
@@ -319,6 +1609,109 @@ class SafetyCulture:
         except Exception as ex:
             self.log_critical_error(ex, 'Exception occurred while attempting download_export({0})'.format(export_href))
 
+    def download_export_to_file(self, export_href, file_path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE,
+                                expected_checksum=None, checksum_algorithm='sha256', retry_policy=None):
+        """
+        Stream an exported document to disk without holding it in memory, see download_to_file
+        :param export_href:         href for export document to download
+        :param file_path:           path to save the document at, replacing any existing file
+        :param chunk_size:          number of bytes read and written at a time
+        :param expected_checksum:   hex digest the document must match, if any
+        :param checksum_algorithm:  hashlib algorithm of expected_checksum
+        :param retry_policy:        RetryPolicy overriding the client's policy for this call
+        :return:                    number of bytes written, None if the document could not be saved
+        """
+        return self.download_to_file(export_href, file_path, chunk_size, expected_checksum, checksum_algorithm,
+                                     retry_policy=retry_policy)
+
+    def download_to_file(self, url, file_path, chunk_size=DEFAULT_DOWNLOAD_CHUNK_SIZE, expected_checksum=None,
+                         checksum_algorithm='sha256', skip_existing=False, retry_policy=None):
+        """
+        Stream a download to disk without holding it in memory
+
+        The body is written chunk by chunk to a temporary file next to file_path, which is renamed over file_path
+        once the download is complete and valid, so file_path never holds a partial download. A download that fails
+        part way through is started again as allowed by the retry policy.
+        :param url:                 URL to download
+        :param file_path:           path to save the download at, replacing any existing file
+        :param chunk_size:          number of bytes read and written at a time
+        :param expected_checksum:   hex digest the download must match, if any
+        :param checksum_algorithm:  hashlib algorithm of expected_checksum
+        :param skip_existing:       if True, keep an existing file_path of the size given by the Content-Length header
+                                    instead of downloading it again
+        :param retry_policy:        RetryPolicy overriding the client's policy for this call
+        :return:                    number of bytes written, 0 if an existing file was kept, None if the download
+                                    could not be saved
+        """
+        logger = logging.getLogger('sp_logger')
+        attempt = 1
+        while True:
+            started = monotonic()
+            byte_count = 0
+            streaming = False
+            temp_file = None
+            try:
+                response = self.authenticated_request('GET', url, stream=True, retry_policy=retry_policy)
+                try:
+                    self.log_http_status(response.status_code, 'on GET for href: ' + url)
+                    if response.status_code != requests.codes.ok:
+                        raise IOError('download failed with status {0}'.format(response.status_code))
+                    content_length = response.headers.get('Content-Length')
+                    if response.headers.get('Content-Encoding', 'identity') != 'identity':
+                        content_length = None
+                    if skip_existing and content_length is not None and os.path.isfile(file_path) and \
+                            os.path.getsize(file_path) == int(content_length):
+                        self.download_counters.record(0, monotonic() - started, skipped=True)
+                        return 0
+                    checksum = hashlib.new(checksum_algorithm) if expected_checksum is not None else None
+                    temp_file = tempfile.NamedTemporaryFile(dir=os.path.dirname(file_path) or '.', delete=False,
+                                                            prefix='.' + os.path.basename(file_path), suffix='.part')
+                    streaming = True
+                    with temp_file:
+                        for chunk in response.iter_content(chunk_size):
+                            temp_file.write(chunk)
+                            byte_count += len(chunk)
+                            if checksum is not None:
+                                checksum.update(chunk)
+                    if content_length is not None and int(content_length) != byte_count:
+                        raise IOError('received {0} of {1} bytes'.format(byte_count, content_length))
+                    if checksum is not None and checksum.hexdigest() != expected_checksum.lower():
+                        raise IOError('{0} checksum {1} does not match {2}'.format(
+                            checksum_algorithm, checksum.hexdigest(), expected_checksum))
+                finally:
+                    response.close()
+                replace_file(temp_file.name, file_path)
+                self.download_counters.record(byte_count, monotonic() - started)
+                return byte_count
+            except Exception as ex:
+                if temp_file is not None:
+                    temp_file.close()
+                    os.remove(temp_file.name)
+                self.download_counters.record(byte_count, monotonic() - started, failed=True)
+                delay = None
+                # failures before the body was read have already been retried by authenticated_request
+                if streaming and isinstance(ex, requests.exceptions.RequestException):
+                    delay = self.retry_delay(retry_policy, 'GET', url, attempt, exception=ex)
+                if delay is None:
+                    logger.error('Failed to download {0} to {1}: {2}'.format(url, file_path, ex))
+                    return None
+                time.sleep(delay)
+                attempt += 1
+
+    def download_media_to_file(self, audit_id, media_id, file_path, skip_existing=True, retry_policy=None):
+        """
+        Stream a media item of an audit to disk, see download_to_file
+        :param audit_id:       audit ID of document that contains media
+        :param media_id:       media ID of image to fetch
+        :param file_path:      path to save the media at
+        :param skip_existing:  if True, keep an existing file_path of the size of the media
+        :param retry_policy:   RetryPolicy overriding the client's policy for this call
+        :return:               number of bytes written, 0 if an existing file was kept, None if the media could not be
+                               saved
+        """
+        return self.download_to_file(self.build_media_url(audit_id, media_id), file_path, skip_existing=skip_existing,
+                                     retry_policy=retry_policy)
+
     def get_export(self, audit_id, preference_id=None, export_format=DEFAULT_EXPORT_FORMAT):
         """
         Obtain exported document from API and return string representation of it
@@ -328,22 +1721,94 @@ class SafetyCulture:
         :param export_format:      desired format of exported document
         :return:                   String representation of exported document
         """
-        export_job_id = self.get_export_job_id(audit_id, preference_id, export_format)['messageId']
-        export_href = self.poll_for_export(audit_id, export_job_id)
+        export_job = self.get_export_job_id(audit_id, preference_id, export_format)
+        if export_job is None:
+            return None
+        result = self.wait_for_export(audit_id, export_job['messageId'], preference_id, export_format)
+        if result.url is None:
+            return None
 
-        export_content = self.download_export(export_href)
+        export_content = self.download_export(result.url)
         return export_content
 
-    def get_media(self, audit_id, media_id):
+    def export_audits(self, export_requests, max_in_flight=DEFAULT_MAX_EXPORTS_IN_FLIGHT, poll_policy=None,
+                      file_path_for=None):
+        """
+        Export many audits at once, yielding each export as soon as it is downloaded
+
+        Export jobs are requested up front, up to max_in_flight at a time, and all outstanding jobs are polled from
+        a single loop, each on its own PollPolicy schedule. Ready exports are downloaded by background threads while
+        the loop keeps polling, and another job is requested whenever an export is downloaded or fails.
+        :param export_requests:  iterable of ExportRequest
+        :param max_in_flight:    maximum number of exports requested, polled or downloading at once
+        :param poll_policy:      PollPolicy overriding the client's policy for these exports
+        :param file_path_for:    function returning the path to stream the document of an ExportRequest to. If not
+                                 given, documents are returned in memory.
+        :return:                 iterator of ExportDownload in order of completion, holding either the content or the
+                                 file_path of the document, or neither if the export failed or timed out
+        """
+        export_requests = iter(export_requests)
+        polling = []
+        downloads = {}
+        with futures.ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            while True:
+                while len(polling) + len(downloads) < max_in_flight:
+                    request = next(export_requests, None)
+                    if request is None:
+                        break
+                    export_poll = self.start_export_poll(request.audit_id, poll_policy)
+                    export_job = self.get_export_job_id(request.audit_id, request.preference_id, request.export_format)
+                    if export_job is None:
+                        export_poll.finish(EXPORT_FAILED)
+                        yield ExportDownload(request, self.finish_export_poll(export_poll, request.export_format),
+                                             None, None)
+                        continue
+                    polling.append(ExportJob(request, export_job.get('messageId'), export_poll))
+                if not polling and not downloads:
+                    return
+
+                for job in [job for job in polling if job.poll_at <= monotonic()]:
+                    step, job.export_job_id = self.poll_export_job(job.export_poll, job.export_job_id,
+                                                                   job.request.preference_id, job.request.export_format)
+                    if step == ExportPoll.WAIT:
+                        job.poll_at = monotonic() + job.export_poll.delay
+                    elif step == ExportPoll.DONE:
+                        polling.remove(job)
+                        result = self.finish_export_poll(job.export_poll, job.request.export_format)
+                        if result.url is None:
+                            yield ExportDownload(job.request, result, None, None)
+                        elif file_path_for is None:
+                            future = executor.submit(self.download_export, result.url)
+                            downloads[future] = (job.request, result, None)
+                        else:
+                            file_path = file_path_for(job.request)
+                            future = executor.submit(self.download_export_to_file, result.url, file_path)
+                            downloads[future] = (job.request, result, file_path)
+
+                for future in [future for future in downloads if future.done()]:
+                    request, result, file_path = downloads.pop(future)
+                    if file_path is None:
+                        yield ExportDownload(request, result, future.result(), None)
+                    else:
+                        yield ExportDownload(request, result, None, file_path if future.result() is not None else None)
+
+                timeout = max(0, min(job.poll_at for job in polling) - monotonic()) if polling else None
+                if downloads:
+                    futures.wait(list(downloads), timeout, futures.FIRST_COMPLETED)
+                elif timeout:
+                    time.sleep(timeout)
+
+    def get_media(self, audit_id, media_id, retry_policy=None):
         """
         Get media item associated with a specified audit and media ID
-        :param audit_id:    audit ID of document that contains media
-        :param media_id:    media ID of image to fetch
-        :return:            The Content-Type will be the MIME type associated with the media,
-                            and the body of the response is the media itself.
+        :param audit_id:      audit ID of document that contains media
+        :param media_id:      media ID of image to fetch
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :return:              The Content-Type will be the MIME type associated with the media,
+                              and the body of the response is the media itself.
         """
-        url = self.audit_url + audit_id + '/media/' + media_id
-        response = requests.get(url, headers=self.custom_http_headers, stream=True)
+        url = self.build_media_url(audit_id, media_id)
+        response = self.authenticated_request('GET', url, stream=True, retry_policy=retry_policy)
         if response.status_code == requests.codes.ok:
             return response
         else:
@@ -356,74 +1821,85 @@ class SafetyCulture:
         :param audit_id:   Audit ID
         :return:           Web Report link
         """
-        url = self.audit_url + audit_id + '/web_report_link'
-        response = self.authenticated_request_get(url)
-        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
-        self.log_http_status(response.status_code, 'on GET web report for ' + audit_id)
+        response = self.authenticated_request_get(self.build_web_report_url(audit_id))
+        result = self.parse_response(response.status_code, response.content, 'on GET web report for ' + audit_id)
         if result:
             return result.get('url')
         else:
             return None
 
-    def get_audit_actions(self, date_modified, offset=0, page_length=100):
+    def get_audit_actions(self, date_modified, offset=0, page_length=DEFAULT_ACTIONS_PAGE_LENGTH):
         """
-        Get all actions created after a specified date. If the number of actions found is more than 100, this function will
-        page until it has collected all actions
+        Get all actions created after a specified date. If the number of actions found is more than page_length,
+        this function will page until it has collected all actions
 
         :param date_modified:   ISO formatted date/time string. Only actions created after this date are are returned.
         :param offset:          The index to start retrieving actions from
         :param page_length:     How many actions to fetch for each page of action results
-        :return:                Array of action objects
+        :return:                Array of action objects, None if a page of actions could not be retrieved
         """
-        logger = logging.getLogger('sp_logger')
-        actions_url = self.api_url + 'actions/search'
-        response = self.authenticated_request_post(
-            actions_url,
-            data=json.dumps({
-                "modified_at": {"from": str(date_modified)},
-                "offset": offset,
-                "status": [0, 10, 50, 60]
-            })
-        )
-        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
-        self.log_http_status(response.status_code, 'GET actions')
-        if result is None or None in [result.get('count'), result.get('offset'), result.get('total'), result.get('actions')]:
+        try:
+            return list(self.iter_audit_actions(date_modified, offset, page_length))
+        except IOError:
             return None
-        return self.get_page_of_actions(logger, date_modified, result, offset, page_length)
 
-    def get_page_of_actions(self, logger, date_modified, previous_page, offset=0, page_length=100):
+    def iter_audit_actions(self, date_modified, offset=0, page_length=DEFAULT_ACTIONS_PAGE_LENGTH, prefetch=True):
         """
-        Returns a page of action search results
+        Yield the actions created after a specified date one by one, walking the pages of action search results in
+        a loop. With prefetch, the next page is requested in a background thread while the current one is consumed.
 
-        :param logger: the logger
-        :param date_modified: fetch from that date onwards
-        :param previous_page: a page of action search results
-        :param offset: the index to start retrieving actions from
-        :param page_length: the number of actions to return on the search page (max 100)
-        :return: Array of action objects
+        :param date_modified:   ISO formatted date/time string. Only actions created after this date are are returned.
+        :param offset:          The index to start retrieving actions from
+        :param page_length:     How many actions to fetch for each page of action results
+        :param prefetch:        if True, request the next page before the current one is consumed
+        :return:                iterator of action objects. Raises IOError if a page of actions cannot be retrieved.
         """
-        if previous_page['count'] + previous_page['offset'] < previous_page['total']:
-            logger.info('Paging Actions. Offset: ' + str(offset + page_length) + '. Total: ' + str(previous_page['total']))
-            next_page = self.get_audit_actions(date_modified, offset + page_length)
-            if next_page is None:
-                return None
-            return next_page + previous_page['actions']
-        elif previous_page['count'] + previous_page['offset'] == previous_page['total']:
-            return previous_page['actions']
+        logger = logging.getLogger('sp_logger')
+
+        def search(page_offset):
+            actions_url, actions_data = self.build_actions_search_request(date_modified, page_offset, page_length)
+            # the actions search only reads data, so it is safe to retry
+            response = self.authenticated_request_post(actions_url, data=actions_data, idempotent=True)
+            return self.parse_response(response.status_code, response.content, 'GET actions')
 
-    def get_audit(self, audit_id):
+        executor = futures.ThreadPoolExecutor(max_workers=1) if prefetch else None
+        try:
+            next_page = executor.submit(search, offset) if prefetch else None
+            while True:
+                page = next_page.result() if prefetch else search(offset)
+                if not self.is_valid_actions_page(page):
+                    raise IOError('Failed to retrieve actions at offset {0}'.format(offset))
+                offset = page['offset'] + page['count']
+                more_pages = page['count'] > 0 and offset < page['total']
+                if more_pages:
+                    logger.info('Paging Actions. Offset: ' + str(offset) + '. Total: ' + str(page['total']))
+                    if prefetch:
+                        next_page = executor.submit(search, offset)
+                for action in page['actions']:
+                    yield action
+                if not more_pages:
+                    return
+        finally:
+            if executor is not None:
+                executor.shutdown()
+
+    def get_audit(self, audit_id, retry_policy=None, modified_at=None):
         """
         Request JSON representation of a single specified audit and return it
 
-        :param audit_id:  audit_id of document to fetch
-        :return:          JSON audit object
+        :param audit_id:      audit_id of document to fetch
+        :param retry_policy:  RetryPolicy overriding the client's policy for this call
+        :param modified_at:   modified_at of the audit, as returned by an audit search. If given, the audit is read from
+                              the audit cache when that version of it is cached.
+        :return:              JSON audit object
         """
-        response = self.authenticated_request_get(self.audit_url + audit_id)
-        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
-        log_message = 'on GET for ' + audit_id
-
-        self.log_http_status(response.status_code, log_message)
-        return result
+        audit_json = self.cached_audit(audit_id, modified_at)
+        if audit_json is not None:
+            return audit_json
+        response = self.authenticated_request_get(self.audit_url + audit_id, retry_policy)
+        audit_json = self.parse_response(response.status_code, response.content, 'on GET for ' + audit_id)
+        self.cache_audit(audit_json)
+        return audit_json
 
     def create_response_set(self, name, responses):
         """
@@ -442,10 +1918,7 @@ class SafetyCulture:
         :return: response_sets accessible to user
         """
         response = self.authenticated_request_get(self.response_set_url)
-        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
-        log_message = 'on GET for response_sets'
-        self.log_http_status(response.status_code, log_message)
-        return result
+        return self.parse_response(response.status_code, response.content, 'on GET for response_sets')
 
     def get_response_set(self, responseset_id):
         """
@@ -454,10 +1927,7 @@ class SafetyCulture:
         :return: response_set
         """
         response = self.authenticated_request_get('{0}/{1}'.format(self.response_set_url, responseset_id))
-        result = self.parse_json(response.content) if response.status_code == requests.codes.ok else None
-        log_message = 'on GET for {0}'.format(responseset_id)
-        self.log_http_status(response.status_code, log_message)
-        return result
+        return self.parse_response(response.status_code, response.content, 'on GET for {0}'.format(responseset_id))
 
     def create_response(self, responseset_id, response):
         """
@@ -491,9 +1961,7 @@ class SafetyCulture:
         response = self.authenticated_request_get(self.get_my_groups_url)
         log_message = 'on GET for organisations and groups of requesting user'
         self.log_http_status(response.status_code, log_message)
-        my_groups_and_orgs = json.loads(response.content)
-        org_id = [group['id'] for group in my_groups_and_orgs['groups'] if group['type'] == "organisation"][0]
-        return org_id
+        return self.parse_org_id(json.loads(response.content))
 
     def get_all_groups_in_org(self):
         """
@@ -565,16 +2033,3 @@ class SafetyCulture:
         log_message = 'on DELETE for user from group'
         self.log_http_status(response.status_code, log_message)
         return response if response.status_code == requests.codes.ok else None
-
-    @staticmethod
-    def log_http_status(status_code, message):
-        """
-        Write http status code and descriptive message to log
-
-        :param status_code:  http status code to log
-        :param message:      to describe where the status code was obtained
-        """
-        logger = logging.getLogger('sp_logger')
-        status_description = requests.status_codes._codes[status_code][0]
-        log_string = str(status_code) + ' [' + status_description + '] status received ' + message
-        logger.info(log_string) if status_code == requests.codes.ok else logger.error(log_string)
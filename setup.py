@@ -28,6 +28,12 @@ setup(name = 'safetyculture-sdk-python',
             'future>=0.16.0',
             'xlrd==1.1.0',
             'pyOpenSSL>=17.5.0',
-            'virtualtime==1.6'
+            'virtualtime==1.6',
+            'futures>=3.0; python_version < "3"'
       ],
+      extras_require = {
+            'async': ['aiohttp>=3.0'],
+            'parquet': ['pyarrow>=1.0'],
+            'json': ['orjson>=3.0']
+      },
       )
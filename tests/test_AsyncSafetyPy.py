@@ -0,0 +1,89 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+import asyncio
+import json
+import os
+import sys
+import unittest
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'safetypy'))
+import safetypy as sp
+from safetypy import async_safetypy
+from test_SafetyPy import ExportJobHandler, FailOnceHandler, StubApiHandler, StubApiServer, VALID_TOKEN, unthrottled
+
+
+class StubAuditHandler(StubApiHandler):
+    """
+    Answers audit searches and audit GETs with audits named after the requested path
+    """
+
+    def do_GET(self):
+        if self.path.startswith('/audits/search'):
+            self.send_json(json.dumps({'count': 2, 'total': 2, 'audits': [
+                {'audit_id': 'audit_1', 'modified_at': '2017-03-03T03:45:58.090Z'},
+                {'audit_id': 'audit_2', 'modified_at': '2017-03-04T03:45:58.090Z'}
+            ]}).encode('utf-8'))
+        else:
+            audit_id = self.path.split('/')[-1]
+            self.send_json(json.dumps({'audit_id': audit_id, 'template_id': 'template_1'}).encode('utf-8'))
+
+
+@unittest.skipIf(async_safetypy.aiohttp is None, 'aiohttp is not installed')
+class AsyncSafetyPyTestCase(unittest.TestCase):
+
+    def test_constructor_with_malformed_api_token(self):
+        with self.assertRaises(SystemExit):
+            sp.AsyncSafetyCulture('123')
+
+    def test_fan_out_get_audit_matches_sync_client(self):
+        async def fetch_all(server_url):
+            async with sp.AsyncSafetyCulture(VALID_TOKEN, rate_limiter=unthrottled()) as sc_client:
+                sc_client.audit_url = server_url + 'audits/'
+                discovered = await sc_client.discover_audits()
+                audit_ids = ['audit_{0}'.format(index) for index in range(200)]
+                audits = await asyncio.gather(*[sc_client.get_audit(audit_id) for audit_id in audit_ids])
+                return discovered, audits
+
+        with StubApiServer(StubAuditHandler) as server:
+            discovered, audits = asyncio.run(fetch_all(server.url))
+            with sp.SafetyCulture(VALID_TOKEN) as sync_client:
+                sync_client.audit_url = server.url + 'audits/'
+                self.assertEqual(discovered, sync_client.discover_audits())
+                self.assertEqual(audits[7], sync_client.get_audit('audit_7'))
+
+        self.assertEqual([audit['audit_id'] for audit in audits], ['audit_{0}'.format(index) for index in range(200)])
+
+    def test_malformed_export_job_id_is_not_polled(self):
+        async def poll():
+            async with sp.AsyncSafetyCulture(VALID_TOKEN) as sc_client:
+                return await sc_client.poll_for_export('audit_1', 'not-a-job-id')
+
+        self.assertIsNone(asyncio.run(poll()))
+
+    def test_failed_get_is_retried(self):
+        async def get(server_url):
+            async with sp.AsyncSafetyCulture(VALID_TOKEN, retry_policy=sp.RetryPolicy(backoff_base=0)) as sc_client:
+                response = await sc_client.authenticated_request_get(server_url + 'async')
+                return response.status_code, sc_client.retry_stats()
+
+        with StubApiServer(FailOnceHandler) as server:
+            status_code, stats = asyncio.run(get(server.url))
+        self.assertEqual(status_code, 200)
+        self.assertEqual(stats['retries_by_cause'], {'502': 1})
+
+    def test_export_audits_completes_every_export(self):
+        async def export_all(server_url, export_requests):
+            async with sp.AsyncSafetyCulture(VALID_TOKEN, rate_limiter=unthrottled(),
+                                             poll_policy=sp.PollPolicy(0.01)) as sc_client:
+                sc_client.audit_url = server_url + 'audits/'
+                return [await export for export in sc_client.export_audits(export_requests, max_in_flight=3)]
+
+        export_requests = [sp.ExportRequest('audit_{0}'.format(index), 'pdf', None) for index in range(8)]
+        with StubApiServer(ExportJobHandler) as server:
+            exports = asyncio.run(export_all(server.url, export_requests))
+        self.assertEqual(sorted(export.request for export in exports), export_requests)
+        self.assertTrue(all(export.result.status == sp.EXPORT_SUCCESS for export in exports))
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -1,12 +1,211 @@
 # coding=utf-8
 # Author: SafetyCulture
 # Copyright: © SafetyCulture 2016
+import collections
+import hashlib
+import json
 import os
+import shutil
 import sys
+import tempfile
+import threading
+import time
 import unittest
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from socketserver import ThreadingMixIn
+from urllib.parse import parse_qs, urlparse
+from requests.adapters import HTTPAdapter
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'safetypy'))
 import safetypy as sp
 
+VALID_TOKEN = '032d09de1ef9c43eb77f56da82ae23588d1564b9fa6f6f59e9a1849191ef1214'
+
+
+def unthrottled():
+    return sp.RateLimiter(rate=100000, max_rate=100000, burst=100000)
+
+
+class StubApiHandler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.send_json(b'{"ok": true}')
+
+    def send_json(self, body):
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class EchoHeadersHandler(StubApiHandler):
+    """
+    Answers with the method, content-type and request body it received
+    """
+
+    def do_GET(self):
+        self.echo(None)
+
+    def do_POST(self):
+        self.echo(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+
+    def echo(self, body):
+        self.send_json(json.dumps({
+            'method': self.command,
+            'content_type': self.headers.get('content-type'),
+            'body': body
+        }).encode('utf-8'))
+
+
+class ThrottleOnceHandler(StubApiHandler):
+    """
+    Answers the first request to each path with 429 and a Retry-After header, and later requests normally
+    """
+    throttled_paths = set()
+
+    def do_GET(self):
+        if self.path in self.throttled_paths:
+            return self.send_json(b'{"ok": true}')
+        self.throttled_paths.add(self.path)
+        self.send_response(429)
+        self.send_header('Retry-After', '0')
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class FailOnceHandler(StubApiHandler):
+    """
+    Answers the first request to each path with 502, and later requests normally
+    """
+    failed_paths = set()
+
+    def do_GET(self):
+        self.fail_once()
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.fail_once()
+
+    def fail_once(self):
+        if self.path in self.failed_paths:
+            return self.send_json(b'{"ok": true}')
+        self.failed_paths.add(self.path)
+        self.send_response(502)
+        self.send_header('Content-Length', '0')
+        self.end_headers()
+
+
+class ExportJobHandler(StubApiHandler):
+    """
+    Answers export requests with a new job, and reports each job in progress for two polls before serving the
+    job ID as its document. Jobs of audits named failing_* fail instead.
+    """
+    job_ids = ['{0:08d}-0000-0000-0000-000000000000'.format(index) for index in range(100)]
+    polls = {}
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length', 0)))
+        self.send_json(json.dumps({'messageId': self.job_ids.pop(0)}).encode('utf-8'))
+
+    def do_GET(self):
+        job_id = self.path.split('/')[-1]
+        if self.path.startswith('/download/'):
+            return self.send_json(job_id.encode('utf-8'))
+        if self.path.startswith('/missing/'):
+            self.send_response(404)
+            self.send_header('Content-Length', '0')
+            return self.end_headers()
+        self.polls[job_id] = self.polls.get(job_id, 0) + 1
+        if '/failing_' in self.path:
+            status = {'status': 'FAILED'}
+        elif self.polls[job_id] <= 2:
+            status = {'status': 'IN_PROGRESS'}
+        else:
+            status = {'status': 'SUCCESS', 'url': 'http://{0}/download/{1}'.format(self.headers['Host'], job_id)}
+        self.send_json(json.dumps(status).encode('utf-8'))
+
+
+class AuditSearchHandler(StubApiHandler):
+    """
+    Answers audit searches from 25 audits, three of which share each modified_at. modified_after is inclusive, so
+    consecutive pages overlap.
+    """
+    audits = [{'audit_id': 'audit_{0:02d}'.format(index),
+               'modified_at': '2017-03-{0:02d}T00:00:00.000Z'.format(index // 3 + 1)} for index in range(25)]
+    searches = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        self.searches.append(query)
+        limit = int(query.get('limit', ['1000'])[0])
+        matching = [audit for audit in self.audits if audit['modified_at'] >= query['modified_after'][0]]
+        self.send_json(json.dumps({'count': len(matching[:limit]), 'total': len(matching),
+                                   'audits': matching[:limit]}).encode('utf-8'))
+
+
+class ActionSearchHandler(StubApiHandler):
+    """
+    Answers action searches from 25 actions, honouring offset and page_length
+    """
+    searches = []
+
+    def do_POST(self):
+        search = json.loads(self.rfile.read(int(self.headers.get('Content-Length', 0))).decode('utf-8'))
+        self.searches.append(search)
+        actions = [{'action_id': 'action_{0}'.format(index)}
+                   for index in range(search['offset'], min(25, search['offset'] + search['page_length']))]
+        self.send_json(json.dumps({'count': len(actions), 'offset': search['offset'], 'total': 25,
+                                   'actions': actions}).encode('utf-8'))
+
+
+class MediaHandler(StubApiHandler):
+    """
+    Answers media requests with the media ID as its content, recording the most requests in flight at once
+    """
+    lock = threading.Lock()
+    in_flight = 0
+    max_in_flight = 0
+    requests = []
+
+    def do_GET(self):
+        with self.lock:
+            MediaHandler.in_flight += 1
+            MediaHandler.max_in_flight = max(MediaHandler.max_in_flight, MediaHandler.in_flight)
+            self.requests.append(self.path)
+        time.sleep(0.02)
+        with self.lock:
+            MediaHandler.in_flight -= 1
+        self.send_json(self.path.split('/')[-1].encode('utf-8'))
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class StubApiServer(object):
+    """
+    Local HTTP/1.1 server answering every request with a small JSON body
+    """
+
+    def __init__(self, handler=StubApiHandler):
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        self.url = 'http://127.0.0.1:{0}/'.format(self.httpd.server_address[1])
+        self.thread = threading.Thread(target=self.httpd.serve_forever)
+        self.thread.daemon = True
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
 
 class SafetyPyTestCase(unittest.TestCase):
 
@@ -27,6 +226,403 @@ class SafetyPyTestCase(unittest.TestCase):
         except:
             self.fail("Encountered an unexpected exception with valid token.")
 
+    def test_requests_reuse_pooled_connection(self):
+        with StubApiServer() as server, sp.SafetyCulture(VALID_TOKEN) as sc_client:
+            for _ in range(5):
+                self.assertEqual(sc_client.authenticated_request_get(server.url).status_code, 200)
+            self.assertEqual(sc_client.connection_pool_stats(), {'hits': 4, 'misses': 1, 'checkouts': 5})
+
+    def test_keep_alive_disabled_opens_new_connection_per_request(self):
+        with StubApiServer() as server, sp.SafetyCulture(VALID_TOKEN, keep_alive=False) as sc_client:
+            for _ in range(3):
+                sc_client.authenticated_request_get(server.url)
+            self.assertEqual(sc_client.connection_pool_stats()['misses'], 3)
+
+    def test_injected_http_adapter_is_used(self):
+        adapter = HTTPAdapter()
+        sc_client = sp.SafetyCulture(VALID_TOKEN, http_adapter=adapter)
+        self.assertIs(sc_client.session.get_adapter('https://api.safetyculture.io/'), adapter)
+        self.assertIsNone(sc_client.connection_pool_stats())
+
+    def test_request_headers_do_not_modify_base_headers(self):
+        sc_client = sp.SafetyCulture(VALID_TOKEN)
+        headers = sc_client.request_headers({'content-type': 'application/json'})
+        self.assertEqual(headers['content-type'], 'application/json')
+        self.assertNotIn('content-type', sc_client.custom_http_headers)
+        sc_client.custom_http_headers['content-type'] = 'text/plain'
+        self.assertNotIn('content-type', sc_client.request_headers())
+
+    def test_single_client_serves_concurrent_get_and_post_requests(self):
+        def call(index):
+            if index % 2:
+                response = sc_client.authenticated_request_post(server.url, json.dumps({'index': index}))
+            else:
+                response = sc_client.authenticated_request_get(server.url)
+            return index, response.json()
+
+        sc_client = sp.SafetyCulture(VALID_TOKEN, pool_maxsize=16, rate_limiter=unthrottled())
+        with StubApiServer(EchoHeadersHandler) as server, sc_client:
+            with ThreadPoolExecutor(max_workers=16) as executor:
+                results = list(executor.map(call, range(400)))
+
+        for index, echoed in results:
+            if index % 2:
+                self.assertEqual(echoed['method'], 'POST')
+                self.assertEqual(echoed['content_type'], 'application/json')
+                self.assertEqual(json.loads(echoed['body']), {'index': index})
+            else:
+                self.assertEqual(echoed['method'], 'GET')
+                self.assertIsNone(echoed['content_type'])
+        self.assertGreater(sc_client.connection_pool_stats()['hits'], 0)
+
+    def test_throttled_request_is_sent_again_after_retry_after(self):
+        with StubApiServer(ThrottleOnceHandler) as server, sp.SafetyCulture(VALID_TOKEN) as sc_client:
+            response = sc_client.authenticated_request_get(server.url + 'throttled')
+            self.assertEqual(response.status_code, 200)
+            stats = sc_client.rate_limiter_stats()
+            self.assertEqual(stats['throttle_events'], 1)
+            self.assertEqual(stats['requests'], 2)
+            self.assertLess(stats['rate'], sp.DEFAULT_RATE_LIMIT)
+
+    def test_failed_get_is_retried(self):
+        retry_policy = sp.RetryPolicy(backoff_base=0)
+        with StubApiServer(FailOnceHandler) as server, sp.SafetyCulture(VALID_TOKEN, retry_policy=retry_policy) \
+                as sc_client:
+            self.assertEqual(sc_client.authenticated_request_get(server.url + 'get').status_code, 200)
+            self.assertEqual(sc_client.retry_stats(), {'retries': 1, 'retries_by_cause': {'502': 1}, 'failures': 0})
+
+    def test_failed_post_is_only_retried_when_idempotent(self):
+        retry_policy = sp.RetryPolicy(backoff_base=0)
+        with StubApiServer(FailOnceHandler) as server, sp.SafetyCulture(VALID_TOKEN, retry_policy=retry_policy) \
+                as sc_client:
+            self.assertEqual(sc_client.authenticated_request_post(server.url + 'post', '{}').status_code, 502)
+            response = sc_client.authenticated_request_post(server.url + 'search', '{}', idempotent=True)
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(sc_client.retry_stats()['failures'], 1)
+
+    def test_connection_error_is_retried_until_attempts_run_out(self):
+        retry_policy = sp.RetryPolicy(max_attempts=2, backoff_base=0)
+        with StubApiServer() as server:
+            url = server.url
+        sc_client = sp.SafetyCulture(VALID_TOKEN, retry_policy=retry_policy)
+        with self.assertRaises(sp.requests.exceptions.ConnectionError):
+            sc_client.authenticated_request_post(url, '{}')
+        self.assertEqual(sc_client.retry_stats()['retries'], 1)
+        self.assertEqual(sc_client.retry_stats()['failures'], 1)
+
+    def test_export_is_polled_until_ready(self):
+        poll_policy = sp.PollPolicy(initial_delay=0.01)
+        with StubApiServer(ExportJobHandler) as server, sp.SafetyCulture(VALID_TOKEN, poll_policy=poll_policy) \
+                as sc_client:
+            sc_client.audit_url = server.url + 'audits/'
+            export_job = sc_client.get_export_job_id('audit_1', export_format='docx')
+            result = sc_client.wait_for_export('audit_1', export_job['messageId'], export_format='docx')
+            self.assertEqual(result.status, sp.EXPORT_SUCCESS)
+            self.assertEqual(result.url, server.url + 'download/' + export_job['messageId'])
+            self.assertEqual((result.polls, result.attempts), (3, 1))
+            stats = sc_client.export_latency_stats()['WORD']
+            self.assertEqual((stats['ready'], stats['failed'], stats['polls']), (1, 0, 3))
+
+    def test_failed_export_is_requested_again_then_given_up(self):
+        poll_policy = sp.PollPolicy(initial_delay=0.01, max_export_attempts=3)
+        with StubApiServer(ExportJobHandler) as server, sp.SafetyCulture(VALID_TOKEN, poll_policy=poll_policy) \
+                as sc_client:
+            sc_client.audit_url = server.url + 'audits/'
+            export_job = sc_client.get_export_job_id('failing_audit')
+            self.assertIsNone(sc_client.poll_for_export('failing_audit', export_job['messageId']))
+            self.assertEqual(sc_client.export_latency_stats()['PDF']['failed'], 1)
+            self.assertEqual(sc_client.export_latency_stats()['PDF']['polls'], 3)
+
+    def test_export_audits_streams_every_export(self):
+        export_requests = [sp.ExportRequest('audit_{0}'.format(index), 'pdf', None) for index in range(12)]
+        export_requests.append(sp.ExportRequest('failing_audit', 'docx', None))
+        sc_client = sp.SafetyCulture(VALID_TOKEN, rate_limiter=unthrottled(), poll_policy=sp.PollPolicy(0.01))
+        with StubApiServer(ExportJobHandler) as server, sc_client:
+            sc_client.audit_url = server.url + 'audits/'
+            exports = list(sc_client.export_audits(export_requests, max_in_flight=4))
+
+        self.assertEqual(sorted(export.request for export in exports), sorted(export_requests))
+        for export in exports:
+            if export.request.audit_id == 'failing_audit':
+                self.assertEqual((export.result.status, export.content), (sp.EXPORT_FAILED, None))
+            else:
+                self.assertEqual(export.result.status, sp.EXPORT_SUCCESS)
+                self.assertEqual(export.content.decode('utf-8'), export.result.url.split('/')[-1])
+        self.assertEqual(sc_client.export_latency_stats()['PDF']['ready'], 12)
+
+    def test_export_audits_streams_documents_to_files(self):
+        export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_dir)
+        export_requests = [sp.ExportRequest('audit_{0}'.format(index), 'pdf', None) for index in range(3)]
+        sc_client = sp.SafetyCulture(VALID_TOKEN, rate_limiter=unthrottled(), poll_policy=sp.PollPolicy(0.01))
+        with StubApiServer(ExportJobHandler) as server, sc_client:
+            sc_client.audit_url = server.url + 'audits/'
+            exports = list(sc_client.export_audits(
+                export_requests, file_path_for=lambda request: os.path.join(export_dir, request.audit_id + '.pdf')))
+
+        self.assertEqual(sorted(os.listdir(export_dir)), ['audit_0.pdf', 'audit_1.pdf', 'audit_2.pdf'])
+        for export in exports:
+            self.assertIsNone(export.content)
+            with open(export.file_path, 'rb') as export_file:
+                self.assertEqual(export_file.read().decode('utf-8'), export.result.url.split('/')[-1])
+        self.assertEqual(sc_client.download_stats()['downloads'], 3)
+
+    def test_iter_audits_pages_by_modified_after(self):
+        for prefetch in (True, False):
+            del AuditSearchHandler.searches[:]
+            with StubApiServer(AuditSearchHandler) as server, sp.SafetyCulture(VALID_TOKEN) as sc_client:
+                sc_client.audit_url = server.url + 'audits/'
+                audits = list(sc_client.iter_audits(page_size=10, prefetch=prefetch))
+            self.assertEqual(audits, AuditSearchHandler.audits)
+            self.assertEqual([search['modified_after'][0][:10] for search in AuditSearchHandler.searches],
+                             ['2000-01-01', '2017-03-04', '2017-03-07'])
+            self.assertEqual(AuditSearchHandler.searches[0]['limit'], ['10'])
+
+    def test_iter_audit_actions_walks_pages_in_order(self):
+        del ActionSearchHandler.searches[:]
+        with StubApiServer(ActionSearchHandler) as server, sp.SafetyCulture(VALID_TOKEN) as sc_client:
+            sc_client.api_url = server.url
+            actions = list(sc_client.iter_audit_actions('2017-01-01T00:00:00.000Z', page_length=10))
+            self.assertEqual(sc_client.get_audit_actions('2017-01-01T00:00:00.000Z', page_length=10), actions)
+        self.assertEqual([action['action_id'] for action in actions],
+                         ['action_{0}'.format(index) for index in range(25)])
+        self.assertEqual([(search['offset'], search['page_length']) for search in ActionSearchHandler.searches[:3]],
+                         [(0, 10), (10, 10), (20, 10)])
+
+
+class DownloadExportToFileTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.export_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_dir)
+        self.file_path = os.path.join(self.export_dir, 'report.pdf')
+        self.sc_client = sp.SafetyCulture(VALID_TOKEN, retry_policy=sp.RetryPolicy(max_attempts=1))
+        self.addCleanup(self.sc_client.close)
+
+    def test_document_is_written_in_chunks(self):
+        with StubApiServer(ExportJobHandler) as server:
+            byte_count = self.sc_client.download_export_to_file(server.url + 'download/document', self.file_path,
+                                                                chunk_size=3)
+        self.assertEqual(byte_count, 8)
+        self.assertEqual(os.listdir(self.export_dir), ['report.pdf'])
+        with open(self.file_path, 'rb') as export_file:
+            self.assertEqual(export_file.read(), b'document')
+        stats = self.sc_client.download_stats()
+        self.assertEqual((stats['downloads'], stats['failures'], stats['bytes']), (1, 0, 8))
+
+    def test_checksum_mismatch_keeps_existing_file(self):
+        with open(self.file_path, 'wb') as export_file:
+            export_file.write(b'previous')
+        with StubApiServer(ExportJobHandler) as server:
+            checksum = hashlib.sha256(b'document').hexdigest()
+            self.assertEqual(self.sc_client.download_export_to_file(
+                server.url + 'download/document', self.file_path, expected_checksum=checksum), 8)
+            self.assertIsNone(self.sc_client.download_export_to_file(
+                server.url + 'download/other', self.file_path, expected_checksum=checksum))
+            self.assertIsNone(self.sc_client.download_export_to_file(server.url + 'missing/document', self.file_path))
+        self.assertEqual(os.listdir(self.export_dir), ['report.pdf'])
+        with open(self.file_path, 'rb') as export_file:
+            self.assertEqual(export_file.read(), b'document')
+        self.assertEqual(self.sc_client.download_stats()['failures'], 2)
+
+
+class MediaDownloaderTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.media_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.media_dir)
+        self.sc_client = sp.SafetyCulture(VALID_TOKEN, rate_limiter=unthrottled())
+        self.addCleanup(self.sc_client.close)
+        MediaHandler.requests = []
+        MediaHandler.max_in_flight = 0
+
+    def test_media_is_downloaded_within_per_audit_limit(self):
+        media_files = dict(('media_{0:02d}'.format(index), os.path.join(self.media_dir, 'media_{0:02d}.jpg'.format(index)))
+                           for index in range(12))
+        with StubApiServer(MediaHandler) as server:
+            self.sc_client.audit_url = server.url + 'audits/'
+            with sp.MediaDownloader(self.sc_client, max_in_flight=8, max_in_flight_per_audit=3) as media_downloader:
+                saved_media = media_downloader.download('audit_1', media_files)
+        self.assertEqual(saved_media, dict((media_id, 8) for media_id in media_files))
+        self.assertEqual(MediaHandler.max_in_flight, 3)
+        with open(media_files['media_05'], 'rb') as media_file:
+            self.assertEqual(media_file.read(), b'media_05')
+        stats = media_downloader.as_dict()
+        self.assertEqual((stats['downloaded'], stats['skipped'], stats['failed'], stats['bytes']), (12, 0, 0, 96))
+        self.assertGreater(stats['items_per_second'], 0)
+
+    def test_media_already_on_disk_is_skipped(self):
+        media_files = {'media_1': os.path.join(self.media_dir, 'media_1.jpg'),
+                       'media_2': os.path.join(self.media_dir, 'media_2.jpg')}
+        with open(media_files['media_1'], 'wb') as media_file:
+            media_file.write(b'media_1')
+        with open(media_files['media_2'], 'wb') as media_file:
+            media_file.write(b'part')
+        with StubApiServer(MediaHandler) as server:
+            self.sc_client.audit_url = server.url + 'audits/'
+            with sp.MediaDownloader(self.sc_client) as media_downloader:
+                saved_media = media_downloader.download('audit_1', media_files)
+        self.assertEqual(saved_media, {'media_1': 0, 'media_2': 7})
+        self.assertEqual(media_downloader.as_dict()['skipped'], 1)
+        with open(media_files['media_2'], 'rb') as media_file:
+            self.assertEqual(media_file.read(), b'media_2')
+
+
+class JsonCodecTestCase(unittest.TestCase):
+
+    def test_installed_backends_decode_what_they_encode(self):
+        document = {'audit_id': 'audit_1', 'score': 1.5, 'items': [{'label': u'caf\xe9', 'children': []}], 'x': None}
+        for backend in sp.JSON_BACKENDS:
+            try:
+                json_codec = sp.JsonCodec(backend)
+            except ImportError:
+                continue
+            for indent in [False, True]:
+                content = json_codec.encode(document, indent)
+                self.assertIsInstance(content, bytes)
+                self.assertEqual(json.loads(content.decode('utf-8')), document)
+                self.assertEqual(json_codec.decode(content), document)
+                self.assertEqual(json_codec.decode(content.decode('utf-8')), document)
+        self.assertIsInstance(sp.JsonCodec('ordered').decode(b'{"b": 1, "a": 2}'), collections.OrderedDict)
+        self.assertRaises(ValueError, sp.JsonCodec, 'yaml')
+
+
+class AuditCacheTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.cache_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.cache_dir)
+        self.cache_path = os.path.join(self.cache_dir, 'audits.sqlite')
+
+    def audit(self, audit_id, modified_at='2017-03-03T03:45:58.090Z'):
+        return {'audit_id': audit_id, 'modified_at': modified_at, 'template_id': 'template_1', 'items': ['x' * 100]}
+
+    def test_audit_is_served_only_for_its_modified_at(self):
+        with sp.AuditCache(self.cache_path) as audit_cache:
+            audit_cache.put(self.audit('audit_1'))
+            self.assertEqual(audit_cache.get('audit_1', '2017-03-03T03:45:58.090Z'), self.audit('audit_1'))
+            self.assertIsNone(audit_cache.get('audit_1', '2017-03-04T03:45:58.090Z'))
+            self.assertIsNone(audit_cache.get('audit_2', '2017-03-03T03:45:58.090Z'))
+            stats = audit_cache.as_dict()
+        self.assertEqual((stats['hits'], stats['misses'], stats['audits']), (1, 2, 1))
+        self.assertEqual(stats['bytes_saved'], len(json.dumps(self.audit('audit_1'), separators=(',', ':'))))
+        with sp.AuditCache(self.cache_path) as audit_cache:
+            self.assertEqual([audit['audit_id'] for audit in audit_cache.iter_audits()], ['audit_1'])
+
+    def test_least_recently_used_audits_are_evicted(self):
+        with sp.AuditCache(self.cache_path) as audit_cache:
+            audit_cache.put(self.audit('audit_1'))
+            audit_cache.max_bytes = audit_cache.size * 2
+            audit_cache.put(self.audit('audit_2'))
+            audit_cache.get('audit_1', '2017-03-03T03:45:58.090Z')
+            audit_cache.put(self.audit('audit_3'))
+            self.assertEqual(sorted(audit['audit_id'] for audit in audit_cache.iter_audits()), ['audit_1', 'audit_3'])
+            self.assertEqual(audit_cache.as_dict()['evictions'], 1)
+
+    def test_get_audit_reads_through_cache(self):
+        with sp.AuditCache(self.cache_path) as audit_cache, StubApiServer(StubApiHandler) as server:
+            with sp.SafetyCulture(VALID_TOKEN, audit_cache=audit_cache) as sc_client:
+                sc_client.audit_url = server.url + 'audits/'
+                audit_cache.put(self.audit('audit_1'))
+                self.assertEqual(sc_client.get_audit('audit_1', modified_at='2017-03-03T03:45:58.090Z'),
+                                 self.audit('audit_1'))
+                self.assertEqual(sc_client.get_audit('audit_1', modified_at='2017-03-05T03:45:58.090Z'), {'ok': True})
+                self.assertEqual(sc_client.audit_cache_stats()['hits'], 1)
+
+
+class ExportPollTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        poll_policy = sp.PollPolicy(initial_delay=1, growth_factor=2, max_delay=5, deadline=10)
+        self.export_poll = sp.ExportPoll('audit_1', poll_policy, clock=lambda: self.now)
+
+    def test_delay_grows_up_to_max_delay(self):
+        delays = []
+        for _ in range(4):
+            self.assertEqual(self.export_poll.next_step({'status': 'IN_PROGRESS'}), sp.ExportPoll.WAIT)
+            delays.append(self.export_poll.delay)
+        self.assertEqual(delays, [1, 2, 4, 5])
+
+    def test_gives_up_at_deadline(self):
+        self.now = 9.5
+        self.assertEqual(self.export_poll.next_step({'status': 'IN_PROGRESS'}), sp.ExportPoll.WAIT)
+        self.assertEqual(self.export_poll.delay, 0.5)
+        self.now = 10
+        self.assertEqual(self.export_poll.next_step({'status': 'IN_PROGRESS'}), sp.ExportPoll.DONE)
+        self.assertEqual(self.export_poll.result.status, sp.EXPORT_TIMEOUT)
+
+    def test_failed_job_is_requested_again_with_reset_delay(self):
+        self.export_poll.next_step({'status': 'IN_PROGRESS'})
+        self.export_poll.next_step({'status': 'IN_PROGRESS'})
+        self.assertEqual(self.export_poll.next_step(None), sp.ExportPoll.RESUBMIT)
+        self.export_poll.next_step({'status': 'IN_PROGRESS'})
+        self.assertEqual(self.export_poll.delay, 1)
+        self.now = 3
+        self.assertEqual(self.export_poll.next_step({'status': 'SUCCESS', 'url': 'href'}), sp.ExportPoll.DONE)
+        self.assertEqual(self.export_poll.result, sp.ExportPollResult(sp.EXPORT_SUCCESS, 'href', 3, 5, 2))
+
+
+class RetryPolicyTestCase(unittest.TestCase):
+
+    def test_backoff_grows_exponentially_up_to_cap(self):
+        retry_policy = sp.RetryPolicy(backoff_base=1, backoff_cap=5, jitter=False)
+        self.assertEqual([retry_policy.backoff(attempt) for attempt in range(1, 5)], [1, 2, 4, 5])
+
+    def test_jitter_stays_within_exponential_delay(self):
+        retry_policy = sp.RetryPolicy(backoff_base=1, backoff_cap=5)
+        for _ in range(100):
+            self.assertTrue(0 <= retry_policy.backoff(3) <= 4)
+
+    def test_should_retry(self):
+        retry_policy = sp.RetryPolicy(max_attempts=3)
+        self.assertTrue(retry_policy.should_retry('GET', 1, status_code=500))
+        self.assertFalse(retry_policy.should_retry('GET', 3, status_code=500))
+        self.assertFalse(retry_policy.should_retry('GET', 1, status_code=404))
+        self.assertFalse(retry_policy.should_retry('POST', 1, status_code=500))
+        self.assertTrue(retry_policy.should_retry('POST', 1, idempotent=True, status_code=500))
+        self.assertTrue(retry_policy.should_retry('POST', 1, exception=sp.requests.exceptions.ConnectionError()))
+        self.assertFalse(retry_policy.should_retry('POST', 1, exception=sp.requests.exceptions.ReadTimeout()))
+        self.assertFalse(retry_policy.should_retry('GET', 1, exception=ValueError()))
+
+
+class RateLimiterTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.now = 0.0
+        self.rate_limiter = sp.RateLimiter(rate=2, min_rate=0.5, max_rate=4, burst=1, increase_step=1,
+                                           clock=lambda: self.now)
+
+    def test_requests_beyond_burst_wait_for_tokens(self):
+        self.assertEqual(self.rate_limiter.reserve(), 0)
+        self.assertAlmostEqual(self.rate_limiter.reserve(), 0.5)
+        self.assertAlmostEqual(self.rate_limiter.reserve(), 1.0)
+
+    def test_throttled_response_halves_rate_once_per_interval(self):
+        self.assertTrue(self.rate_limiter.record_response(429))
+        self.assertTrue(self.rate_limiter.record_response(503))
+        self.assertEqual(self.rate_limiter.rate, 1)
+        self.now = 2.0
+        self.rate_limiter.record_response(429)
+        self.assertEqual(self.rate_limiter.rate, 0.5)
+        self.rate_limiter.record_response(429)
+        self.assertEqual(self.rate_limiter.as_dict()['throttle_events'], 4)
+
+    def test_successful_responses_ramp_rate_up_to_max(self):
+        for _ in range(5):
+            self.assertFalse(self.rate_limiter.record_response(200))
+        self.assertEqual(self.rate_limiter.rate, 4)
+
+    def test_retry_after_holds_back_requests(self):
+        self.rate_limiter.record_response(429, '30')
+        self.assertEqual(self.rate_limiter.reserve(), 30)
+
+    def test_parse_retry_after(self):
+        self.assertEqual(sp.parse_retry_after('120'), 120)
+        self.assertEqual(sp.parse_retry_after('Wed, 21 Oct 2015 07:28:00 GMT', now=1445412450), 30)
+        self.assertIsNone(sp.parse_retry_after('soon'))
+        self.assertIsNone(sp.parse_retry_after(None))
+
 
 if __name__ == '__main__':
-    unittest.main()
\ No newline at end of file
+    unittest.main()
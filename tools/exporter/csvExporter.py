@@ -1,13 +1,29 @@
 import unicodecsv as csv
+import argparse
+import glob
+import io
 import json
 import logging
+import multiprocessing
 import sys
 import os
-import copy
+import collections
+import sqlite3
+import threading
+import time
 # virtualtime is imported to patch time.strftime and datetime.datetime.strftime to support pre-1900 and pre-1000 years
 import virtualtime
 from datetime import datetime
 
+try:
+    import pyarrow
+    import pyarrow.parquet
+except ImportError:
+    pyarrow = None
+
+# os.replace is not available on python 2, where os.rename replaces files on POSIX systems
+replace_file = getattr(os, 'replace', os.rename)
+
 CSV_HEADER_ROW = [
     'ItemType',
     'Label',
@@ -54,6 +70,48 @@ CSV_HEADER_ROW = [
 # audit item empty response
 EMPTY_RESPONSE = ''
 
+# number of bulk CSV files a BulkCsvSink keeps open at once
+DEFAULT_MAX_OPEN_CSV_FILES = 16
+
+# bytes of output a BulkCsvSink buffers for each open file
+DEFAULT_CSV_BUFFER_SIZE = 256 * 1024
+
+# seconds between a BulkCsvSink flushing its open files to disk
+DEFAULT_CSV_FSYNC_INTERVAL = 30
+
+# the SQLite index of the rows of each audit in the bulk CSV files of an UpsertCsvSink, kept in its export path
+CSV_INDEX_FILENAME = 'csv_index.sqlite'
+
+# share of the bytes of a bulk CSV file that may be stale rows before an UpsertCsvSink compacts it
+DEFAULT_CSV_COMPACTION_RATIO = 0.25
+
+# rows written to a Parquet file at once, as one row group
+DEFAULT_PARQUET_ROW_GROUP_SIZE = 64 * 1024
+
+DEFAULT_PARQUET_COMPRESSION = 'zstd'
+
+# seconds between completing the open Parquet files, so that their rows can be read
+DEFAULT_PARQUET_COMMIT_INTERVAL = 300
+
+PARQUET_DIRNAME = 'parquet'
+
+# types of the columns that are not strings, in the exports that keep column types
+FLOAT_COLUMNS = ['Latitude', 'Longitude', 'ItemScore', 'ItemMaxScore', 'ItemScorePercentage', 'AuditScore',
+                 'AuditMaxScore', 'AuditScorePercentage', 'AuditDuration']
+BOOLEAN_COLUMNS = ['Mandatory', 'FailedResponse', 'Inactive']
+# maps the date columns to the audit_data property they are read from, unformatted
+DATE_COLUMNS = collections.OrderedDict([
+    ('DateStarted', 'date_started'),
+    ('DateCompleted', 'date_completed'),
+    ('DateModified', 'date_modified')
+])
+
+# audit JSON files converted between progress reports of a bulk conversion
+DEFAULT_PROGRESS_INTERVAL = 1000
+
+# audit JSON files handed to a process of a bulk conversion at once
+BULK_CONVERSION_CHUNK_SIZE = 8
+
 # audit item property constants
 LABEL = 'label'
 COMMENTS = 'comments'
@@ -171,6 +229,31 @@ def get_json_property(obj, *args):
     return obj if obj is not None else EMPTY_RESPONSE
 
 
+def configure_logging():
+    """
+    Configure logging to log to std output as well as to log file
+    """
+    log_level = logging.DEBUG
+
+    log_filename = datetime.now().strftime('%Y-%m-%d') + '.log'
+    csvExporter_logger = logging.getLogger('csvExporter_logger')
+    if csvExporter_logger.handlers:
+        # already configured, e.g. by an earlier CsvExporter
+        return
+    csvExporter_logger.setLevel(log_level)
+    formatter = logging.Formatter('%(asctime)s : %(levelname)s : %(message)s')
+
+    fh = logging.FileHandler(filename=os.getcwd() + log_filename)
+    fh.setLevel(log_level)
+    fh.setFormatter(formatter)
+    csvExporter_logger.addHandler(fh)
+
+    sh = logging.StreamHandler(sys.stdout)
+    sh.setLevel(log_level)
+    sh.setFormatter(formatter)
+    csvExporter_logger.addHandler(sh)
+
+
 class CsvExporter:
     """
     provides tools to convert single json audit to CSV
@@ -180,40 +263,31 @@ class CsvExporter:
         audit_table(list): the audit data converted to a table
     """
 
-    def __init__(self, audit_json, export_inactive_items=True):
+    def __init__(self, audit_json, export_inactive_items=True, convert=True):
         """
         Constructor
 
         :param audit_json:      audit in JSON format to be converted to CSV
+        :param convert:         if False, audit_table is not built, and the rows are read from iter_rows instead
         """
         self.configure_logging()
         self.audit_json = audit_json
         self.export_inactive_items = export_inactive_items
         self.item_category = EMPTY_RESPONSE
         self.item_map = {}
+        # computed once per audit, on first use
+        self.item_categories = {}
+        self.custom_response_id_to_label_map = None
+        self.common_audit_columns = None
+        self.category_column = None
         self.map_items()
-        self.audit_table = self.convert_audit_to_table()
+        self.audit_table = self.convert_audit_to_table() if convert else None
 
     def configure_logging(self):
         """
         Configure logging to log to std output as well as to log file
         """
-        log_level = logging.DEBUG
-
-        log_filename = datetime.now().strftime('%Y-%m-%d') + '.log'
-        csvExporter_logger = logging.getLogger('csvExporter_logger')
-        csvExporter_logger.setLevel(log_level)
-        formatter = logging.Formatter('%(asctime)s : %(levelname)s : %(message)s')
-
-        fh = logging.FileHandler(filename=os.getcwd() + log_filename)
-        fh.setLevel(log_level)
-        fh.setFormatter(formatter)
-        csvExporter_logger.addHandler(fh)
-
-        sh = logging.StreamHandler(sys.stdout)
-        sh.setLevel(log_level)
-        sh.setFormatter(formatter)
-        csvExporter_logger.addHandler(sh)
+        configure_logging()
 
     def audit_id(self):
         """
@@ -249,25 +323,42 @@ class CsvExporter:
         """
         if not item_id:
             return EMPTY_RESPONSE
-        elif self.item_map[item_id]['type'] == 'section' or self.item_map[item_id]['type'] == 'category':
-            return self.item_map[item_id]['label'] or EMPTY_RESPONSE
-        else:
-            return self.get_item_category(self.item_map[item_id]['parent_id'])
+        if item_id not in self.item_categories:
+            if self.item_map[item_id]['type'] == 'section' or self.item_map[item_id]['type'] == 'category':
+                self.item_categories[item_id] = self.item_map[item_id]['label'] or EMPTY_RESPONSE
+            else:
+                self.item_categories[item_id] = self.get_item_category(self.item_map[item_id]['parent_id'])
+        return self.item_categories[item_id]
 
     def audit_custom_response_id_to_label_map(self):
         """
         :return:     dictionary mapping custom response_id's to their label
         """
+        if self.custom_response_id_to_label_map is not None:
+            return self.custom_response_id_to_label_map
         custom_response_sets = self.audit_json['template_data']['response_sets']
         audit_custom_response_id_to_label_map = dict()
         for response_set in custom_response_sets.keys():
             for response in custom_response_sets[response_set][RESPONSES]:
                 audit_custom_response_id_to_label_map[response['id']] = response[LABEL]
+        self.custom_response_id_to_label_map = audit_custom_response_id_to_label_map
         return audit_custom_response_id_to_label_map
 
     def common_audit_data(self):
         """
-        :return:    Selected sub-properties of the audit_data property of the audit JSON as a list
+        :return:    Selected sub-properties of the audit_data property of the audit JSON as a list, with the category
+                    of the current item
+        """
+        if self.common_audit_columns is None:
+            self.common_audit_columns = self.convert_common_audit_data()
+        audit_data_as_list = list(self.common_audit_columns)
+        audit_data_as_list[self.category_column] = self.item_category
+        return audit_data_as_list
+
+    def convert_common_audit_data(self):
+        """
+        :return:    Selected sub-properties of the audit_data property of the audit JSON as a list, the same for every
+                    item except for the category, whose position is saved in category_column
         """
         audit_data_property = self.audit_json['audit_data']
         template_data_property = self.audit_json['template_data']
@@ -291,6 +382,7 @@ class CsvExporter:
         else:
             audit_data_as_list.append('Untitled Template')
         audit_data_as_list.append(template_data_property['authorship']['author'])
+        self.category_column = len(audit_data_as_list)
         audit_data_as_list.append(self.item_category)
         audit_data_as_list.append(self.get_header_item(header_data, 'DocumentNo'))
         audit_data_as_list.append(self.get_header_item(header_data, 'ConductedOn'))
@@ -343,17 +435,22 @@ class CsvExporter:
         Collects all audit item responses, appends common audit data and returns a 2-dimensional list.
         :return:    2 dimensional list, each list is a single item, which corresponds to a single row
         """
-        self.audit_table = []
+        self.audit_table = list(self.iter_rows())
+        return self.audit_table
+
+    def iter_rows(self):
+        """
+        Converts the audit items one at a time, without building audit_table
+        :return:    generator of lists, each a single item, which corresponds to a single row
+        """
         for item in self.audit_items():
+            if get_json_property(item, INACTIVE) and not self.export_inactive_items:
+                continue
             if item.get('parent_id'):
                 self.item_category = self.get_item_category(item['parent_id'])
             else:
                 self.item_category = EMPTY_RESPONSE
-            row_array = self.item_properties_as_list(item) + self.common_audit_data()
-            if get_json_property(item, INACTIVE) and not self.export_inactive_items:
-                continue
-            self.audit_table.append(row_array)
-        return self.audit_table
+            yield self.item_properties_as_list(item) + self.common_audit_data()
 
     def append_converted_audit_to_bulk_export_file(self, output_csv_path):
         """
@@ -396,229 +493,970 @@ class CsvExporter:
         except Exception:
             csvExporter_logger.exception('Error saving audit_table to ' + output_csv_path)
 
-    def get_item_response(self, item):
+    def item_properties_as_list(self, item):
         """
-        Return item response value
+        Returns selected properties of the audit item JSON as a list
         :param item:    single item in JSON format
-        :return:        response property
+        :return:        array of item data, in format that CSV writer can handle
         """
-        csvExporter_logger = logging.getLogger('csvExporter_logger')
-        response = EMPTY_RESPONSE
         item_type = get_json_property(item, TYPE)
-        if item_type == 'question':
-            response = get_json_property(item, RESPONSES, 'selected', 0, LABEL)
-        elif item_type == 'list':
-            for single_response in get_json_property(item, RESPONSES, 'selected'):
-                if single_response:
-                    response += get_json_property(single_response, LABEL) + '\n'
-            response = response[:-1]
-        elif item_type == 'address':
-            response = get_json_property(item, RESPONSES, 'location_text')
-        elif item_type == 'checkbox':
-            response = bool(get_json_property(item, RESPONSES, 'value'))
-        elif item_type == 'switch':
-            response = get_json_property(item, RESPONSES, 'value')
-        elif item_type == 'slider':
-            response = get_json_property(item, RESPONSES, 'value')
-        elif item_type == 'drawing':
-            response = get_json_property(item, RESPONSES, 'image', 'media_id')
-        elif item_type == MEDIA:
-            for image in get_json_property(item, MEDIA):
-                response += '\n' + get_json_property(image, 'media_id')
-            if response:
-                response = response[1:]
-        elif item_type == SIGNATURE:
-            response = get_json_property(item, RESPONSES, 'name')
-        elif item_type == 'smartfield':
-            response = get_json_property(item, 'evaluation')
-        elif item_type == 'datetime':
-            response = self.format_date_time(get_json_property(item, RESPONSES, 'datetime'))
-        elif item_type == 'text' or item_type == 'textsingle':
-            response = get_json_property(item, RESPONSES, 'text')
-        elif item_type == INFORMATION and get_json_property(item, 'options', TYPE) == 'link':
-            response = get_json_property(item, 'options', 'link')
-        elif item_type == 'temperature':
-            response = get_json_property(item, RESPONSES, 'temperature')
-        elif item_type in ['dynamicfield', 'element', 'primeelement', 'asset', 'scanner', 'category', 'section',
-                           INFORMATION]:
-            pass
-        else:
-            # No item type might mean malformed item object, catch and log error accessing item
-            try:
-                csvExporter_logger.error('Unhandled item type: ' + str(item_type) + ' from ' +
-                  self.audit_id() + ', ' + item.get(ID))
-            except Exception:
-                csvExporter_logger.exception('Error parsing item, item likely malformed')
+        return get_item_converter(item_type).row(item, item_type, self)
 
-        return response
 
-    @staticmethod
-    def get_item_response_id(item):
-        """
-        :param item:    single item in JSON format
-        :return:        response ID property
-        """
-        response_id = EMPTY_RESPONSE
-        item_type = get_json_property(item, TYPE)
-        if item_type == 'question':
-            response_id = get_json_property(item, RESPONSES, 'selected', 0, 'id')
-        elif item_type == 'list':
-            for single_response in get_json_property(item, RESPONSES, 'selected'):
-                if single_response:
-                    response_id += get_json_property(single_response, 'id') + '\n'
-            response_id = response_id[:-1]
-        return response_id
+def get_score_property(item, score_key, combined_score_key):
+    """
+    :param item:                single item in JSON format
+    :param score_key:           scoring property to return
+    :param combined_score_key:  scoring property to return if the item has no score_key property
+    :return:                    scoring property or empty string if neither property is an integer
+    """
+    scoring = item.get('scoring')
+    if not isinstance(scoring, dict):
+        return EMPTY_RESPONSE
+    if isinstance(scoring.get(score_key), int):
+        return scoring[score_key]
+    elif isinstance(scoring.get(combined_score_key), int):
+        return scoring[combined_score_key]
+    return EMPTY_RESPONSE
 
-    @staticmethod
-    def get_item_score(item):
+
+class ItemConverter(object):
+    """
+    Converts items to the item columns of a CSV row. Columns that depend on the item type are overridden by the
+    converter of that type, which register_item_converter maps the type to; items whose type has no converter are
+    converted by an UnhandledItemConverter
+    """
+
+    def item_type(self, item, item_type):
         """
-        retrieve score property from item
-        :param item:    single item in JSON format
-        :return:        score property or empty string if property does not exist
+        :param item:        single item in JSON format
+        :param item_type:   item type property
+        :return:            item type column
         """
-        if isinstance(get_json_property(item, 'scoring', SCORE), int):
-            return get_json_property(item, 'scoring', SCORE)
-        elif isinstance(get_json_property(item, 'scoring', COMBINED_SCORE), int):
-            return get_json_property(item, 'scoring', COMBINED_SCORE)
-        else:
-            return EMPTY_RESPONSE
+        return item_type
 
-    @staticmethod
-    def get_item_max_score(item):
+    def label(self, item, csv_exporter):
         """
-        retrieve max score property from item
-        :param item:    single item in JSON format
-        :return:        max score property or empty string if property does not exist
+        :param item:            single item in JSON format
+        :param csv_exporter:    CsvExporter of the audit of the item
+        :return:                label property
         """
-        if isinstance(get_json_property(item, 'scoring', MAX_SCORE), int):
-            return get_json_property(item, 'scoring', MAX_SCORE)
-        elif isinstance(get_json_property(item, 'scoring', COMBINED_MAX_SCORE), int):
-            return get_json_property(item, 'scoring', COMBINED_MAX_SCORE)
-        else:
-            return EMPTY_RESPONSE
+        return get_json_property(item, LABEL)
 
-    @staticmethod
-    def get_item_score_percentage(item):
+    def response(self, item, csv_exporter):
         """
-        retrieve score percentage property from item
-        :param item:    single item in JSON format
-        :return:        score percentage property or empty string if property does not exist
+        :param item:            single item in JSON format
+        :param csv_exporter:    CsvExporter of the audit of the item
+        :return:                response property
         """
-        if isinstance(get_json_property(item, 'scoring', SCORE_PERCENTAGE), int):
-            return get_json_property(item, 'scoring', SCORE_PERCENTAGE)
-        elif isinstance(get_json_property(item, 'scoring', COMBINED_SCORE_PERCENTAGE), int):
-            return get_json_property(item, 'scoring', COMBINED_SCORE_PERCENTAGE)
-        else:
-            return EMPTY_RESPONSE
+        return EMPTY_RESPONSE
 
-    def get_item_label(self, item):
+    def comment(self, item):
         """
-        retrieve item label property
         :param item:    single item in JSON format
-        :return:        label property
+        :return:        comment property
         """
-        label = EMPTY_RESPONSE
-        item_type = get_json_property(item, TYPE)
-        if item_type == 'smartfield':
-            custom_response_id_to_label_map = self.audit_custom_response_id_to_label_map()
-            conditional_id = get_json_property(item, 'options', 'condition')
-            if conditional_id:
-                label = copy.deepcopy(smartfield_conditional_id_to_statement_map.get(conditional_id)) or EMPTY_RESPONSE
-            for value in get_json_property(item, 'options', 'values'):
-                label += '|'
-                if value in standard_response_id_map.keys():
-                    label += standard_response_id_map[value]
-                elif value in custom_response_id_to_label_map.keys():
-                    label += custom_response_id_to_label_map[value]
-                else:
-                    label += str(value)
-                label += '|'
-            return label
-        else:
-            return get_json_property(item, LABEL)
+        return get_json_property(item, RESPONSES, 'text')
 
-    @staticmethod
-    def get_item_type(item):
+    def media(self, item):
         """
         :param item:    single item in JSON format
-        :return:        item type property
+        :return:        item media href links
         """
-        item_type = get_json_property(item, TYPE)
-        if item_type == INFORMATION:
-            item_type += ' - ' + get_json_property(item, 'options', TYPE)
-        return item_type
+        media_list = []
+        for image in get_json_property(item, MEDIA):
+            if image:
+                media_list.append(image[HREF])
+        return '\n'.join(media_list)
 
-    @staticmethod
-    def get_item_media(item):
+    def location_coordinates(self, item):
         """
         :param item:    single item in JSON format
-        :return:        item media href links
+        :return:        longitude and latitude coordinates
         """
-        item_type = get_json_property(item, TYPE)
-        if item_type == INFORMATION and get_json_property(item, 'options', TYPE) == MEDIA:
-            media_href = get_json_property(item, 'options', MEDIA, HREF)
-        elif item_type in ['drawing', SIGNATURE]:
-            media_href = get_json_property(item, RESPONSES, 'image', HREF)
-        else:
-            media_list = []
-            for image in get_json_property(item, MEDIA):
-                if image:
-                    media_list.append(image[HREF])
-            media_href = '\n'.join(media_list)
-
-        return media_href
+        return [EMPTY_RESPONSE, EMPTY_RESPONSE]
 
-    @staticmethod
-    def get_item_location_coordinates(item):
+    def response_id(self, item):
         """
         :param item:    single item in JSON format
-        :return:        comma separated longitude and latitude coordinates
+        :return:        response ID property
         """
-        item_type = get_json_property(item, TYPE)
-        if item_type == 'address':
-            location_coordinates = get_json_property(item, 'responses', 'location', 'geometry', 'coordinates')
-            if isinstance(location_coordinates, list) and len(location_coordinates):
-                return str(location_coordinates).strip('[]').split(',')
-        return [EMPTY_RESPONSE, EMPTY_RESPONSE]
+        return EMPTY_RESPONSE
 
-    def item_properties_as_list(self, item):
+    def row(self, item, item_type, csv_exporter):
         """
         Returns selected properties of the audit item JSON as a list
-        :param item:    single item in JSON format
-        :return:        array of item data, in format that CSV writer can handle
+        :param item:            single item in JSON format
+        :param item_type:       item type property
+        :param csv_exporter:    CsvExporter of the audit of the item
+        :return:                array of item data, in format that CSV writer can handle
         """
-        location_coordinates = self.get_item_location_coordinates(item)
-        latitude = location_coordinates[1]
-        longitude = location_coordinates[0]
+        location_coordinates = self.location_coordinates(item)
         return [
-            self.get_item_type(item),
-            self.get_item_label(item),
-            self.get_item_response(item),
-            get_json_property(item, RESPONSES, 'text') if item.get(TYPE) not in ['text', 'textsingle'] else EMPTY_RESPONSE,
-            self.get_item_media(item),
-            latitude,
-            longitude,
-            self.get_item_score(item),
-            self.get_item_max_score(item),
-            self.get_item_score_percentage(item),
+            self.item_type(item, item_type),
+            self.label(item, csv_exporter),
+            self.response(item, csv_exporter),
+            self.comment(item),
+            self.media(item),
+            location_coordinates[1],
+            location_coordinates[0],
+            get_score_property(item, SCORE, COMBINED_SCORE),
+            get_score_property(item, MAX_SCORE, COMBINED_MAX_SCORE),
+            get_score_property(item, SCORE_PERCENTAGE, COMBINED_SCORE_PERCENTAGE),
             get_json_property(item, 'options', 'is_mandatory') or False,
             get_json_property(item, RESPONSES, FAILED) or False,
             get_json_property(item, INACTIVE) or False,
             get_json_property(item, ID),
-            self.get_item_response_id(item),
+            self.response_id(item),
             get_json_property(item, PARENT_ID)
         ]
 
 
+class UnhandledItemConverter(ItemConverter):
+    """
+    Converts items of a type with no converter, logging them as unhandled
+    """
+
+    def response(self, item, csv_exporter):
+        csvExporter_logger = logging.getLogger('csvExporter_logger')
+        # No item type might mean malformed item object, catch and log error accessing item
+        try:
+            csvExporter_logger.error('Unhandled item type: ' + str(get_json_property(item, TYPE)) + ' from ' +
+                                     csv_exporter.audit_id() + ', ' + item.get(ID))
+        except Exception:
+            csvExporter_logger.exception('Error parsing item, item likely malformed')
+        return EMPTY_RESPONSE
+
+
+class ResponseConverter(ItemConverter):
+    """
+    Converts items whose response is a single property of the item
+    """
+
+    def __init__(self, *response_path):
+        """
+        :param response_path:   path of the response property in the item, list of keys
+        """
+        self.response_path = response_path
+
+    def response(self, item, csv_exporter):
+        return get_json_property(item, *self.response_path)
+
+
+class TextConverter(ResponseConverter):
+    """
+    Converts text items, whose text is their response rather than a comment
+    """
+
+    def comment(self, item):
+        return EMPTY_RESPONSE
+
+
+class ImageResponseConverter(ResponseConverter):
+    """
+    Converts items whose media is the image of their response, e.g. drawings and signatures
+    """
+
+    def media(self, item):
+        return get_json_property(item, RESPONSES, 'image', HREF)
+
+
+class AddressConverter(ResponseConverter):
+    """
+    Converts address items, the only items with location coordinates
+    """
+
+    def location_coordinates(self, item):
+        location_coordinates = get_json_property(item, RESPONSES, 'location', 'geometry', 'coordinates')
+        if isinstance(location_coordinates, list) and len(location_coordinates):
+            return str(location_coordinates).strip('[]').split(',')
+        return [EMPTY_RESPONSE, EMPTY_RESPONSE]
+
+
+class QuestionConverter(ItemConverter):
+    """
+    Converts question items, which have a single selected response
+    """
+
+    def response(self, item, csv_exporter):
+        return get_json_property(item, RESPONSES, 'selected', 0, LABEL)
+
+    def response_id(self, item):
+        return get_json_property(item, RESPONSES, 'selected', 0, 'id')
+
+
+class ListConverter(ItemConverter):
+    """
+    Converts list items, whose selected responses are separated by new lines
+    """
+
+    @staticmethod
+    def join_selected(item, key):
+        return '\n'.join([get_json_property(single_response, key)
+                          for single_response in get_json_property(item, RESPONSES, 'selected') if single_response])
+
+    def response(self, item, csv_exporter):
+        return self.join_selected(item, LABEL)
+
+    def response_id(self, item):
+        return self.join_selected(item, 'id')
+
+
+class CheckboxConverter(ItemConverter):
+
+    def response(self, item, csv_exporter):
+        return bool(get_json_property(item, RESPONSES, 'value'))
+
+
+class MediaConverter(ItemConverter):
+    """
+    Converts media items, whose media IDs are separated by new lines
+    """
+
+    def response(self, item, csv_exporter):
+        return '\n'.join([get_json_property(image, 'media_id') for image in get_json_property(item, MEDIA)])
+
+
+class DateTimeConverter(ItemConverter):
+
+    def response(self, item, csv_exporter):
+        return csv_exporter.format_date_time(get_json_property(item, RESPONSES, 'datetime'))
+
+
+class SmartfieldConverter(ItemConverter):
+    """
+    Converts smartfield items, labelled with their condition and the responses it applies to
+    """
+
+    def label(self, item, csv_exporter):
+        custom_response_id_to_label_map = csv_exporter.audit_custom_response_id_to_label_map()
+        label = EMPTY_RESPONSE
+        conditional_id = get_json_property(item, 'options', 'condition')
+        if conditional_id:
+            label = smartfield_conditional_id_to_statement_map.get(conditional_id) or EMPTY_RESPONSE
+        for value in get_json_property(item, 'options', 'values'):
+            label += '|'
+            if value in standard_response_id_map:
+                label += standard_response_id_map[value]
+            elif value in custom_response_id_to_label_map:
+                label += custom_response_id_to_label_map[value]
+            else:
+                label += str(value)
+            label += '|'
+        return label
+
+    def response(self, item, csv_exporter):
+        return get_json_property(item, 'evaluation')
+
+
+class InformationConverter(ItemConverter):
+    """
+    Converts information items, typed by the kind of information they show
+    """
+
+    def item_type(self, item, item_type):
+        return item_type + ' - ' + get_json_property(item, 'options', TYPE)
+
+    def response(self, item, csv_exporter):
+        if get_json_property(item, 'options', TYPE) == 'link':
+            return get_json_property(item, 'options', 'link')
+        return EMPTY_RESPONSE
+
+    def media(self, item):
+        if get_json_property(item, 'options', TYPE) == MEDIA:
+            return get_json_property(item, 'options', MEDIA, HREF)
+        return ItemConverter.media(self, item)
+
+
+# maps item types to the ItemConverter of their items
+item_converters = {}
+
+unhandled_item_converter = UnhandledItemConverter()
+
+
+def register_item_converter(item_type, item_converter):
+    """
+    Converts the items of item_type with item_converter, replacing any converter already registered for the type
+    :param item_type:       item type property
+    :param item_converter:  ItemConverter instance
+    """
+    item_converters[item_type] = item_converter
+
+
+def get_item_converter(item_type):
+    """
+    :param item_type:   item type property
+    :return:            ItemConverter registered for item_type, or one that logs the item as unhandled
+    """
+    return item_converters.get(item_type, unhandled_item_converter)
+
+
+register_item_converter('question', QuestionConverter())
+register_item_converter('list', ListConverter())
+register_item_converter('address', AddressConverter(RESPONSES, 'location_text'))
+register_item_converter('checkbox', CheckboxConverter())
+register_item_converter('switch', ResponseConverter(RESPONSES, 'value'))
+register_item_converter('slider', ResponseConverter(RESPONSES, 'value'))
+register_item_converter('drawing', ImageResponseConverter(RESPONSES, 'image', 'media_id'))
+register_item_converter(MEDIA, MediaConverter())
+register_item_converter(SIGNATURE, ImageResponseConverter(RESPONSES, 'name'))
+register_item_converter('smartfield', SmartfieldConverter())
+register_item_converter('datetime', DateTimeConverter())
+register_item_converter('text', TextConverter(RESPONSES, 'text'))
+register_item_converter('textsingle', TextConverter(RESPONSES, 'text'))
+register_item_converter(INFORMATION, InformationConverter())
+register_item_converter('temperature', ResponseConverter(RESPONSES, 'temperature'))
+for no_response_item_type in ['dynamicfield', 'element', 'primeelement', 'asset', 'scanner', 'category', 'section']:
+    register_item_converter(no_response_item_type, ItemConverter())
+
+
+class BulkCsvSink(object):
+    """
+    Appends converted audits to the bulk CSV file of their template, named after the template ID
+
+    Files stay open across audits with buffered output, up to max_open_files of them, closing the least recently
+    used when another is needed. Rows are written as each item is converted. Open files are flushed to disk every
+    fsync_interval seconds and when the sink is closed, which a with block does however it is left. The sink may be
+    shared by threads.
+    """
+
+    def __init__(self, export_path, max_open_files=DEFAULT_MAX_OPEN_CSV_FILES, buffer_size=DEFAULT_CSV_BUFFER_SIZE,
+                 fsync_interval=DEFAULT_CSV_FSYNC_INTERVAL, clock=time.time):
+        """
+        :param export_path:     directory to save the bulk CSV files in
+        :param max_open_files:  number of files kept open at once
+        :param buffer_size:     bytes of output buffered for each open file
+        :param fsync_interval:  seconds between flushing the open files to disk
+        :param clock:           function returning the current time in seconds
+        """
+        self.export_path = export_path
+        self.max_open_files = max_open_files
+        self.buffer_size = buffer_size
+        self.fsync_interval = fsync_interval
+        self.clock = clock
+        self.last_fsync = clock()
+        self.open_files = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def csv_path(self, template_id):
+        """
+        :param template_id:  template ID of the audits in the file
+        :return:             path of the bulk CSV file of the template
+        """
+        return os.path.join(self.export_path, template_id + '.csv')
+
+    def write_audit(self, audit_json, export_inactive_items=True):
+        """
+        Append an audit to the bulk CSV file of its template
+        :param audit_json:             audit in JSON format to be converted to CSV
+        :param export_inactive_items:  if False, inactive items are left out
+        :return:                       path of the bulk CSV file
+        """
+        csv_exporter = CsvExporter(audit_json, export_inactive_items, convert=False)
+        with self._lock:
+            csv_file, writer = self.writer_for(audit_json['template_id'])
+            start = csv_file.tell()
+            for row in csv_exporter.iter_rows():
+                writer.writerow(row)
+            self.audit_written(audit_json['template_id'], csv_exporter.audit_id(), start, csv_file.tell())
+            if self.clock() - self.last_fsync >= self.fsync_interval:
+                self.flush(fsync=True)
+            return csv_file.name
+
+    def audit_written(self, template_id, audit_id, start, end):
+        """
+        Called by write_audit once the rows of an audit are written, to be overridden
+        :param template_id:  template ID of the audit
+        :param audit_id:     audit ID of the audit
+        :param start:        offset of the rows of the audit in the bulk CSV file
+        :param end:          offset the rows of the audit end at
+        """
+        pass
+
+    def write_csv_data(self, template_id, csv_data):
+        """
+        Append rows already written as CSV, e.g. by another process, to the bulk CSV file of a template
+        :param template_id:  template ID of the audits of the rows
+        :param csv_data:     the rows as CSV data
+        :return:             path of the bulk CSV file
+        """
+        with self._lock:
+            csv_file, _ = self.writer_for(template_id)
+            csv_file.write(csv_data)
+            if self.clock() - self.last_fsync >= self.fsync_interval:
+                self.flush(fsync=True)
+            return csv_file.name
+
+    def writer_for(self, template_id):
+        """
+        :param template_id:  template ID of the audits in the file
+        :return:             open file and CSV writer of the bulk CSV file of the template, writing the header row
+                             to a new file
+        """
+        with self._lock:
+            if template_id in self.open_files:
+                open_file = self.open_files.pop(template_id)
+                self.open_files[template_id] = open_file
+                return open_file
+            while len(self.open_files) >= self.max_open_files:
+                self.open_files.popitem(last=False)[1][0].close()
+            csv_file = open(self.csv_path(template_id), 'ab', self.buffer_size)
+            writer = csv.writer(csv_file, dialect='excel', quoting=csv.QUOTE_ALL)
+            if csv_file.tell() == 0:
+                writer.writerow(CSV_HEADER_ROW)
+            self.open_files[template_id] = (csv_file, writer)
+            return csv_file, writer
+
+    def flush(self, fsync=False):
+        """
+        Write the buffered output of every open file
+        :param fsync:  if True, also wait for the operating system to write it to disk
+        """
+        with self._lock:
+            for csv_file, _ in self.open_files.values():
+                csv_file.flush()
+                if fsync:
+                    os.fsync(csv_file.fileno())
+            if fsync:
+                self.last_fsync = self.clock()
+
+    def remove(self, template_id):
+        """
+        Delete the bulk CSV file of a template, to write it again from scratch
+        :param template_id:  template ID of the audits in the file
+        """
+        with self._lock:
+            if template_id in self.open_files:
+                self.open_files.pop(template_id)[0].close()
+            if os.path.isfile(self.csv_path(template_id)):
+                os.remove(self.csv_path(template_id))
+
+    def close(self):
+        """
+        Flush and close every open file
+        """
+        with self._lock:
+            self.flush(fsync=True)
+            while self.open_files:
+                self.open_files.popitem(last=False)[1][0].close()
+
+
+def iter_audit_row_ranges(csv_file):
+    """
+    :param csv_file:    bulk CSV file, open for reading in binary mode
+    :return:            generator of tuples of the audit ID, and the offsets the rows of the audit start and end at,
+                        for each run of rows of the same audit in the file
+    """
+    offset = [0]
+
+    def lines():
+        for line in csv_file:
+            offset[0] += len(line)
+            yield line
+
+    audit_id_column = CSV_HEADER_ROW.index('AuditID')
+    audit_rows = None
+    position = 0
+    # the reader does not read ahead, so it has read up to the end of each row it returns
+    for row in csv.reader(lines()):
+        row_start, position = position, offset[0]
+        if len(row) <= audit_id_column or row == CSV_HEADER_ROW:
+            continue
+        if audit_rows is not None and audit_rows[0] == row[audit_id_column] and audit_rows[2] == row_start:
+            audit_rows[2] = position
+            continue
+        if audit_rows is not None:
+            yield tuple(audit_rows)
+        audit_rows = [row[audit_id_column], row_start, position]
+    if audit_rows is not None:
+        yield tuple(audit_rows)
+
+
+class UpsertCsvSink(BulkCsvSink):
+    """
+    A BulkCsvSink that replaces the rows of an audit exported again, rather than adding them a second time
+
+    The offsets of the rows of each audit in the bulk CSV file of its template are kept in an SQLite index, saved by
+    flush. The rows of an audit exported again are appended, and its earlier rows become stale. When the sink is
+    closed, files with more than compaction_ratio of their bytes stale are compacted: written again without their
+    stale rows. compact compacts a file however many of its rows are stale.
+
+    A file that grew past its indexed size, left by an exporter that stopped between flushes, is truncated to it. The
+    sync marker has not moved past the audits of the rows cut off, so they are exported again. A file that is not
+    indexed yet, e.g. one written before upserts were enabled, is read to index the latest rows of each audit in it.
+    """
+
+    def __init__(self, export_path, compaction_ratio=DEFAULT_CSV_COMPACTION_RATIO, **kwargs):
+        """
+        :param export_path:       directory to save the bulk CSV files and their index in
+        :param compaction_ratio:  share of the bytes of a file that may be stale rows before it is compacted on close
+        :param kwargs:            arguments of BulkCsvSink
+        """
+        BulkCsvSink.__init__(self, export_path, **kwargs)
+        self.compaction_ratio = compaction_ratio
+        self.db = sqlite3.connect(os.path.join(export_path, CSV_INDEX_FILENAME), check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS audit_rows (template_id TEXT NOT NULL, audit_id TEXT NOT NULL, '
+                            'start INTEGER NOT NULL, length INTEGER NOT NULL, PRIMARY KEY (template_id, audit_id))')
+            self.db.execute('CREATE TABLE IF NOT EXISTS csv_files (template_id TEXT PRIMARY KEY, '
+                            'size INTEGER NOT NULL, stale INTEGER NOT NULL)')
+
+    def audit_written(self, template_id, audit_id, start, end):
+        with self._lock:
+            previous_rows = self.db.execute('SELECT length FROM audit_rows WHERE template_id = ? AND audit_id = ?',
+                                            (template_id, audit_id)).fetchone()
+            self.db.execute('INSERT OR REPLACE INTO audit_rows VALUES (?, ?, ?, ?)',
+                            (template_id, audit_id, start, end - start))
+            self.db.execute('UPDATE csv_files SET size = ?, stale = stale + ? WHERE template_id = ?',
+                            (end, previous_rows[0] if previous_rows else 0, template_id))
+
+    def writer_for(self, template_id):
+        with self._lock:
+            if template_id not in self.open_files:
+                self.check_file(template_id)
+            return BulkCsvSink.writer_for(self, template_id)
+
+    def check_file(self, template_id):
+        """
+        Make the bulk CSV file of a template and its index agree, truncating the file to its indexed size or indexing
+        it again
+        :param template_id:  template ID of the audits in the file
+        """
+        csv_path = self.csv_path(template_id)
+        size = os.path.getsize(csv_path) if os.path.isfile(csv_path) else 0
+        indexed_file = self.db.execute('SELECT size FROM csv_files WHERE template_id = ?', (template_id,)).fetchone()
+        if indexed_file is not None and size > indexed_file[0]:
+            with open(csv_path, 'r+b') as csv_file:
+                csv_file.truncate(indexed_file[0])
+        elif indexed_file is None or size < indexed_file[0]:
+            self.index_file(template_id)
+
+    def index_file(self, template_id):
+        """
+        Index the rows of each audit in the bulk CSV file of a template, the latest rows of an audit that appears more
+        than once being the live ones
+        :param template_id:  template ID of the audits in the file
+        """
+        csv_path = self.csv_path(template_id)
+        audit_rows = {}
+        stale = 0
+        if os.path.isfile(csv_path):
+            with open(csv_path, 'rb') as csv_file:
+                for audit_id, start, end in iter_audit_row_ranges(csv_file):
+                    if audit_id in audit_rows:
+                        stale += audit_rows[audit_id][1]
+                    audit_rows[audit_id] = (start, end - start)
+        with self._lock:
+            self.db.execute('DELETE FROM audit_rows WHERE template_id = ?', (template_id,))
+            self.db.executemany('INSERT INTO audit_rows VALUES (?, ?, ?, ?)',
+                                [(template_id, audit_id, start, length)
+                                 for audit_id, (start, length) in audit_rows.items()])
+            self.db.execute('INSERT OR REPLACE INTO csv_files VALUES (?, ?, ?)',
+                            (template_id, os.path.getsize(csv_path) if os.path.isfile(csv_path) else 0, stale))
+            # flushed first, so that the index saved never covers rows still buffered
+            self.flush()
+
+    def compact(self, template_id):
+        """
+        Write the bulk CSV file of a template again without its stale rows
+        :param template_id:  template ID of the audits in the file
+        """
+        with self._lock:
+            self.flush()
+            if template_id in self.open_files:
+                self.open_files.pop(template_id)[0].close()
+            self.check_file(template_id)
+            csv_path = self.csv_path(template_id)
+            if not os.path.isfile(csv_path):
+                return
+            compacted_path = csv_path + '.tmp'
+            audit_rows = self.db.execute('SELECT audit_id, start, length FROM audit_rows WHERE template_id = ? '
+                                         'ORDER BY start', (template_id,)).fetchall()
+            with open(csv_path, 'rb') as csv_file, open(compacted_path, 'wb') as compacted_file:
+                csv.writer(compacted_file, dialect='excel', quoting=csv.QUOTE_ALL).writerow(CSV_HEADER_ROW)
+                for audit_id, start, length in audit_rows:
+                    self.db.execute('UPDATE audit_rows SET start = ? WHERE template_id = ? AND audit_id = ?',
+                                    (compacted_file.tell(), template_id, audit_id))
+                    csv_file.seek(start)
+                    compacted_file.write(csv_file.read(length))
+                self.db.execute('UPDATE csv_files SET size = ?, stale = 0 WHERE template_id = ?',
+                                (compacted_file.tell(), template_id))
+                compacted_file.flush()
+                os.fsync(compacted_file.fileno())
+            # if the exporter stops before the index is saved, the file is smaller than indexed and is indexed again
+            replace_file(compacted_path, csv_path)
+            self.db.commit()
+
+    def compact_all(self):
+        """
+        Compact every indexed bulk CSV file, and every bulk CSV file of the export path not indexed yet
+        """
+        with self._lock:
+            template_ids = set(template_id for template_id, in self.db.execute('SELECT template_id FROM csv_files'))
+            template_ids.update(os.path.splitext(file_name)[0] for file_name in os.listdir(self.export_path)
+                                if file_name.startswith('template_') and file_name.endswith('.csv'))
+            for template_id in sorted(template_ids):
+                self.compact(template_id)
+
+    def stale_bytes(self, template_id):
+        """
+        :param template_id:  template ID of the audits in the file
+        :return:             number of bytes of stale rows in the bulk CSV file of the template
+        """
+        with self._lock:
+            indexed_file = self.db.execute('SELECT stale FROM csv_files WHERE template_id = ?',
+                                           (template_id,)).fetchone()
+            return indexed_file[0] if indexed_file else 0
+
+    def flush(self, fsync=False):
+        with self._lock:
+            BulkCsvSink.flush(self, fsync)
+            self.db.commit()
+
+    def remove(self, template_id):
+        with self._lock:
+            BulkCsvSink.remove(self, template_id)
+            self.db.execute('DELETE FROM audit_rows WHERE template_id = ?', (template_id,))
+            self.db.execute('DELETE FROM csv_files WHERE template_id = ?', (template_id,))
+            self.db.commit()
+
+    def close(self):
+        """
+        Flush and close every open file, and compact the files with too many stale rows
+        """
+        with self._lock:
+            BulkCsvSink.close(self)
+            for template_id, in self.db.execute('SELECT template_id FROM csv_files WHERE stale > size * ?',
+                                                 (self.compaction_ratio,)).fetchall():
+                self.compact(template_id)
+            self.db.close()
+
+
+def parquet_schema():
+    """
+    :return:    pyarrow.Schema of the Parquet files, with the columns of CSV_HEADER_ROW
+    """
+    fields = []
+    for column in CSV_HEADER_ROW:
+        if column in FLOAT_COLUMNS:
+            fields.append(pyarrow.field(column, pyarrow.float64()))
+        elif column in BOOLEAN_COLUMNS:
+            fields.append(pyarrow.field(column, pyarrow.bool_()))
+        elif column in DATE_COLUMNS:
+            fields.append(pyarrow.field(column, pyarrow.timestamp('ms', tz='UTC')))
+        else:
+            fields.append(pyarrow.field(column, pyarrow.string()))
+    return pyarrow.schema(fields)
+
+
+def parse_float(value):
+    """
+    :param value:   column value of a CSV row
+    :return:        value as a float, None if it is empty or not a number
+    """
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def parse_date_time(date):
+    """
+    :param date:    date in the format of the audit JSON
+    :return:        datetime, None if date is empty
+    """
+    if date:
+        return datetime.strptime(date, '%Y-%m-%dT%H:%M:%S.%fZ')
+    return None
+
+
+def typed_audit_columns(audit_json, rows):
+    """
+    Convert the CSV rows of an audit to the typed columns of the Parquet files
+    :param audit_json:  audit the rows were converted from
+    :param rows:        list of rows, in the format CsvExporter converts to
+    :return:            dictionary mapping each column of CSV_HEADER_ROW to its list of values
+    """
+    columns = collections.OrderedDict()
+    for index, column in enumerate(CSV_HEADER_ROW):
+        values = [row[index] for row in rows]
+        if column in FLOAT_COLUMNS:
+            values = [parse_float(value) for value in values]
+        elif column in BOOLEAN_COLUMNS:
+            values = [bool(value) for value in values]
+        elif column in DATE_COLUMNS:
+            # the CSV dates are formatted to the minute, the Parquet dates are read from the audit JSON
+            values = [parse_date_time(audit_json['audit_data'].get(DATE_COLUMNS[column]))] * len(rows)
+        else:
+            values = [value if value is None or isinstance(value, type(u'')) else u'{0}'.format(value)
+                      for value in values]
+        columns[column] = values
+    return columns
+
+
+class ParquetSink(object):
+    """
+    Writes converted audits to Parquet files with the columns of the bulk CSV files, typed. Each template's audits are
+    saved in a directory named after the template ID, holding the Parquet files of successive exports, which can be
+    read as one dataset.
+
+    Rows are buffered and written to a file as a row group of row_group_size rows. A Parquet file cannot be read until
+    it is complete, so a file is written under a temporary name and only renamed once commit completes it. The next
+    rows of the template then go to a new file. commit is called when the sink is closed, which a with block does
+    however it is left, and should be called every commit_interval seconds, when commit_due is True. Up to
+    max_open_files files are kept open, committing the least recently used when another is needed. The sink may be
+    shared by threads. Requires pyarrow.
+    """
+
+    def __init__(self, export_path, row_group_size=DEFAULT_PARQUET_ROW_GROUP_SIZE,
+                 compression=DEFAULT_PARQUET_COMPRESSION, max_open_files=DEFAULT_MAX_OPEN_CSV_FILES,
+                 commit_interval=DEFAULT_PARQUET_COMMIT_INTERVAL, clock=time.time):
+        """
+        :param export_path:      directory to save the Parquet directories of the templates in
+        :param row_group_size:   number of rows buffered for each template before they are written
+        :param compression:      compression codec of the Parquet files
+        :param max_open_files:   number of files kept open at once
+        :param commit_interval:  seconds between commits
+        :param clock:            function returning the current time in seconds
+        """
+        if pyarrow is None:
+            raise ImportError('ParquetSink requires pyarrow, install it with: pip install pyarrow')
+        self.export_path = export_path
+        self.row_group_size = row_group_size
+        self.compression = compression
+        self.max_open_files = max_open_files
+        self.commit_interval = commit_interval
+        self.clock = clock
+        self.last_commit = clock()
+        self.schema = parquet_schema()
+        # maps template IDs to their buffered columns, open writer and the file the writer saves to once complete
+        self.buffered_columns = {}
+        self.buffered_rows = {}
+        self.open_files = collections.OrderedDict()
+        self._lock = threading.RLock()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def dataset_path(self, template_id):
+        """
+        :param template_id:  template ID of the audits in the directory
+        :return:             path of the directory of the Parquet files of the template
+        """
+        return os.path.join(self.export_path, PARQUET_DIRNAME, template_id)
+
+    def write_audit(self, audit_json, export_inactive_items=True):
+        """
+        Add an audit to the Parquet file of its template
+        :param audit_json:             audit in JSON format to be converted
+        :param export_inactive_items:  if False, inactive items are left out
+        :return:                       path of the Parquet directory of the template
+        """
+        rows = list(CsvExporter(audit_json, export_inactive_items, convert=False).iter_rows())
+        columns = typed_audit_columns(audit_json, rows)
+        template_id = audit_json['template_id']
+        with self._lock:
+            buffered_columns = self.buffered_columns.setdefault(template_id, dict((column, []) for column in columns))
+            for column, values in columns.items():
+                buffered_columns[column].extend(values)
+            self.buffered_rows[template_id] = self.buffered_rows.get(template_id, 0) + len(rows)
+            if self.buffered_rows[template_id] >= self.row_group_size:
+                self.write_row_group(template_id)
+            return self.dataset_path(template_id)
+
+    def write_row_group(self, template_id):
+        """
+        Write the buffered rows of a template to its open file, opening a new file if it has none
+        :param template_id:  template ID of the rows
+        """
+        with self._lock:
+            buffered_columns = self.buffered_columns.pop(template_id, None)
+            if not self.buffered_rows.pop(template_id, 0):
+                return
+            table = pyarrow.Table.from_arrays([pyarrow.array(buffered_columns[field.name], type=field.type)
+                                               for field in self.schema], schema=self.schema)
+            self.writer_for(template_id)[0].write_table(table, row_group_size=self.row_group_size)
+
+    def writer_for(self, template_id):
+        """
+        :param template_id:  template ID of the audits in the file
+        :return:             open pyarrow.parquet.ParquetWriter of the template and the path of its file once complete
+        """
+        with self._lock:
+            if template_id in self.open_files:
+                open_file = self.open_files.pop(template_id)
+                self.open_files[template_id] = open_file
+                return open_file
+            while len(self.open_files) >= self.max_open_files:
+                self.close_file(next(iter(self.open_files)))
+            dataset_path = self.dataset_path(template_id)
+            if not os.path.isdir(dataset_path):
+                os.makedirs(dataset_path)
+            part = len([file_name for file_name in os.listdir(dataset_path) if file_name.endswith('.parquet')])
+            file_path = os.path.join(dataset_path, 'part-{0:05d}.parquet'.format(part))
+            while os.path.exists(file_path):
+                part += 1
+                file_path = os.path.join(dataset_path, 'part-{0:05d}.parquet'.format(part))
+            writer = pyarrow.parquet.ParquetWriter(file_path + '.tmp', self.schema, compression=self.compression)
+            self.open_files[template_id] = (writer, file_path)
+            return writer, file_path
+
+    def close_file(self, template_id):
+        """
+        Complete the open file of a template and give it its final name
+        :param template_id:  template ID of the audits in the file
+        """
+        with self._lock:
+            writer, file_path = self.open_files.pop(template_id)
+            writer.close()
+            os.rename(file_path + '.tmp', file_path)
+
+    def commit_due(self):
+        """
+        :return:    True if commit_interval seconds have passed since the last commit
+        """
+        return self.clock() - self.last_commit >= self.commit_interval
+
+    def commit(self):
+        """
+        Write the buffered rows and complete every open file, so that every row written so far can be read
+        """
+        with self._lock:
+            for template_id in list(self.buffered_rows):
+                self.write_row_group(template_id)
+            while self.open_files:
+                self.close_file(next(iter(self.open_files)))
+            self.last_commit = self.clock()
+
+    def close(self):
+        """
+        Commit the rows written so far
+        """
+        self.commit()
+
+
+def find_audit_json_files(paths):
+    """
+    :param paths:   audit JSON files, directories searched for JSON files, or glob patterns
+    :return:        sorted list of the paths of the JSON files, each listed once
+    """
+    csvExporter_logger = logging.getLogger('csvExporter_logger')
+    json_paths = set()
+    for path in paths:
+        matches = glob.glob(path)
+        if not matches:
+            csvExporter_logger.warning('No audit JSON files found at ' + path)
+        for match in matches:
+            if os.path.isdir(match):
+                for dir_path, _, file_names in os.walk(match):
+                    json_paths.update(os.path.join(dir_path, file_name) for file_name in file_names
+                                      if file_name.lower().endswith('.json'))
+            else:
+                json_paths.add(match)
+    return sorted(json_paths)
+
+
+def convert_audit_file(task):
+    """
+    Convert an audit JSON file to CSV rows, in a process of bulk_convert
+    :param task:    tuple of the path of the audit JSON file and whether inactive items are exported
+    :return:        tuple of the path, the template ID of the audit and its rows as CSV data, with None for both if
+                    the file could not be converted
+    """
+    json_path, export_inactive_items = task
+    try:
+        with open(json_path, 'r') as json_file:
+            audit_json = json.load(json_file)
+        csv_data = io.BytesIO()
+        writer = csv.writer(csv_data, dialect='excel', quoting=csv.QUOTE_ALL)
+        writer.writerows(CsvExporter(audit_json, export_inactive_items, convert=False).iter_rows())
+        return json_path, audit_json['template_id'], csv_data.getvalue()
+    except Exception:
+        logging.getLogger('csvExporter_logger').exception('Error converting ' + json_path)
+        return json_path, None, None
+
+
+def bulk_convert(json_paths, export_path, jobs=None, export_inactive_items=True,
+                 progress_interval=DEFAULT_PROGRESS_INTERVAL):
+    """
+    Convert audit JSON files to the bulk CSV files of their templates, spread across processes. The rows of each audit
+    are appended in the order of json_paths however the processes finish, so the same files always give the same CSV
+    files
+    :param json_paths:              paths of the audit JSON files
+    :param export_path:             directory to save the bulk CSV files in
+    :param jobs:                    number of processes converting audits, defaults to the number of CPUs. With 1,
+                                    audits are converted in this process
+    :param export_inactive_items:   if False, inactive items are left out
+    :param progress_interval:       number of files converted between progress reports
+    :return:                        number of audits converted
+    """
+    configure_logging()
+    csvExporter_logger = logging.getLogger('csvExporter_logger')
+    tasks = [(json_path, export_inactive_items) for json_path in json_paths]
+    pool = multiprocessing.Pool(jobs) if jobs != 1 else None
+    results = pool.imap(convert_audit_file, tasks, BULK_CONVERSION_CHUNK_SIZE) if pool else \
+        (convert_audit_file(task) for task in tasks)
+    converted = 0
+    started = time.time()
+    try:
+        with BulkCsvSink(export_path) as csv_sink:
+            for index, (json_path, template_id, csv_data) in enumerate(results, 1):
+                if template_id is not None:
+                    csv_sink.write_csv_data(template_id, csv_data)
+                    converted += 1
+                if index % progress_interval == 0 or index == len(tasks):
+                    elapsed = time.time() - started
+                    csvExporter_logger.info('Converted {0} of {1} audit JSON files, {2:.0f} per second'.format(
+                        index, len(tasks), index / elapsed if elapsed else 0))
+    finally:
+        if pool:
+            pool.terminate()
+            pool.join()
+    if converted < len(tasks):
+        csvExporter_logger.error('{0} audit JSON files could not be converted'.format(len(tasks) - converted))
+    return converted
+
+
+def parse_command_line_arguments():
+    """
+    :return:    the command line arguments
+    """
+    parser = argparse.ArgumentParser(description='Convert audit JSON files to CSV')
+    parser.add_argument('paths', nargs='+', help='audit JSON files, directories of them or glob patterns')
+    parser.add_argument('--bulk', metavar='OUTPUT_DIR', help='convert to one CSV file per template in OUTPUT_DIR, '
+                                                             'appending to CSV files already there, instead of one '
+                                                             'CSV file per audit')
+    parser.add_argument('--jobs', type=int, help='number of processes converting audits in bulk, defaults to the '
+                                                 'number of CPUs')
+    return parser.parse_args()
+
+
 def main():
     """
-    saves JSON file as CSV. Path to JSON file provided as command line argument
+    saves JSON files as CSV. Paths to JSON files provided as command line arguments
     """
-    for arg in sys.argv[1:]:
-        audit_json = json.load(open(arg, 'r'))
-        csv_exporter = CsvExporter(audit_json)
-        csv_exporter.save_converted_audit_to_file(os.path.splitext(arg.split('/')[-1])[0] + '.csv',
-                                                  allow_overwrite=True)
+    args = parse_command_line_arguments()
+    configure_logging()
+    json_paths = find_audit_json_files(args.paths)
+    if args.bulk:
+        if not os.path.isdir(args.bulk):
+            os.makedirs(args.bulk)
+        bulk_convert(json_paths, args.bulk, args.jobs)
+    else:
+        for json_path in json_paths:
+            audit_json = json.load(open(json_path, 'r'))
+            csv_exporter = CsvExporter(audit_json)
+            csv_exporter.save_converted_audit_to_file(os.path.splitext(os.path.basename(json_path))[0] + '.csv',
+                                                      allow_overwrite=True)
     print('Exiting')
 
 
@@ -5,19 +5,23 @@
 # virtualtime is imported to patch time.strftime and datetime.datetime.strftime to support pre-1900 and pre-1000 years
 import virtualtime
 import argparse
+import collections
 import errno
-import json
+import hashlib
 import logging
 import os
 import re
 import sys
+import threading
 import time
+from concurrent import futures
 from datetime import datetime
 from datetime import timedelta
 import dateutil.parser
 import yaml
 import pytz
 import shutil
+import sqlite3
 # noinspection PyUnresolvedReferences
 from builtins import input
 from tzlocal import get_localzone
@@ -38,18 +42,85 @@ DEFAULT_SYNC_DELAY_IN_SECONDS = 900
 # Only download audits older than 10 minutes
 DEFAULT_MEDIA_SYNC_OFFSET_IN_SECONDS = 600
 
-# The file that stores the "date modified" of the last successfully synced audit
-SYNC_MARKER_FILENAME = 'last_successful.txt'
+# Number of audits exported at once
+DEFAULT_WORKERS = 1
+
+# Number of PDF and MS Word exports requested, polled and downloaded together before the sync marker is updated
+EXPORT_BATCH_SIZE = 50
+
+# Whether media is saved once in a store shared by every audit and linked into the media directory of each audit
+DEFAULT_MEDIA_STORE = False
+
+# Directory of the export path holding the shared copy of each media file, and the name of its index
+MEDIA_STORE_DIRNAME = 'media_store'
+MEDIA_STORE_INDEX_FILENAME = 'index.sqlite'
+
+# Size in MB the audit cache is kept under, 0 to disable the audit cache
+DEFAULT_AUDIT_CACHE_SIZE_IN_MB = 0
+
+# The file of the export path that caches downloaded audit JSON
+AUDIT_CACHE_FILENAME = 'audit_cache.sqlite'
 
-# The file that stores the ISO date/time string of the last successful actions export
+# Formats that can be exported from the audit cache alone
+OFFLINE_EXPORT_FORMATS = ['json', 'csv', 'parquet', 'sql']
+
+# The database that stores the sync markers and the outcome of each export of each audit
+SYNC_STATE_FILENAME = 'sync_state.sqlite'
+
+# The sync markers kept in the sync state database: the "date modified" of the last successfully synced audit, and
+# the ISO date/time string of the last successful actions export
+AUDITS_SYNC_MARKER = 'audits'
+ACTIONS_SYNC_MARKER = 'actions'
+
+# The files that stored the sync markers before the sync state database, read once to carry them over
+SYNC_MARKER_FILENAME = 'last_successful.txt'
 ACTIONS_SYNC_MARKER_FILENAME = 'last_successful_actions_export.txt'
 
+# Where syncing starts from when there is no sync marker
+BEGINNING_OF_TIME = '2000-01-01T00:00:00.000Z'
+
+# Status of an export of an audit in the sync state database
+EXPORT_PENDING = 'pending'
+EXPORT_DONE = 'done'
+EXPORT_FAILED = 'failed'
+
+# Formats exported for each audit, as opposed to actions
+AUDIT_EXPORT_FORMATS = ['pdf', 'docx', 'csv', 'parquet', 'sql', 'media', 'web-report-link', 'json']
+
+# Formats the API exports from the audit ID alone, without the audit JSON being downloaded
+DOCUMENT_EXPORT_FORMATS = ['pdf', 'docx']
+
 # the file that stores all exported actions in CSV format
 ACTIONS_EXPORT_FILENAME = 'iauditor_actions.csv'
 
+# the columns of the actions CSV file, the values of transform_action_object_to_list
+ACTIONS_HEADER_ROW = [
+    'actionId', 'description', 'assignee', 'priority', 'priorityCode', 'status', 'statusCode', 'dueDatetime', 'audit',
+    'auditId', 'linkedToItem', 'linkedToItemId', 'creatorName', 'creatorId', 'createdDatetime', 'modifiedDatetime',
+    'completedDatetime', 'site', 'title'
+]
+
+# The SQLite database of the sql export format, in the export path, whose actions table also keeps the latest row of
+# every exported action
+SQL_EXPORT_FILENAME = 'iauditor_exports.sqlite'
+
+# the files holding the latest row of every exported action, written on demand from the actions table
+ACTIONS_SNAPSHOT_CSV_FILENAME = 'iauditor_actions_snapshot.csv'
+ACTIONS_SNAPSHOT_PARQUET_FILENAME = 'iauditor_actions_snapshot.parquet'
+ACTIONS_SNAPSHOT_FORMATS = ['csv', 'parquet']
+
+# rows written to the database of the sql export format at once, in one transaction
+DEFAULT_SQL_BATCH_SIZE = 1000
+
+# seconds between commits of the rows of the sql export format, when the sync marker moves
+DEFAULT_SQL_COMMIT_INTERVAL = 30
+
 # Whether to export inactive items to CSV
 DEFAULT_EXPORT_INACTIVE_ITEMS_TO_CSV = True
 
+# Whether the rows of an audit exported again replace its rows in the bulk CSV file, rather than being appended
+DEFAULT_CSV_UPSERT = False
+
 # When exporting actions to CSV, if property is None, print this value to CSV
 EMPTY_RESPONSE = ''
 
@@ -64,8 +135,20 @@ PREFERENCES = 'preferences'
 FILENAME_ITEM_ID = 'filename_item_id'
 SYNC_DELAY_IN_SECONDS = 'sync_delay_in_seconds'
 EXPORT_INACTIVE_ITEMS_TO_CSV = 'export_inactive_items_to_csv'
+CSV_UPSERT = 'csv_upsert'
 MEDIA_SYNC_OFFSET_IN_SECONDS = 'media_sync_offset_in_seconds'
 EXPORT_FORMATS = 'export_formats'
+WORKERS = 'workers'
+MEDIA_STORE = 'media_store'
+AUDIT_CACHE_SIZE_IN_MB = 'audit_cache_size_in_mb'
+JSON_BACKEND = 'json_backend'
+
+# Serialises appends to the files shared by all audits, such as bulk CSV exports and Web Report links
+bulk_export_file_lock = threading.Lock()
+
+# SyncState of the exporter, opened by the first call to get_sync_state
+sync_state_lock = threading.Lock()
+sync_state = None
 
 # Used to create a default config file for new users
 DEFAULT_CONFIG_FILE_YAML = [
@@ -76,9 +159,14 @@ DEFAULT_CONFIG_FILE_YAML = [
     '\n    filename:',
     '\n    csv_options:',
     '\n        export_inactive_items: false',
+    '\n        upsert: false',
     '\n    preferences:',
     '\n    sync_delay_in_seconds:',
     '\n    media_sync_offset_in_seconds:',
+    '\n    workers:',
+    '\n    media_store: false',
+    '\n    audit_cache_size_in_mb:',
+    '\n    json_backend: auto',
 ]
 
 
@@ -138,6 +226,29 @@ def load_export_inactive_items_to_csv(logger, config_settings):
         return DEFAULT_EXPORT_INACTIVE_ITEMS_TO_CSV
 
 
+def load_setting_csv_upsert(logger, config_settings):
+    """
+    Attempt to parse the csv upsert option from config settings. Value of true or false is expected.
+    True means the rows of an audit exported again replace its earlier rows in the bulk CSV file.
+    :param logger:           the logger
+    :param config_settings:  config settings loaded from config file
+    :return:                 value of the csv upsert option if valid, else DEFAULT_CSV_UPSERT
+    """
+    try:
+        csv_upsert = (config_settings['export_options'].get('csv_options') or {}).get('upsert')
+        if csv_upsert is None:
+            return DEFAULT_CSV_UPSERT
+        if not isinstance(csv_upsert, bool):
+            logger.info('Invalid upsert value from configuration file, defaulting to {0}'.format(
+                str(DEFAULT_CSV_UPSERT).lower()))
+            return DEFAULT_CSV_UPSERT
+        return csv_upsert
+    except Exception as ex:
+        log_critical_error(logger, ex, 'Exception parsing upsert from the configuration file, defaulting to {0}'.
+                           format(str(DEFAULT_CSV_UPSERT).lower()))
+        return DEFAULT_CSV_UPSERT
+
+
 def load_setting_sync_delay(logger, config_settings):
     """
     Attempt to parse delay between sync loops from config settings
@@ -228,6 +339,94 @@ def load_setting_media_sync_offset(logger, config_settings):
         return DEFAULT_MEDIA_SYNC_OFFSET_IN_SECONDS
 
 
+def load_setting_workers(logger, config_settings):
+    """
+    Attempt to parse the number of audits to export at once from config settings
+
+    :param logger:           the logger
+    :param config_settings:  config settings loaded from config file
+    :return:                 number of workers parsed from file if valid, else DEFAULT_WORKERS
+    """
+    try:
+        workers = config_settings['export_options'].get('workers')
+        if workers is None:
+            return DEFAULT_WORKERS
+        if not isinstance(workers, int) or workers < 1:
+            logger.info('Invalid workers from the configuration file, defaulting to {0}'.format(DEFAULT_WORKERS))
+            return DEFAULT_WORKERS
+        return workers
+    except Exception as ex:
+        log_critical_error(logger, ex, 'Exception parsing workers from the configuration file, defaulting to {0}'.format(
+            DEFAULT_WORKERS))
+        return DEFAULT_WORKERS
+
+
+def load_setting_media_store(logger, config_settings):
+    """
+    Attempt to parse media_store from config settings. Value of true or false is expected.
+    True means each media file is saved once and linked into the media directory of every audit that contains it.
+    :param logger:           the logger
+    :param config_settings:  config settings loaded from config file
+    :return:                 value of media_store if valid, else DEFAULT_MEDIA_STORE
+    """
+    try:
+        media_store = config_settings['export_options'].get('media_store')
+        if media_store is None:
+            return DEFAULT_MEDIA_STORE
+        if not isinstance(media_store, bool):
+            logger.info('Invalid media_store value from configuration file, defaulting to {0}'.format(
+                str(DEFAULT_MEDIA_STORE).lower()))
+            return DEFAULT_MEDIA_STORE
+        return media_store
+    except Exception as ex:
+        log_critical_error(logger, ex, 'Exception parsing media_store from the configuration file, defaulting to {0}'.
+                           format(str(DEFAULT_MEDIA_STORE).lower()))
+        return DEFAULT_MEDIA_STORE
+
+
+def load_setting_audit_cache_size(logger, config_settings):
+    """
+    Attempt to parse the size of the audit cache from config settings
+
+    :param logger:           the logger
+    :param config_settings:  config settings loaded from config file
+    :return:                 audit cache size in MB parsed from file if valid, else DEFAULT_AUDIT_CACHE_SIZE_IN_MB
+    """
+    try:
+        audit_cache_size = config_settings['export_options'].get('audit_cache_size_in_mb')
+        if audit_cache_size is None:
+            return DEFAULT_AUDIT_CACHE_SIZE_IN_MB
+        if not isinstance(audit_cache_size, int) or audit_cache_size < 0:
+            logger.info('Invalid audit_cache_size_in_mb from the configuration file, defaulting to {0}'.format(
+                DEFAULT_AUDIT_CACHE_SIZE_IN_MB))
+            return DEFAULT_AUDIT_CACHE_SIZE_IN_MB
+        return audit_cache_size
+    except Exception as ex:
+        log_critical_error(logger, ex, 'Exception parsing audit_cache_size_in_mb from the configuration file, '
+                                       'defaulting to {0}'.format(DEFAULT_AUDIT_CACHE_SIZE_IN_MB))
+        return DEFAULT_AUDIT_CACHE_SIZE_IN_MB
+
+
+def load_setting_json_backend(logger, config_settings):
+    """
+    Attempt to parse json_backend from config settings. One of auto, orjson, ujson, json or ordered is expected.
+    orjson and ujson must be installed.
+    :param logger:           the logger
+    :param config_settings:  config settings loaded from config file
+    :return:                 value of json_backend if valid, else sp.DEFAULT_JSON_BACKEND
+    """
+    try:
+        json_backend = config_settings['export_options'].get('json_backend')
+        if json_backend is None:
+            return sp.DEFAULT_JSON_BACKEND
+        sp.JsonCodec(json_backend)
+        return json_backend
+    except Exception as ex:
+        log_critical_error(logger, ex, 'Exception parsing json_backend from the configuration file, defaulting to '
+                                       '{0}'.format(sp.DEFAULT_JSON_BACKEND))
+        return sp.DEFAULT_JSON_BACKEND
+
+
 def configure_logging(path_to_log_directory):
     """
     Configure logger
@@ -277,6 +476,7 @@ def save_web_report_link_to_file(logger, export_dir, web_report_data):
     :param logger:          the logger
     :param export_dir:      path to directory for exports
     :param web_report_data:     Data to write to CSV: Template ID, Template name, Audit ID, Audit name, Web Report link
+    :return:                    path of the Web Report links file, None if the link could not be saved
     """
     if not os.path.exists(export_dir):
         logger.info("Creating directory at {0} for Web Report links.".format(export_dir))
@@ -291,6 +491,7 @@ def save_web_report_link_to_file(logger, export_dir, web_report_data):
                 web_report_link_csv.close()
         except Exception as ex:
             log_critical_error(logger, ex, 'Exception while writing' + file_path + ' to file')
+            return None
     else:
         logger.info('Creating ' + file_path)
         logger.info('Appending web report to ' + file_path)
@@ -302,36 +503,44 @@ def save_web_report_link_to_file(logger, export_dir, web_report_data):
                 web_report_link_csv.close()
         except Exception as ex:
             log_critical_error(logger, ex, 'Exception while writing' + file_path + ' to file')
+            return None
+    return file_path
 
 
-def save_exported_actions_to_csv_file(logger, export_path, actions_array):
+def save_exported_actions_to_csv_file(logger, export_path, actions):
     """
-    Write Actions to 'iauditor_actions.csv' on disk at specified location
+    Write Actions to 'iauditor_actions.csv' on disk at specified location, row by row as they are received. If the
+    actions cannot all be received, the rows written so far are removed again.
     :param logger:          the logger
     :param export_path:     path to directory for exports
-    :param actions_array:   Array of action objects to be converted to CSV and saved to disk
+    :param actions:         Iterable of action objects to be converted to CSV and saved to disk
+    :return:                Number of actions saved, None if the actions could not all be received
     """
-    if not actions_array:
-        logger.info('No actions returned after ' + get_last_successful_actions_export(logger))
-        return
     filename = ACTIONS_EXPORT_FILENAME
     file_path = os.path.join(export_path, filename)
-    logger.info('Exporting ' + str(len(actions_array)) + ' actions to ' + file_path)
-    if os.path.isfile(file_path):
-        actions_csv = open(file_path, 'ab')
+    action_count = 0
+    with open(file_path, 'ab') as actions_csv:
+        actions_csv.seek(0, os.SEEK_END)
+        original_size = actions_csv.tell()
         actions_csv_wr = csv.writer(actions_csv, dialect='excel', quoting=csv.QUOTE_ALL)
-    else:
-        actions_csv = open(file_path, 'wb')
-        actions_csv_wr = csv.writer(actions_csv, dialect='excel', quoting=csv.QUOTE_ALL)
-        actions_csv_wr.writerow([
-            'actionId', 'description', 'assignee', 'priority', 'priorityCode', 'status', 'statusCode', 'dueDatetime',
-            'audit', 'auditId', 'linkedToItem', 'linkedToItemId', 'creatorName', 'creatorId', 'createdDatetime',
-            'modifiedDatetime', 'completedDatetime', 'site', 'title'
-        ])
-    for action in actions_array:
-        actions_list = transform_action_object_to_list(action)
-        actions_csv_wr.writerow(actions_list)
-        del actions_list
+        try:
+            for action in actions:
+                if action_count == 0 and original_size == 0:
+                    actions_csv_wr.writerow(ACTIONS_HEADER_ROW)
+                actions_csv_wr.writerow(transform_action_object_to_list(action))
+                action_count += 1
+        except IOError as ex:
+            log_critical_error(logger, ex, 'Exception while exporting actions, discarding ' + str(action_count) +
+                               ' actions written to ' + file_path)
+            actions_csv.truncate(original_size)
+            action_count = None
+    if original_size == 0 and not action_count:
+        os.remove(file_path)
+    if action_count == 0:
+        logger.info('No actions returned after ' + get_last_successful_actions_export(logger))
+    elif action_count is not None:
+        logger.info('Exported ' + str(action_count) + ' actions to ' + file_path)
+    return action_count
 
 
 def transform_action_object_to_list(action):
@@ -381,7 +590,7 @@ def save_exported_media_to_file(logger, export_dir, media_file, filename, extens
     try:
         with open(file_path, 'wb') as out_file:
             shutil.copyfileobj(media_file.raw, out_file)
-        del media_file
+        media_file.close()
     except Exception as ex:
         log_critical_error(logger, ex, 'Exception while writing' + file_path + ' to file')
 
@@ -395,6 +604,7 @@ def save_exported_document(logger, export_dir, export_doc, filename, extension):
     :param export_doc:  export document to write
     :param filename:    filename to give exported document
     :param extension:   extension to give exported document
+    :return:            path of the saved document, None if it could not be saved
     """
     file_path = os.path.join(export_dir, filename + '.' + extension)
     if os.path.isfile(file_path):
@@ -402,74 +612,192 @@ def save_exported_document(logger, export_dir, export_doc, filename, extension):
     try:
         with open(file_path, 'wb') as export_file:
             export_file.write(export_doc)
+        return file_path
     except Exception as ex:
         log_critical_error(logger, ex, 'Exception while writing' + file_path + ' to file')
+        return None
+
+
+class SyncState(object):
+    """
+    Sync markers and the outcome of every export of every audit, kept in an SQLite database so each update is
+    committed atomically. An export is pending from the moment it starts, then done with the path it was saved at,
+    or failed. Exports left pending by an interrupted run and failed exports are what is left to do, and can be
+    exported again without searching for audits.
+    """
+
+    def __init__(self, path):
+        """
+        :param path:  path of the SQLite database, created if it does not exist
+        """
+        self._lock = threading.Lock()
+        self.db = sqlite3.connect(path, check_same_thread=False)
+        with self.db:
+            self.db.execute('CREATE TABLE IF NOT EXISTS sync_markers (name TEXT PRIMARY KEY, value TEXT NOT NULL)')
+            self.db.execute('CREATE TABLE IF NOT EXISTS exports (audit_id TEXT NOT NULL, export_format TEXT NOT NULL, '
+                            'modified_at TEXT NOT NULL, status TEXT NOT NULL, attempts INTEGER NOT NULL, '
+                            'output_path TEXT, started_at TEXT NOT NULL, finished_at TEXT, '
+                            'PRIMARY KEY (audit_id, export_format))')
+            self.db.execute('CREATE INDEX IF NOT EXISTS exports_status ON exports (status)')
+
+    def close(self):
+        with self._lock:
+            self.db.close()
+
+    def get_marker(self, name):
+        """
+        :param name:  name of the sync marker
+        :return:      value of the sync marker, None if it was never set
+        """
+        with self._lock:
+            row = self.db.execute('SELECT value FROM sync_markers WHERE name = ?', (name,)).fetchone()
+        return row[0] if row is not None else None
+
+    def set_marker(self, name, value):
+        """
+        :param name:   name of the sync marker
+        :param value:  new value of the sync marker
+        """
+        with self._lock, self.db:
+            self.db.execute('INSERT OR REPLACE INTO sync_markers (name, value) VALUES (?, ?)', (name, value))
+
+    def start(self, audit_id, modified_at, export_format):
+        """
+        Record that an export of an audit started
+        :param audit_id:       audit ID of the audit
+        :param modified_at:    modified_at of the version of the audit being exported
+        :param export_format:  format of the export
+        """
+        now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        with self._lock, self.db:
+            updated = self.db.execute('UPDATE exports SET modified_at = ?, status = ?, attempts = attempts + 1, '
+                                      'started_at = ?, finished_at = NULL WHERE audit_id = ? AND export_format = ?',
+                                      (modified_at, EXPORT_PENDING, now, audit_id, export_format)).rowcount
+            if not updated:
+                self.db.execute('INSERT INTO exports (audit_id, export_format, modified_at, status, attempts, '
+                                'started_at) VALUES (?, ?, ?, ?, 1, ?)',
+                                (audit_id, export_format, modified_at, EXPORT_PENDING, now))
+
+    def finish(self, audit_id, export_format, output_path):
+        """
+        Record the outcome of an export of an audit
+        :param audit_id:       audit ID of the audit
+        :param export_format:  format of the export
+        :param output_path:    path the export was saved at, None if it failed
+        """
+        now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.%fZ')
+        with self._lock, self.db:
+            self.db.execute('UPDATE exports SET status = ?, output_path = ?, finished_at = ? '
+                            'WHERE audit_id = ? AND export_format = ?',
+                            (EXPORT_FAILED if output_path is None else EXPORT_DONE, output_path, now, audit_id,
+                             export_format))
+
+    def status(self, audit_id, export_format):
+        """
+        :return:  dictionary of the status, attempts, output_path, modified_at, started_at and finished_at of the
+                  export of an audit, None if it was never started
+        """
+        with self._lock:
+            row = self.db.execute('SELECT status, attempts, output_path, modified_at, started_at, finished_at '
+                                  'FROM exports WHERE audit_id = ? AND export_format = ?',
+                                  (audit_id, export_format)).fetchone()
+        if row is None:
+            return None
+        return dict(zip(['status', 'attempts', 'output_path', 'modified_at', 'started_at', 'finished_at'], row))
+
+    def remaining(self):
+        """
+        :return:  list of (audit, export formats) of the audits with pending or failed exports, where audit is a
+                  dictionary containing audit_id and modified_at, in the order the audits were modified
+        """
+        with self._lock:
+            rows = self.db.execute('SELECT audit_id, modified_at, export_format FROM exports WHERE status != ? '
+                                   'ORDER BY modified_at, audit_id', (EXPORT_DONE,)).fetchall()
+        remaining = collections.OrderedDict()
+        for audit_id, modified_at, export_format in rows:
+            if audit_id not in remaining:
+                remaining[audit_id] = ({'audit_id': audit_id, 'modified_at': modified_at}, [])
+            remaining[audit_id][1].append(export_format)
+        return list(remaining.values())
+
+    def count(self, status):
+        """
+        :param status:  EXPORT_PENDING, EXPORT_DONE or EXPORT_FAILED
+        :return:        number of exports with that status
+        """
+        with self._lock:
+            return self.db.execute('SELECT COUNT(*) FROM exports WHERE status = ?', (status,)).fetchone()[0]
+
+
+def get_sync_state():
+    """
+    Open the sync state database in the current directory on first use. A sync marker file left by an earlier
+    version of the exporter is carried over into it.
+    :return:  the SyncState of the exporter
+    """
+    global sync_state
+    with sync_state_lock:
+        if sync_state is None:
+            sync_state = SyncState(SYNC_STATE_FILENAME)
+            for name, filename in [(AUDITS_SYNC_MARKER, SYNC_MARKER_FILENAME),
+                                   (ACTIONS_SYNC_MARKER, ACTIONS_SYNC_MARKER_FILENAME)]:
+                if sync_state.get_marker(name) is None and os.path.isfile(filename):
+                    with open(filename, 'r') as sync_marker_file:
+                        value = sync_marker_file.read().strip()
+                    if value:
+                        sync_state.set_marker(name, value)
+        return sync_state
 
 
 def update_sync_marker_file(date_modified):
     """
-    Replaces the contents of the sync marker file with the most
-    recent modified_at date time value from audit JSON data
+    Replaces the sync marker with the most recent modified_at date time value from audit JSON data
 
     :param date_modified:   modified_at value from most recently downloaded audit JSON
     :return:
     """
-    with open(SYNC_MARKER_FILENAME, 'w') as sync_marker_file:
-        sync_marker_file.write(date_modified)
+    get_sync_state().set_marker(AUDITS_SYNC_MARKER, date_modified)
 
 
 def get_last_successful(logger):
     """
-    Read the date and time of the last successfully exported audit data from the sync marker file
+    Read the date and time of the last successfully exported audit data from the sync marker
 
     :param logger:  the logger
     :return:        A datetime value (or 2000-01-01 if syncing since the 'beginning of time')
     """
-    if os.path.isfile(SYNC_MARKER_FILENAME):
-        with open(SYNC_MARKER_FILENAME, 'r+') as last_run:
-            last_successful = last_run.readlines()[0]
-            last_successful = last_successful.strip()
-
-    else:
-        beginning_of_time = '2000-01-01T00:00:00.000Z'
-        last_successful = beginning_of_time
-        with open(SYNC_MARKER_FILENAME, 'w') as last_run:
-            last_run.write(last_successful)
-        logger.info('Searching for audits since the beginning of time: ' + beginning_of_time)
+    last_successful = get_sync_state().get_marker(AUDITS_SYNC_MARKER)
+    if last_successful is None:
+        last_successful = BEGINNING_OF_TIME
+        logger.info('Searching for audits since the beginning of time: ' + BEGINNING_OF_TIME)
     return last_successful
 
 
 def update_actions_sync_marker_file(logger, date_modified):
     """
-    Replaces the contents of the actions sync marker file with the the date/time string provided
+    Replaces the actions sync marker with the the date/time string provided
     :param logger:   The logger
     :param date_modified:   ISO string
     """
     try:
-        with open(ACTIONS_SYNC_MARKER_FILENAME, 'w') as actions_sync_marker_file:
-            actions_sync_marker_file.write(date_modified)
+        get_sync_state().set_marker(ACTIONS_SYNC_MARKER, date_modified)
     except Exception as ex:
-        log_critical_error(logger, ex, 'Unable to open ' + ACTIONS_SYNC_MARKER_FILENAME + ' for writing')
+        log_critical_error(logger, ex, 'Unable to update the actions sync marker in ' + SYNC_STATE_FILENAME)
         exit()
 
 
 def get_last_successful_actions_export(logger):
     """
-    Reads the actions sync marker file to determine the date and time of the most last successfully exported action.
-    The actions sync marker file is expected to contain a single ISO formatted datetime string.
+    Reads the actions sync marker to determine the date and time of the most last successfully exported action.
     :param logger:  the logger
     :return:        A datetime value (or 2000-01-01 if syncing since the 'beginning of time')
     """
-    if os.path.isfile(ACTIONS_SYNC_MARKER_FILENAME):
-        with open(ACTIONS_SYNC_MARKER_FILENAME, 'r+') as last_run:
-            last_successful_actions_export = last_run.readlines()[0]
-            logger.info('Searching for actions modified after ' + last_successful_actions_export)
+    last_successful_actions_export = get_sync_state().get_marker(ACTIONS_SYNC_MARKER)
+    if last_successful_actions_export is not None:
+        logger.info('Searching for actions modified after ' + last_successful_actions_export)
     else:
-        beginning_of_time = '2000-01-01T00:00:00.000Z'
-        last_successful_actions_export = beginning_of_time
-        with open(ACTIONS_SYNC_MARKER_FILENAME, 'w') as last_run:
-            last_run.write(last_successful_actions_export)
-        logger.info('Searching for actions since the beginning of time: ' + beginning_of_time)
+        last_successful_actions_export = BEGINNING_OF_TIME
+        logger.info('Searching for actions since the beginning of time: ' + BEGINNING_OF_TIME)
     return last_successful_actions_export
 
 
@@ -536,7 +864,8 @@ def load_config_settings(logger, path_to_config_file):
     :return:                    settings dictionary containing values for:
                                 api_token, export_path, preferences,
                                 filename_item_id, sync_delay_in_seconds loaded from
-                                config file, media_sync_offset_in_seconds
+                                config file, media_sync_offset_in_seconds, workers, media_store,
+                                audit_cache_size_in_mb, csv_upsert, json_backend
     """
     config_settings = yaml.safe_load(open(path_to_config_file))
     settings = {
@@ -546,24 +875,32 @@ def load_config_settings(logger, path_to_config_file):
         FILENAME_ITEM_ID: get_filename_item_id(logger, config_settings),
         SYNC_DELAY_IN_SECONDS: load_setting_sync_delay(logger, config_settings),
         EXPORT_INACTIVE_ITEMS_TO_CSV: load_export_inactive_items_to_csv(logger, config_settings),
-        MEDIA_SYNC_OFFSET_IN_SECONDS: load_setting_media_sync_offset(logger, config_settings)
+        CSV_UPSERT: load_setting_csv_upsert(logger, config_settings),
+        MEDIA_SYNC_OFFSET_IN_SECONDS: load_setting_media_sync_offset(logger, config_settings),
+        WORKERS: load_setting_workers(logger, config_settings),
+        MEDIA_STORE: load_setting_media_store(logger, config_settings),
+        AUDIT_CACHE_SIZE_IN_MB: load_setting_audit_cache_size(logger, config_settings),
+        JSON_BACKEND: load_setting_json_backend(logger, config_settings)
     }
 
     return settings
 
 
-def configure(logger, path_to_config_file, export_formats):
+def configure(logger, path_to_config_file, export_formats, workers=None, offline=False):
     """
     instantiate and configure logger, load config settings from file, instantiate SafetyCulture SDK
     :param logger:              the logger
     :param path_to_config_file: path to config file
     :param export_formats:      desired export formats
+    :param workers:             number of audits to export at once, overriding the config file if given
+    :param offline:             if True, open the audit cache even if it is disabled in the config file
     :return:                    instance of SafetyCulture SDK object, config settings
     """
 
     config_settings = load_config_settings(logger, path_to_config_file)
     config_settings[EXPORT_FORMATS] = export_formats
-    sc_client = sp.SafetyCulture(config_settings[API_TOKEN])
+    if workers is not None:
+        config_settings[WORKERS] = workers
 
     if config_settings[EXPORT_PATH] is not None:
         create_directory_if_not_exists(logger, config_settings[EXPORT_PATH])
@@ -572,6 +909,17 @@ def configure(logger, path_to_config_file, export_formats):
         config_settings[EXPORT_PATH] = os.path.join(os.getcwd(), 'exports')
         create_directory_if_not_exists(logger, config_settings[EXPORT_PATH])
 
+    json_codec = sp.JsonCodec(config_settings[JSON_BACKEND])
+    audit_cache = None
+    if config_settings[AUDIT_CACHE_SIZE_IN_MB] > 0 or offline:
+        audit_cache_size = config_settings[AUDIT_CACHE_SIZE_IN_MB] * 1024 * 1024 or sp.DEFAULT_AUDIT_CACHE_MAX_BYTES
+        audit_cache = sp.AuditCache(os.path.join(config_settings[EXPORT_PATH], AUDIT_CACHE_FILENAME), audit_cache_size,
+                                    json_codec)
+    # keep a pooled connection alive for each worker and each media download
+    sc_client = sp.SafetyCulture(config_settings[API_TOKEN], pool_maxsize=max(
+        sp.DEFAULT_POOL_MAXSIZE, config_settings[WORKERS] + sp.DEFAULT_MEDIA_DOWNLOADS_IN_FLIGHT),
+        audit_cache=audit_cache, json_codec=json_codec)
+
     return sc_client, config_settings
 
 
@@ -585,14 +933,34 @@ def parse_command_line_arguments(logger):
                     export_formats passed as argument if any, else 'pdf'
                     list_epreferences if passed as argument, else None
                     do_loop False if passed as argument, else True
+                    workers passed as argument if any, else None
+                    offline True if passed as argument, else False
+                    retry_failed True if passed as argument, else False
+                    compact_csv True if passed as argument, else False
+                    actions_snapshot list of formats passed as argument if any, ['csv'] if passed without formats,
+                    else None
     """
     parser = argparse.ArgumentParser()
     parser.add_argument('--config', help='config file to use, defaults to ' + DEFAULT_CONFIG_FILENAME)
     parser.add_argument('--format', nargs='*', help='formats to download, valid options are pdf, '
-                                                    'json, docx, csv, media, web-report-link, actions')
+                                                    'json, docx, csv, parquet, sql, media, web-report-link, '
+                                                    'actions')
     parser.add_argument('--list_preferences', nargs='*', help='display all preferences, or restrict to specific'
                                                                   ' template_id if supplied as additional argument')
     parser.add_argument('--loop', nargs='*', help='execute continuously until interrupted')
+    parser.add_argument('--workers', type=int, help='number of audits to export at once, overrides the workers '
+                                                    'setting of the config file')
+    parser.add_argument('--offline', action='store_true', help='export json, csv, parquet and sql from the audit '
+                                                               'cache only, '
+                                                               'without contacting the API')
+    parser.add_argument('--retry_failed', action='store_true', help='export again the exports that failed or were '
+                                                                    'interrupted, then exit')
+    parser.add_argument('--compact_csv', action='store_true', help='write the bulk CSV files again without the '
+                                                                   'earlier rows of audits exported again, then exit')
+    parser.add_argument('--actions_snapshot', nargs='*', choices=ACTIONS_SNAPSHOT_FORMATS,
+                        help='write the latest row of every exported action to ' + ACTIONS_SNAPSHOT_CSV_FILENAME +
+                             ' (csv, the default) and/or ' + ACTIONS_SNAPSHOT_PARQUET_FILENAME + ' (parquet), '
+                             'then exit')
     parser.add_argument('--setup', action='store_true', help='Automatically create new directory containing the '
                                                              'necessary config file.'
                         'Directory will be named iAuditor Audit Exports, and will be placed in your current directory')
@@ -614,19 +982,29 @@ def parse_command_line_arguments(logger):
 
     export_formats = ['pdf']
     if args.format is not None and len(args.format) > 0:
-        valid_export_formats = ['json', 'docx', 'pdf', 'csv', 'media', 'web-report-link', 'actions']
+        valid_export_formats = ['json', 'docx', 'pdf', 'csv', 'parquet', 'sql', 'media', 'web-report-link',
+                                'actions']
         export_formats = []
         for option in args.format:
             if option not in valid_export_formats:
-                print('{0} is not a valid export format.  Valid options are pdf, json, docx, csv, web-report-link, '
-                      'media, or actions'.format(option))
+                print('{0} is not a valid export format.  Valid options are pdf, json, docx, csv, parquet, '
+                      'sql, web-report-link, media, or actions'.format(option))
                 logger.info('invalid export format argument: {0}'.format(option))
             else:
                 export_formats.append(option)
 
     loop_enabled = True if args.loop is not None else False
 
-    return config_filename, export_formats, args.list_preferences, loop_enabled
+    if args.workers is not None and args.workers < 1:
+        logger.error('--workers must be at least 1')
+        sys.exit(1)
+
+    actions_snapshot = args.actions_snapshot
+    if actions_snapshot is not None and len(actions_snapshot) == 0:
+        actions_snapshot = ['csv']
+
+    return config_filename, export_formats, args.list_preferences, loop_enabled, args.workers, args.offline, \
+        args.retry_failed, args.compact_csv, actions_snapshot
 
 
 def initial_setup(logger):
@@ -724,14 +1102,103 @@ def export_actions(logger, settings, sc_client):
     """
     logger.info('Exporting iAuditor actions')
     last_successful_actions_export = get_last_successful_actions_export(logger)
-    actions_array = sc_client.get_audit_actions(last_successful_actions_export)
-    if actions_array is not None:
-        logger.info('Found ' + str(len(actions_array)) + ' actions')
-        save_exported_actions_to_csv_file(logger, settings[EXPORT_PATH], actions_array)
-        utc_iso_datetime_now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    # taken before the export starts, so actions modified while it runs are exported again next time
+    utc_iso_datetime_now = datetime.utcnow().strftime('%Y-%m-%dT%H:%M:%S.000Z')
+    actions = sc_client.iter_audit_actions(last_successful_actions_export)
+    # the actions table keeps the latest row of each action, for save_actions_snapshot
+    with open_sql_sink(settings) as sql_sink:
+        saved = save_exported_actions_to_csv_file(logger, settings[EXPORT_PATH],
+                                                  iter_writing_actions(sql_sink, actions))
+    if saved is not None:
         update_actions_sync_marker_file(logger, utc_iso_datetime_now)
 
 
+def iter_writing_actions(sql_sink, actions):
+    """
+    :param sql_sink:  SqlSink to write each action to the database with
+    :param actions:   Iterable of action objects
+    :return:          generator of the actions, each written to the database as it is received
+    """
+    for action in actions:
+        sql_sink.write_action(action)
+        yield action
+
+
+def save_actions_snapshot(logger, settings, snapshot_formats):
+    """
+    Write the latest row of every exported action, from the actions table of the SQL export database, to
+    iauditor_actions_snapshot.csv and/or iauditor_actions_snapshot.parquet in the export path. Each file is written
+    to a temporary file first, which replaces the earlier snapshot once complete.
+    :param logger:            the logger
+    :param settings:          Settings from command line and configuration file
+    :param snapshot_formats:  list of formats of ACTIONS_SNAPSHOT_FORMATS to write
+    """
+    with open_sql_sink(settings) as sql_sink:
+        for snapshot_format in snapshot_formats:
+            if snapshot_format == 'csv':
+                file_path = os.path.join(settings[EXPORT_PATH], ACTIONS_SNAPSHOT_CSV_FILENAME)
+                action_count = save_actions_snapshot_csv(file_path, sql_sink.iter_action_rows())
+            else:
+                file_path = os.path.join(settings[EXPORT_PATH], ACTIONS_SNAPSHOT_PARQUET_FILENAME)
+                action_count = save_actions_snapshot_parquet(file_path, sql_sink.iter_action_rows())
+            logger.info('Saved ' + str(action_count) + ' actions to ' + file_path)
+
+
+def save_actions_snapshot_csv(file_path, action_rows):
+    """
+    :param file_path:    path of the CSV file to write
+    :param action_rows:  iterable of rows of the actions table
+    :return:             number of actions written
+    """
+    action_count = 0
+    with open(file_path + '.tmp', 'wb') as snapshot_csv:
+        snapshot_csv_wr = csv.writer(snapshot_csv, dialect='excel', quoting=csv.QUOTE_ALL)
+        snapshot_csv_wr.writerow(ACTIONS_HEADER_ROW)
+        for row in action_rows:
+            snapshot_csv_wr.writerow([EMPTY_RESPONSE if value is None else value for value in row])
+            action_count += 1
+    csvExporter.replace_file(file_path + '.tmp', file_path)
+    return action_count
+
+
+def save_actions_snapshot_parquet(file_path, action_rows):
+    """
+    Write rows of the actions table to a Parquet file, with priorityCode and statusCode as integers and every other
+    column as strings, the dates being ISO 8601 strings as listed by the API. Requires pyarrow.
+    :param file_path:    path of the Parquet file to write
+    :param action_rows:  iterable of rows of the actions table
+    :return:             number of actions written
+    """
+    pyarrow = csvExporter.pyarrow
+    if pyarrow is None:
+        raise ImportError('Parquet snapshots require pyarrow, install it with: pip install pyarrow')
+    schema = pyarrow.schema([pyarrow.field(column, pyarrow.int64() if column in ['priorityCode', 'statusCode']
+                                           else pyarrow.string()) for column in ACTIONS_HEADER_ROW])
+    writer = pyarrow.parquet.ParquetWriter(file_path + '.tmp', schema,
+                                           compression=csvExporter.DEFAULT_PARQUET_COMPRESSION)
+
+    def write_row_group(rows):
+        writer.write_table(pyarrow.Table.from_arrays([pyarrow.array([row[index] for row in rows], type=field.type)
+                                                      for index, field in enumerate(schema)], schema=schema))
+
+    action_count = 0
+    try:
+        rows = []
+        for row in action_rows:
+            rows.append(row)
+            if len(rows) == csvExporter.DEFAULT_PARQUET_ROW_GROUP_SIZE:
+                write_row_group(rows)
+                action_count += len(rows)
+                rows = []
+        if rows:
+            write_row_group(rows)
+            action_count += len(rows)
+    finally:
+        writer.close()
+    csvExporter.replace_file(file_path + '.tmp', file_path)
+    return action_count
+
+
 def sync_exports(logger, settings, sc_client):
     """
     Perform sync, exporting documents modified since last execution
@@ -742,18 +1209,624 @@ def sync_exports(logger, settings, sc_client):
     """
     if 'actions' in settings[EXPORT_FORMATS]:
         export_actions(logger, settings, sc_client)
-    if not bool(set(settings[EXPORT_FORMATS]) & {'pdf', 'docx', 'csv', 'media', 'web-report-link', 'json'}):
+    if not bool(set(settings[EXPORT_FORMATS]) & set(AUDIT_EXPORT_FORMATS)):
         return
     last_successful = get_last_successful(logger)
-    list_of_audits = sc_client.discover_audits(modified_after=last_successful)
-    if list_of_audits is not None:
-        logger.info(str(list_of_audits['total']) + ' audits discovered')
-        export_count = 1
-        export_total = list_of_audits['total']
-        for audit in list_of_audits['audits']:
-            logger.info('Processing audit (' + str(export_count) + '/' + str(export_total) + ')')
-            process_audit(logger, settings, sc_client, audit)
-            export_count += 1
+    export_audits(logger, settings, sc_client, sc_client.iter_audits(modified_after=last_successful))
+    log_remaining_exports(logger)
+
+
+def retry_failed_exports(logger, settings, sc_client):
+    """
+    Export again the exports that failed or were interrupted, without searching for audits. The sync marker is left
+    as it is.
+
+    :param logger:    the logger
+    :param settings:  Settings from command line and configuration file
+    :param sc_client: Instance of SDK object
+    """
+    remaining = get_sync_state().remaining()
+    logger.info('Retrying the exports of ' + str(len(remaining)) + ' audits')
+    retry_settings = dict(settings)
+    retry_settings[EXPORT_FORMATS] = [export_format for export_format in AUDIT_EXPORT_FORMATS
+                                      if any(export_format in export_formats for _, export_formats in remaining)]
+    export_audits(logger, retry_settings, sc_client, iter(remaining), move_sync_marker=False)
+    log_remaining_exports(logger)
+
+
+def log_remaining_exports(logger):
+    """
+    Log how many exports failed and can be retried
+    :param logger:  the logger
+    """
+    failed = get_sync_state().count(EXPORT_FAILED)
+    if failed:
+        logger.warn('{0} exports have failed, run with --retry_failed to export them again'.format(failed))
+
+
+def export_audits(logger, settings, sc_client, audits, move_sync_marker=True):
+    """
+    Export audits on settings[WORKERS] threads, recording the outcome of every export in the sync state
+
+    :param logger:            the logger
+    :param settings:          Settings from command line and configuration file
+    :param sc_client:         Instance of SDK object
+    :param audits:            iterator of audits, each a dictionary containing audit_id and modified_at, in the order
+                              they were modified. An item may also be a tuple of an audit and the export formats to
+                              export it in, overriding settings[EXPORT_FORMATS].
+    :param move_sync_marker:  if True, move the sync marker past the audits as they are exported
+    """
+    sync_state = get_sync_state()
+    sync_watermark = SyncWatermark()
+    export_requests = collections.OrderedDict()
+    awaiting_documents = []
+    running = {}
+    stopping = False
+    media_downloader = None
+    media_store = None
+    if 'media' in settings[EXPORT_FORMATS]:
+        media_downloader = sp.MediaDownloader(sc_client)
+        if settings[MEDIA_STORE]:
+            media_store = MediaStore(logger, media_downloader, os.path.join(settings[EXPORT_PATH], MEDIA_STORE_DIRNAME))
+    csv_sink = open_csv_sink(settings) if 'csv' in settings[EXPORT_FORMATS] else None
+    parquet_sink = csvExporter.ParquetSink(settings[EXPORT_PATH]) if 'parquet' in settings[EXPORT_FORMATS] else None
+    sql_sink = open_sql_sink(settings) if 'sql' in settings[EXPORT_FORMATS] else None
+    # sinks whose rows are only saved by a commit, which the sync marker waits for
+    committed_sinks = [sink for sink in [parquet_sink, sql_sink] if sink is not None]
+    try:
+        with futures.ThreadPoolExecutor(max_workers=settings[WORKERS]) as executor:
+            while True:
+                while not stopping and len(running) < settings[WORKERS]:
+                    audit = next(audits, None)
+                    if audit is None:
+                        break
+                    audit_settings = settings
+                    if isinstance(audit, tuple):
+                        audit, export_formats = audit
+                        audit_settings = dict(settings)
+                        audit_settings[EXPORT_FORMATS] = export_formats
+                    position = sync_watermark.add(audit)
+                    logger.info('Processing audit (' + str(position + 1) + ')')
+                    audit_export_requests = collections.OrderedDict()
+                    future = executor.submit(process_audit, logger, audit_settings, sc_client, audit,
+                                             audit_export_requests, media_store or media_downloader, sync_state,
+                                             csv_sink, parquet_sink, sql_sink)
+                    running[future] = (position, audit_export_requests)
+                if not running:
+                    break
+                done, _ = futures.wait(list(running), return_when=futures.FIRST_COMPLETED)
+                for future in done:
+                    position, audit_export_requests = running.pop(future)
+                    try:
+                        exported = future.result()
+                    except Exception as ex:
+                        log_critical_error(logger, ex, 'Exception while processing audit')
+                        exported = False
+                    if exported is False:
+                        if not stopping:
+                            logger.error('Stopping this sync cycle, remaining audits will be exported in the next one')
+                        stopping = True
+                    elif audit_export_requests:
+                        export_requests.update(audit_export_requests)
+                        awaiting_documents.append(position)
+                    else:
+                        sync_watermark.complete(position, exported)
+                if len(export_requests) >= EXPORT_BATCH_SIZE:
+                    export_audit_documents(logger, sc_client, settings, export_requests, sync_state)
+                    for position in awaiting_documents:
+                        sync_watermark.complete(position)
+                    del awaiting_documents[:]
+                if move_sync_marker and all(sink.commit_due() for sink in committed_sinks):
+                    if csv_sink is not None:
+                        # rows of audits the sync marker moves past must not be left in a buffer
+                        csv_sink.flush()
+                    for sink in committed_sinks:
+                        sink.commit()
+                    commit_sync_watermark(logger, sync_watermark)
+        if export_requests:
+            export_audit_documents(logger, sc_client, settings, export_requests, sync_state)
+            for position in awaiting_documents:
+                sync_watermark.complete(position)
+        if move_sync_marker:
+            if csv_sink is not None:
+                csv_sink.flush()
+            for sink in committed_sinks:
+                sink.commit()
+            commit_sync_watermark(logger, sync_watermark)
+    finally:
+        if csv_sink is not None:
+            csv_sink.close()
+        for sink in committed_sinks:
+            sink.close()
+    logger.info(str(sync_watermark.added) + ' audits processed')
+    log_audit_cache_stats(logger, sc_client)
+    if media_downloader is not None:
+        media_downloader.close()
+        log_media_download_stats(logger, media_downloader)
+    if media_store is not None:
+        media_store.close()
+        logger.info('Media store: {0} files linked without downloading, {1} duplicates stored once'.format(
+            media_store.linked, media_store.duplicates))
+
+
+def log_audit_cache_stats(logger, sc_client):
+    """
+    Log how often audits were read from the audit cache instead of downloaded
+    :param logger:     the logger
+    :param sc_client:  instance of SafetyCulture SDK object
+    """
+    stats = sc_client.audit_cache_stats()
+    if stats is not None:
+        logger.info('Audit cache: {0} hits, {1} misses, {2} bytes not downloaded, {3} audits cached in {4} bytes, '
+                    '{5} evicted'.format(stats['hits'], stats['misses'], stats['bytes_saved'], stats['audits'],
+                                         stats['size'], stats['evictions']))
+
+
+def export_offline(logger, settings, audit_cache):
+    """
+    Regenerate the JSON, CSV, Parquet and SQL exports of every cached audit without contacting the API. The bulk CSV
+    file and Parquet directory of each template are written again from scratch, holding the latest version of each
+    cached audit, which also replaces the rows of the audit in the database.
+    :param logger:       the logger
+    :param settings:     Settings from command line and configuration file
+    :param audit_cache:  safetypy.AuditCache to export the audits of
+    """
+    for export_format in settings[EXPORT_FORMATS]:
+        if export_format not in OFFLINE_EXPORT_FORMATS:
+            logger.warn('{0} cannot be exported offline, skipping it'.format(export_format))
+    regenerated_templates = set()
+    exported = 0
+    parquet_sink = csvExporter.ParquetSink(settings[EXPORT_PATH]) if 'parquet' in settings[EXPORT_FORMATS] else None
+    sql_sink = open_sql_sink(settings) if 'sql' in settings[EXPORT_FORMATS] else None
+    try:
+        with open_csv_sink(settings) as csv_sink:
+            for audit_json in audit_cache.iter_audits():
+                export_filename = parse_export_filename(audit_json, settings[FILENAME_ITEM_ID]) or \
+                    audit_json['audit_id']
+                if 'json' in settings[EXPORT_FORMATS]:
+                    export_audit_json(logger, settings, audit_json, export_filename)
+                if audit_json['template_id'] not in regenerated_templates:
+                    regenerated_templates.add(audit_json['template_id'])
+                    if 'csv' in settings[EXPORT_FORMATS]:
+                        csv_sink.remove(audit_json['template_id'])
+                    if parquet_sink is not None:
+                        dataset_path = parquet_sink.dataset_path(audit_json['template_id'])
+                        if os.path.isdir(dataset_path):
+                            shutil.rmtree(dataset_path)
+                if 'csv' in settings[EXPORT_FORMATS]:
+                    export_audit_csv(settings, audit_json, csv_sink)
+                if parquet_sink is not None:
+                    export_audit_parquet(settings, audit_json, parquet_sink)
+                if sql_sink is not None:
+                    export_audit_sql(settings, audit_json, sql_sink)
+                exported += 1
+    finally:
+        if parquet_sink is not None:
+            parquet_sink.close()
+        if sql_sink is not None:
+            sql_sink.close()
+    logger.info(str(exported) + ' cached audits exported')
+
+
+def log_media_download_stats(logger, media_downloader):
+    """
+    Log how many media files were saved and how fast
+    :param logger:            the logger
+    :param media_downloader:  safetypy.MediaDownloader used for the sync cycle
+    """
+    stats = media_downloader.as_dict()
+    if stats['seconds']:
+        logger.info('Media: {0} downloaded, {1} already saved, {2} failed, {3:.1f} items/s, {4:.0f} bytes/s'.format(
+            stats['downloaded'], stats['skipped'], stats['failed'], stats['items_per_second'],
+            stats['bytes_per_second']))
+
+
+class SqlSink(object):
+    """
+    Writes the rows of the bulk CSV files to the audit_items table of a database, and the rows of the actions CSV file
+    to its actions table. The rows of an audit or action written again replace its earlier rows.
+
+    Rows are buffered, then the earlier rows of their audits and actions are deleted and the new rows inserted with
+    executemany, batch_size rows at a time in one transaction. commit writes the buffered rows; it is called when the
+    sink is closed, which a with block does however it is left, and should be called every commit_interval seconds,
+    when commit_due is True. Rows that could not be written stay buffered, to be written with the next batch. The sink
+    may be shared by threads.
+
+    Columns are named as in the CSV files. Scores, coordinates and the audit duration are numbers, Mandatory,
+    FailedResponse and Inactive are booleans and the audit dates are ISO 8601 strings as in the audit JSON, so they
+    sort by date. Any DB-API 2 connection supporting CREATE TABLE and CREATE INDEX IF NOT EXISTS can be given, e.g.
+    SQLite or PostgreSQL, with the paramstyle of its module.
+    """
+
+    def __init__(self, connection, paramstyle='qmark', batch_size=DEFAULT_SQL_BATCH_SIZE,
+                 commit_interval=DEFAULT_SQL_COMMIT_INTERVAL, clock=time.time):
+        """
+        :param connection:       DB-API 2 connection to the database, whose tables are created if they do not exist
+        :param paramstyle:       paramstyle of the module of the connection: qmark, format or pyformat
+        :param batch_size:       number of rows buffered before they are written
+        :param commit_interval:  seconds between commits
+        :param clock:            function returning the current time in seconds
+        """
+        if paramstyle not in ['qmark', 'format', 'pyformat']:
+            raise ValueError('Unsupported paramstyle: ' + paramstyle)
+        self.connection = connection
+        self.placeholder = '?' if paramstyle == 'qmark' else '%s'
+        self.batch_size = batch_size
+        self.commit_interval = commit_interval
+        self.clock = clock
+        self.last_commit = clock()
+        # rows to write, of each audit mapped to its ID and of each action mapped to its ID
+        self.buffered_audits = collections.OrderedDict()
+        self.buffered_actions = collections.OrderedDict()
+        self.buffered_rows = 0
+        self._lock = threading.RLock()
+        self.create_tables()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.close()
+
+    def create_tables(self):
+        """
+        Create the audit_items and actions tables and their indexes if they do not exist
+        """
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute('CREATE TABLE IF NOT EXISTS audit_items ({0}, PRIMARY KEY (AuditID, ItemID))'.format(
+                ', '.join(column + ' ' + self.column_type(column) for column in csvExporter.CSV_HEADER_ROW)))
+            cursor.execute('CREATE INDEX IF NOT EXISTS audit_items_template ON audit_items (TemplateID)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS audit_items_modified ON audit_items (DateModified)')
+            cursor.execute('CREATE TABLE IF NOT EXISTS actions ({0}, PRIMARY KEY (actionId))'.format(
+                ', '.join(column + ' ' + self.column_type(column) for column in ACTIONS_HEADER_ROW)))
+            cursor.execute('CREATE INDEX IF NOT EXISTS actions_audit ON actions (auditId)')
+            cursor.execute('CREATE INDEX IF NOT EXISTS actions_modified ON actions (modifiedDatetime)')
+            self.connection.commit()
+        finally:
+            cursor.close()
+
+    @staticmethod
+    def column_type(column):
+        """
+        :param column:  name of a column of the audit_items or actions table
+        :return:        SQL type of the column
+        """
+        if column in csvExporter.FLOAT_COLUMNS:
+            return 'DOUBLE PRECISION'
+        if column in csvExporter.BOOLEAN_COLUMNS:
+            return 'BOOLEAN'
+        if column in ['priorityCode', 'statusCode']:
+            return 'INTEGER'
+        if column in ['AuditID', 'ItemID', 'TemplateID', 'DateModified', 'actionId', 'auditId', 'modifiedDatetime']:
+            # keys and indexed columns, which some databases cannot index as TEXT
+            return 'VARCHAR(255)'
+        return 'TEXT'
+
+    def write_audit(self, audit_json, export_inactive_items=True):
+        """
+        Add the rows of an audit, replacing its earlier rows
+        :param audit_json:             audit in JSON format to be converted
+        :param export_inactive_items:  if False, inactive items are left out
+        :return:                       number of rows of the audit
+        """
+        item_id_column = csvExporter.CSV_HEADER_ROW.index('ItemID')
+        # keyed by item ID, which must be unique in an audit
+        rows = collections.OrderedDict()
+        for row in csvExporter.CsvExporter(audit_json, export_inactive_items, convert=False).iter_rows():
+            rows[row[item_id_column]] = self.typed_item_row(audit_json, row)
+        with self._lock:
+            previous_rows = self.buffered_audits.pop(audit_json['audit_id'], [])
+            self.buffered_audits[audit_json['audit_id']] = list(rows.values())
+            self.buffered_rows += len(rows) - len(previous_rows)
+            if self.buffered_rows >= self.batch_size:
+                self.write_batch()
+        return len(rows)
+
+    @staticmethod
+    def typed_item_row(audit_json, row):
+        """
+        :param audit_json:  audit the row was converted from
+        :param row:         row in the format CsvExporter converts to
+        :return:            list of the values of the row, typed as in the audit_items table
+        """
+        typed_row = []
+        for column, value in zip(csvExporter.CSV_HEADER_ROW, row):
+            if column in csvExporter.FLOAT_COLUMNS:
+                value = csvExporter.parse_float(value)
+            elif column in csvExporter.BOOLEAN_COLUMNS:
+                value = bool(value)
+            elif column in csvExporter.DATE_COLUMNS:
+                # the CSV dates are formatted to the minute, the stored dates are read from the audit JSON
+                value = audit_json['audit_data'].get(csvExporter.DATE_COLUMNS[column])
+            typed_row.append(value)
+        return typed_row
+
+    def write_action(self, action):
+        """
+        Add the row of an action, replacing its earlier row
+        :param action:  action object, as listed by the API
+        """
+        row = transform_action_object_to_list(action)
+        for column in [ACTIONS_HEADER_ROW.index('priorityCode'), ACTIONS_HEADER_ROW.index('statusCode')]:
+            row[column] = row[column] if isinstance(row[column], int) else None
+        with self._lock:
+            if self.buffered_actions.pop(row[0], None) is None:
+                self.buffered_rows += 1
+            self.buffered_actions[row[0]] = row
+            if self.buffered_rows >= self.batch_size:
+                self.write_batch()
+
+    def iter_action_rows(self):
+        """
+        Write the buffered rows, then read the rows of the actions table
+        :return:    generator of the rows of the actions table, with the columns of ACTIONS_HEADER_ROW, in the order
+                    the actions were modified
+        """
+        self.commit()
+        cursor = self.connection.cursor()
+        try:
+            cursor.execute('SELECT {0} FROM actions ORDER BY modifiedDatetime, actionId'.format(
+                ', '.join(ACTIONS_HEADER_ROW)))
+            while True:
+                rows = cursor.fetchmany(self.batch_size)
+                if not rows:
+                    break
+                for row in rows:
+                    yield row
+        finally:
+            cursor.close()
+
+    def write_batch(self):
+        """
+        Write the buffered rows in one transaction
+        """
+        with self._lock:
+            if not self.buffered_rows:
+                return
+            cursor = self.connection.cursor()
+            try:
+                self.replace_rows(cursor, 'audit_items', 'AuditID', csvExporter.CSV_HEADER_ROW,
+                                  self.buffered_audits.keys(),
+                                  [row for rows in self.buffered_audits.values() for row in rows])
+                self.replace_rows(cursor, 'actions', 'actionId', ACTIONS_HEADER_ROW, self.buffered_actions.keys(),
+                                  list(self.buffered_actions.values()))
+                self.connection.commit()
+            except Exception:
+                self.connection.rollback()
+                raise
+            finally:
+                cursor.close()
+            self.buffered_audits.clear()
+            self.buffered_actions.clear()
+            self.buffered_rows = 0
+
+    def replace_rows(self, cursor, table, key_column, columns, keys, rows):
+        """
+        Delete the rows of the given keys, then insert the new rows
+        :param cursor:      cursor of the transaction
+        :param table:       name of the table
+        :param key_column:  column the earlier rows are deleted by
+        :param columns:     columns of the table
+        :param keys:        values of key_column of the earlier rows
+        :param rows:        new rows
+        """
+        keys = [(key,) for key in keys]
+        if keys:
+            cursor.executemany('DELETE FROM {0} WHERE {1} = {2}'.format(table, key_column, self.placeholder), keys)
+        if rows:
+            cursor.executemany('INSERT INTO {0} ({1}) VALUES ({2})'.format(
+                table, ', '.join(columns), ', '.join([self.placeholder] * len(columns))), rows)
+
+    def commit_due(self):
+        """
+        :return:    True if commit_interval seconds have passed since the last commit
+        """
+        return self.clock() - self.last_commit >= self.commit_interval
+
+    def commit(self):
+        """
+        Write the buffered rows
+        """
+        with self._lock:
+            self.write_batch()
+            self.last_commit = self.clock()
+
+    def close(self):
+        """
+        Write the buffered rows and close the connection
+        """
+        with self._lock:
+            try:
+                self.commit()
+            finally:
+                self.connection.close()
+
+
+def open_sql_sink(settings):
+    """
+    :param settings:  Settings from command line and configuration file
+    :return:          SqlSink writing to the SQLite database of the export path
+    """
+    return SqlSink(sqlite3.connect(os.path.join(settings[EXPORT_PATH], SQL_EXPORT_FILENAME), check_same_thread=False))
+
+
+class MediaStore(object):
+    """
+    Saves each media file once, however many audits contain it
+
+    Media is downloaded to media_store/<media_id>.<ext> and hardlinked into the media directory of each audit, or
+    copied where the file system does not support links. An index records the size and sha256 of every media file
+    saved, so media already saved by an earlier audit or sync cycle is linked without being requested again, and
+    media with the same content under another media ID shares the same file. It offers the download method of the
+    safetypy.MediaDownloader it wraps, so export_audit_media can use either.
+    """
+
+    def __init__(self, logger, media_downloader, store_path):
+        """
+        :param logger:            the logger
+        :param media_downloader:  safetypy.MediaDownloader to download media missing from the store with
+        :param store_path:        directory to keep the media files and their index in
+        """
+        self.logger = logger
+        self.media_downloader = media_downloader
+        self.store_path = store_path
+        create_directory_if_not_exists(logger, store_path)
+        self._lock = threading.Lock()
+        self.index = sqlite3.connect(os.path.join(store_path, MEDIA_STORE_INDEX_FILENAME), check_same_thread=False)
+        self.index.execute('CREATE TABLE IF NOT EXISTS media '
+                           '(media_id TEXT PRIMARY KEY, file_name TEXT NOT NULL, size INTEGER, sha256 TEXT)')
+        self.index.execute('CREATE INDEX IF NOT EXISTS media_sha256 ON media (sha256)')
+        self.index.commit()
+        self.linked = 0
+        self.duplicates = 0
+
+    def close(self):
+        with self._lock:
+            self.index.close()
+
+    def download(self, audit_id, media_files):
+        """
+        Save the media of one audit, downloading only the media missing from the store
+        :param audit_id:     audit ID of document that contains media
+        :param media_files:  dictionary of media ID to the path to save the media at
+        :return:             dictionary of media ID to the number of bytes downloaded, 0 for media already saved, None
+                             for media that could not be saved
+        """
+        results = {}
+        missing = {}
+        for media_id, file_path in media_files.items():
+            stored_path = self.stored_path(media_id)
+            if stored_path is not None:
+                results[media_id] = 0 if self.link(stored_path, file_path) else None
+            else:
+                missing[media_id] = os.path.join(self.store_path, os.path.basename(file_path))
+        if missing:
+            for media_id, byte_count in self.media_downloader.download(audit_id, missing).items():
+                if byte_count is not None:
+                    stored_path = self.add(media_id, missing[media_id])
+                    if not self.link(stored_path, media_files[media_id]):
+                        byte_count = None
+                results[media_id] = byte_count
+        return results
+
+    def stored_path(self, media_id):
+        """
+        :param media_id:  media ID to look up
+        :return:          path of the stored copy of the media, None if it has not been saved
+        """
+        with self._lock:
+            row = self.index.execute('SELECT file_name FROM media WHERE media_id = ?', (media_id,)).fetchone()
+        if row is None:
+            return None
+        stored_path = os.path.join(self.store_path, row[0])
+        return stored_path if os.path.isfile(stored_path) else None
+
+    def add(self, media_id, stored_path):
+        """
+        Record a media file saved to the store, sharing the file of a media file with the same content if there is one
+        :param media_id:     media ID of the media file
+        :param stored_path:  path the media file was saved at
+        :return:             path of the stored copy of the media
+        """
+        sha256 = hashlib.sha256()
+        with open(stored_path, 'rb') as media_file:
+            for chunk in iter(lambda: media_file.read(sp.DEFAULT_DOWNLOAD_CHUNK_SIZE), b''):
+                sha256.update(chunk)
+        size = os.path.getsize(stored_path)
+        with self._lock:
+            row = self.index.execute('SELECT file_name FROM media WHERE sha256 = ? AND size = ? AND media_id != ?',
+                                     (sha256.hexdigest(), size, media_id)).fetchone()
+            file_name = os.path.basename(stored_path)
+            if row is not None and os.path.isfile(os.path.join(self.store_path, row[0])):
+                file_name = row[0]
+                os.remove(stored_path)
+                self.duplicates += 1
+            self.index.execute('INSERT OR REPLACE INTO media (media_id, file_name, size, sha256) VALUES (?, ?, ?, ?)',
+                               (media_id, file_name, size, sha256.hexdigest()))
+            self.index.commit()
+        return os.path.join(self.store_path, file_name)
+
+    def link(self, stored_path, file_path):
+        """
+        Make file_path a link to the stored copy of a media file, or a copy of it if links are not supported
+        :param stored_path:  path of the stored copy of the media
+        :param file_path:    path to save the media at
+        :return:             True if file_path holds the media, False otherwise
+        """
+        try:
+            if os.path.isfile(file_path):
+                if os.path.samefile(stored_path, file_path):
+                    return True
+                os.remove(file_path)
+            try:
+                os.link(stored_path, file_path)
+            except (AttributeError, OSError):
+                shutil.copyfile(stored_path, file_path)
+            with self._lock:
+                self.linked += 1
+            return True
+        except (IOError, OSError) as ex:
+            self.logger.error('Failed to save media {0} to {1}: {2}'.format(stored_path, file_path, ex))
+            return False
+
+
+class SyncWatermark(object):
+    """
+    The audits of a sync cycle in the order they were discovered, which is the order they were modified in, and how
+    far the sync marker may move. Audits can complete in any order, but the sync marker only moves past an audit
+    once it and every audit before it have completed, so a crash never skips an audit. An audit that fails never
+    completes, which holds the sync marker before it for the rest of the cycle.
+    """
+
+    def __init__(self):
+        self.pending = collections.OrderedDict()
+        self.added = 0
+
+    def add(self, audit):
+        """
+        :param audit:  audit object containing audit_id and modified_at
+        :return:       position of the audit in the sync cycle
+        """
+        position = self.added
+        self.pending[position] = [audit['modified_at'], None]
+        self.added += 1
+        return position
+
+    def complete(self, position, exported=True):
+        """
+        :param position:  position of the audit in the sync cycle
+        :param exported:  False if the audit was skipped, in which case it does not move the sync marker itself
+        """
+        self.pending[position][1] = bool(exported)
+
+    def advance(self):
+        """
+        Forget the audits completed without a gap since the last call
+        :return:  modified_at of the last of them that was exported, None if the sync marker should not move
+        """
+        modified_at = None
+        while self.pending:
+            position = next(iter(self.pending))
+            audit_modified_at, exported = self.pending[position]
+            if exported is None:
+                break
+            del self.pending[position]
+            if exported:
+                modified_at = audit_modified_at
+        return modified_at
+
+
+def commit_sync_watermark(logger, sync_watermark):
+    """
+    Move the sync marker past the audits that completed without a gap
+    :param logger:          the logger
+    :param sync_watermark:  SyncWatermark of the sync cycle
+    """
+    modified_at = sync_watermark.advance()
+    if modified_at is not None:
+        logger.debug('setting last modified to ' + modified_at)
+        update_sync_marker_file(modified_at)
 
 
 def check_if_media_sync_offset_satisfied(logger, settings, audit):
@@ -777,41 +1850,101 @@ def check_if_media_sync_offset_satisfied(logger, settings, audit):
     return True
 
 
-def process_audit(logger, settings, sc_client, audit):
+def audit_json_needed(settings, audit):
+    """
+    The audit JSON is needed to export any format other than PDF and MS Word, to name the exported files after an
+    item of the audit, and to look up the preference of the template of the audit if the audit search did not return
+    its template_id.
+    :param settings:  Settings from command line and configuration file
+    :param audit:     audit from the audit search, containing audit_id, modified_at and usually template_id
+    :return:          True if the audit JSON must be downloaded to export the audit
+    """
+    for export_format in settings[EXPORT_FORMATS]:
+        if export_format in AUDIT_EXPORT_FORMATS and export_format not in DOCUMENT_EXPORT_FORMATS:
+            return True
+    if settings[FILENAME_ITEM_ID] is not None:
+        return True
+    return bool(settings[PREFERENCES]) and 'template_id' not in audit
+
+
+def process_audit(logger, settings, sc_client, audit, export_requests=None, media_downloader=None, sync_state=None,
+                  csv_sink=None, parquet_sink=None, sql_sink=None):
     """
     Export audit in the format specified in settings. Formats include PDF, JSON, CSV, MS Word (docx), media, or
     web report link.
-    :param logger:      The logger
-    :param settings:    Settings from command line and configuration file
-    :param sc_client:   instance of safetypy.SafetyCulture class
-    :param audit:       Audit JSON to be exported
+    :param logger:           The logger
+    :param settings:         Settings from command line and configuration file
+    :param sc_client:        instance of safetypy.SafetyCulture class
+    :param audit:            audit to be exported, from the audit search. Its audit JSON is only downloaded if
+                             audit_json_needed.
+    :param export_requests:  if given, dictionary to add the PDF and MS Word exports of the audit to, mapped to their
+                             file names, instead of exporting them. The sync marker is then left for the caller to
+                             update once they are saved.
+    :param media_downloader: safetypy.MediaDownloader or MediaStore to download the media of the audit with, if any
+    :param sync_state:       SyncState to record the outcome of each export in, if any
+    :param csv_sink:         csvExporter.BulkCsvSink to append the audit to the bulk CSV file with, if any
+    :param parquet_sink:     csvExporter.ParquetSink to add the audit to the Parquet files with, if any
+    :param sql_sink:         SqlSink to write the audit to the database with, if any
+    :return:                 True if the audit was exported, False if the audit could not be downloaded
     """
     if not check_if_media_sync_offset_satisfied(logger, settings, audit):
         return
     audit_id = audit['audit_id']
-    logger.info('downloading ' + audit_id)
-    audit_json = sc_client.get_audit(audit_id)
-    template_id = audit_json['template_id']
+    audit_json = None
+    template_id = audit.get('template_id')
+    if audit_json_needed(settings, audit):
+        logger.info('downloading ' + audit_id)
+        audit_json = sc_client.get_audit(audit_id, modified_at=audit['modified_at'])
+        if audit_json is None:
+            logger.error('Failed to download ' + audit_id)
+            return False
+        template_id = audit_json['template_id']
     preference_id = None
     if settings[PREFERENCES] is not None and template_id in settings[PREFERENCES].keys():
         preference_id = settings[PREFERENCES][template_id]
-    export_filename = parse_export_filename(audit_json, settings[FILENAME_ITEM_ID]) or audit_id
+    export_filename = audit_id
+    if audit_json is not None:
+        export_filename = parse_export_filename(audit_json, settings[FILENAME_ITEM_ID]) or audit_id
     for export_format in settings[EXPORT_FORMATS]:
-        if export_format in ['pdf', 'docx']:
-            export_audit_pdf_word(logger, sc_client, settings, audit_id, preference_id, export_format, export_filename)
-        elif export_format == 'json':
-            export_audit_json(logger, settings, audit_json, export_filename)
-        elif export_format == 'csv':
-            export_audit_csv(settings, audit_json)
-        elif export_format == 'media':
-            export_audit_media(logger, sc_client, settings, audit_json, audit_id, export_filename)
-        elif export_format == 'web-report-link':
-            export_audit_web_report_link(logger, settings, sc_client, audit_json, audit_id, template_id)
-    logger.debug('setting last modified to ' + audit['modified_at'])
-    update_sync_marker_file(audit['modified_at'])
-
-
-def export_audit_pdf_word(logger, sc_client, settings, audit_id, preference_id, export_format, export_filename):
+        if export_format not in AUDIT_EXPORT_FORMATS:
+            continue
+        if sync_state is not None:
+            sync_state.start(audit_id, audit['modified_at'], export_format)
+        if export_format in DOCUMENT_EXPORT_FORMATS and export_requests is not None:
+            export_requests[sp.ExportRequest(audit_id, export_format, preference_id)] = export_filename
+            continue
+        if export_format in DOCUMENT_EXPORT_FORMATS:
+            export_audit_pdf_word(logger, sc_client, settings, audit_id, preference_id, export_format, export_filename,
+                                  sync_state)
+            continue
+        output_path = None
+        try:
+            if export_format == 'json':
+                output_path = export_audit_json(logger, settings, audit_json, export_filename)
+            elif export_format == 'csv':
+                output_path = export_audit_csv(settings, audit_json, csv_sink)
+            elif export_format == 'parquet':
+                output_path = export_audit_parquet(settings, audit_json, parquet_sink)
+            elif export_format == 'sql':
+                output_path = export_audit_sql(settings, audit_json, sql_sink)
+            elif export_format == 'media':
+                output_path = export_audit_media(logger, sc_client, settings, audit_json, audit_id, export_filename,
+                                                 media_downloader)
+            elif export_format == 'web-report-link':
+                output_path = export_audit_web_report_link(logger, settings, sc_client, audit_json, audit_id,
+                                                           template_id)
+        except Exception as ex:
+            log_critical_error(logger, ex, 'Exception while exporting {0} to {1}'.format(audit_id, export_format))
+        if sync_state is not None:
+            sync_state.finish(audit_id, export_format, output_path)
+    if export_requests is None:
+        logger.debug('setting last modified to ' + audit['modified_at'])
+        update_sync_marker_file(audit['modified_at'])
+    return True
+
+
+def export_audit_pdf_word(logger, sc_client, settings, audit_id, preference_id, export_format, export_filename,
+                          sync_state=None):
     """
     Save Audit to disk in PDF or MS Word format
     :param logger:      The logger
@@ -821,9 +1954,40 @@ def export_audit_pdf_word(logger, sc_client, settings, audit_id, preference_id,
     :param preference_id:   Unique preference UUID
     :param export_format:       'pdf' or 'docx' string
     :param export_filename:     String indicating what to name the exported audit file
-    """
-    export_doc = sc_client.get_export(audit_id, preference_id, export_format)
-    save_exported_document(logger, settings[EXPORT_PATH], export_doc, export_filename, export_format)
+    :param sync_state:  SyncState to record the outcome of the export in, if any
+    """
+    export_requests = {sp.ExportRequest(audit_id, export_format, preference_id): export_filename}
+    export_audit_documents(logger, sc_client, settings, export_requests, sync_state)
+
+
+def export_audit_documents(logger, sc_client, settings, export_requests, sync_state=None):
+    """
+    Export a batch of audits to PDF or MS Word together, streaming each document to disk as soon as it is ready
+    :param logger:            The logger
+    :param sc_client:         instance of safetypy.SafetyCulture class
+    :param settings:          Settings from command line and configuration file
+    :param export_requests:   dictionary of safetypy.ExportRequest to the name to give the exported file, emptied once
+                              the batch is exported
+    :param sync_state:        SyncState to record the outcome of each export in, if any
+    """
+    def file_path_for(export_request):
+        file_path = os.path.join(settings[EXPORT_PATH],
+                                 export_requests[export_request] + '.' + export_request.export_format)
+        if os.path.isfile(file_path):
+            logger.info('Overwriting existing report at ' + file_path)
+        return file_path
+
+    logger.info('Exporting ' + str(len(export_requests)) + ' PDF and MS Word documents')
+    for export in sc_client.export_audits(list(export_requests), file_path_for=file_path_for):
+        if export.result.status != sp.EXPORT_SUCCESS:
+            logger.error('{0} export for {1} {2}'.format(export.request.export_format, export.request.audit_id,
+                                                         export.result.status.lower()))
+        elif export.file_path is None:
+            logger.error('Failed to save {0} export for {1}'.format(export.request.export_format,
+                                                                    export.request.audit_id))
+        if sync_state is not None:
+            sync_state.finish(export.request.audit_id, export.request.export_format, export.file_path)
+    export_requests.clear()
 
 
 def export_audit_json(logger, settings, audit_json, export_filename):
@@ -833,25 +1997,82 @@ def export_audit_json(logger, settings, audit_json, export_filename):
     :param settings:    Settings from the command line and configuration file
     :param audit_json:  Audit JSON
     :param export_filename:     String indicating what to name the exported audit file
+    :return:            path of the saved JSON, None if it could not be saved
     """
     export_format = 'json'
-    export_doc = json.dumps(audit_json, indent=4)
-    save_exported_document(logger, settings[EXPORT_PATH], export_doc.encode(), export_filename, export_format)
+    export_doc = sp.JsonCodec(settings.get(JSON_BACKEND, sp.DEFAULT_JSON_BACKEND)).encode(audit_json, indent=True)
+    return save_exported_document(logger, settings[EXPORT_PATH], export_doc, export_filename, export_format)
 
 
-def export_audit_csv(settings, audit_json):
+def export_audit_csv(settings, audit_json, csv_sink=None):
     """
     Save audit CSV to disk.
     :param settings:    Settings from command line and configuration file
     :param audit_json:  Audit JSON
+    :param csv_sink:    csvExporter.BulkCsvSink shared by all audits, if not given the bulk CSV file is opened for this
+                        audit only
+    :return:            path of the CSV file the audit was appended to
+    """
+    if csv_sink is not None:
+        return csv_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+    with bulk_export_file_lock, open_csv_sink(settings, max_open_files=1) as csv_sink:
+        return csv_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+
+
+def open_csv_sink(settings, max_open_files=csvExporter.DEFAULT_MAX_OPEN_CSV_FILES):
+    """
+    :param settings:        Settings from command line and configuration file
+    :param max_open_files:  number of bulk CSV files kept open at once
+    :return:                csvExporter.UpsertCsvSink if the csv upsert option is set, else csvExporter.BulkCsvSink
+    """
+    if settings.get(CSV_UPSERT):
+        return csvExporter.UpsertCsvSink(settings[EXPORT_PATH], max_open_files=max_open_files)
+    return csvExporter.BulkCsvSink(settings[EXPORT_PATH], max_open_files=max_open_files)
+
+
+def compact_csv_files(logger, settings):
+    """
+    Write every bulk CSV file of the export path again without the earlier rows of audits exported more than once
+    :param logger:    the logger
+    :param settings:  Settings from command line and configuration file
+    """
+    with csvExporter.UpsertCsvSink(settings[EXPORT_PATH]) as csv_sink:
+        csv_sink.compact_all()
+    logger.info('Compacted the bulk CSV files of ' + settings[EXPORT_PATH])
+
+
+def export_audit_parquet(settings, audit_json, parquet_sink=None):
+    """
+    Save audit rows to disk as Parquet, with the columns of the bulk CSV file.
+    :param settings:      Settings from command line and configuration file
+    :param audit_json:    Audit JSON
+    :param parquet_sink:  csvExporter.ParquetSink shared by all audits, if not given the audit is saved to a Parquet
+                          file of its own
+    :return:              path of the Parquet directory of the template of the audit
+    """
+    if parquet_sink is not None:
+        return parquet_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+    with bulk_export_file_lock, csvExporter.ParquetSink(settings[EXPORT_PATH], max_open_files=1) as parquet_sink:
+        return parquet_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+
+
+def export_audit_sql(settings, audit_json, sql_sink=None):
+    """
+    Save audit rows to the SQLite database of the export path, replacing the earlier rows of the audit.
+    :param settings:    Settings from command line and configuration file
+    :param audit_json:  Audit JSON
+    :param sql_sink:    SqlSink shared by all audits, if not given the database is opened for this audit only
+    :return:            path of the database
     """
-    csv_exporter = csvExporter.CsvExporter(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
-    csv_export_filename = audit_json['template_id']
-    csv_exporter.append_converted_audit_to_bulk_export_file(
-        os.path.join(settings[EXPORT_PATH], csv_export_filename + '.csv'))
+    if sql_sink is not None:
+        sql_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+    else:
+        with open_sql_sink(settings) as sql_sink:
+            sql_sink.write_audit(audit_json, settings[EXPORT_INACTIVE_ITEMS_TO_CSV])
+    return os.path.join(settings[EXPORT_PATH], SQL_EXPORT_FILENAME)
 
 
-def export_audit_media(logger, sc_client, settings, audit_json, audit_id, export_filename):
+def export_audit_media(logger, sc_client, settings, audit_json, audit_id, export_filename, media_downloader=None):
     """
     Save audit media files to disk
     :param logger:      The logger
@@ -860,17 +2081,28 @@ def export_audit_media(logger, sc_client, settings, audit_json, audit_id, export
     :param audit_json:  Audit JSON
     :param audit_id:    Unique audit UUID
     :param export_filename:     String indicating what to name the exported audit file
+    :param media_downloader:    safetypy.MediaDownloader or MediaStore shared by all audits, if not given a
+                                MediaDownloader is made for this audit
+    :return:            path of the media directory of the audit, None if any media could not be saved
     """
     media_export_path = os.path.join(settings[EXPORT_PATH], 'media', export_filename)
     media_id_list = get_media_from_audit(logger, audit_json)
-    for media_id in media_id_list.keys():
-        media_file = sc_client.get_media(audit_id, media_id)
-        if media_file is None:
+    if not media_id_list:
+        return media_export_path
+    create_directory_if_not_exists(logger, media_export_path)
+    media_files = dict((media_id, os.path.join(media_export_path, media_id + '.' + extension))
+                       for media_id, extension in media_id_list.items())
+    if media_downloader is None:
+        with sp.MediaDownloader(sc_client) as media_downloader:
+            saved_media = media_downloader.download(audit_id, media_files)
+    else:
+        saved_media = media_downloader.download(audit_id, media_files)
+    for media_id, byte_count in saved_media.items():
+        if byte_count is None:
             logger.warn("Failed to save media object {0}".format(media_id))
-            continue
-        media_export_filename = media_id
-        logger.info("Saving media_{0} to disc.".format(media_id))
-        save_exported_media_to_file(logger, media_export_path, media_file, media_export_filename, media_id_list[media_id])
+    saved = len([byte_count for byte_count in saved_media.values() if byte_count is not None])
+    logger.info("Saved {0} of {1} media files of {2}".format(saved, len(media_files), audit_id))
+    return media_export_path if saved == len(media_files) else None
 
 
 def export_audit_web_report_link(logger, settings, sc_client, audit_json, audit_id, template_id):
@@ -882,8 +2114,12 @@ def export_audit_web_report_link(logger, settings, sc_client, audit_json, audit_
     :param audit_json:  Audit JSON
     :param audit_id:    Unique audit UUID
     :param template_id: Unique template UUID
+    :return:            path of the Web Report links file, None if the link could not be saved
     """
     web_report_link = sc_client.get_web_report(audit_id)
+    if web_report_link is None:
+        logger.error('Failed to get the Web Report link of ' + audit_id)
+        return None
     web_report_data = [
         template_id,
         csvExporter.get_json_property(audit_json, 'template_data', 'metadata', 'name'),
@@ -891,7 +2127,8 @@ def export_audit_web_report_link(logger, settings, sc_client, audit_json, audit_
         csvExporter.get_json_property(audit_json, 'audit_data', 'name'),
         web_report_link
     ]
-    save_web_report_link_to_file(logger, settings[EXPORT_PATH], web_report_data)
+    with bulk_export_file_lock:
+        return save_web_report_link_to_file(logger, settings[EXPORT_PATH], web_report_data)
 
 
 def get_media_from_audit(logger, audit_json):
@@ -952,13 +2189,26 @@ def loop(logger, sc_client, settings):
 def main():
     try:
         logger = configure_logger()
-        path_to_config_file, export_formats, preferences_to_list, loop_enabled = parse_command_line_arguments(logger)
-        sc_client, settings = configure(logger, path_to_config_file, export_formats)
+        path_to_config_file, export_formats, preferences_to_list, loop_enabled, workers, offline, retry_failed, \
+            compact_csv, actions_snapshot = parse_command_line_arguments(logger)
+        sc_client, settings = configure(logger, path_to_config_file, export_formats, workers, offline)
 
         if preferences_to_list is not None:
             show_preferences_and_exit(preferences_to_list, sc_client)
 
-        if loop_enabled:
+        if compact_csv:
+            compact_csv_files(logger, settings)
+            logger.info('Completed compacting bulk CSV files, exiting')
+        elif actions_snapshot is not None:
+            save_actions_snapshot(logger, settings, actions_snapshot)
+            logger.info('Completed saving the actions snapshot, exiting')
+        elif offline:
+            export_offline(logger, settings, sc_client.audit_cache)
+            logger.info('Completed offline export, exiting')
+        elif retry_failed:
+            retry_failed_exports(logger, settings, sc_client)
+            logger.info('Completed retrying failed exports, exiting')
+        elif loop_enabled:
             loop(logger, sc_client, settings)
         else:
             sync_exports(logger, settings, sc_client)
@@ -3,9 +3,12 @@
 # Copyright: © SafetyCulture 2016
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import json
+from mock import MagicMock, patch
 
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'exporter'))
 import exporter
@@ -25,6 +28,51 @@ class ExporterTestCase(unittest.TestCase):
         actual_action_transformed_to_array = exporter.transform_action_object_to_list(single_action_json_from_api)
         self.assertEqual(expected_action_transformed_to_array, actual_action_transformed_to_array)
 
+    def test_actions_are_appended_to_csv_file_as_they_are_received(self):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        action = load_json_from_file('single_action_from_api.json')
+        self.assertEqual(exporter.save_exported_actions_to_csv_file(MagicMock(), export_path, iter([action] * 3)), 3)
+        self.assertEqual(exporter.save_exported_actions_to_csv_file(MagicMock(), export_path, iter([action])), 1)
+        with open(os.path.join(export_path, exporter.ACTIONS_EXPORT_FILENAME), 'rb') as actions_csv:
+            self.assertEqual(len(actions_csv.read().splitlines()), 5)
+
+    def test_actions_written_before_a_failed_page_are_removed(self):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        action = load_json_from_file('single_action_from_api.json')
+
+        def failing_actions():
+            yield action
+            raise IOError('Failed to retrieve actions at offset 1')
+
+        exporter.save_exported_actions_to_csv_file(MagicMock(), export_path, iter([action]))
+        file_path = os.path.join(export_path, exporter.ACTIONS_EXPORT_FILENAME)
+        size = os.path.getsize(file_path)
+        self.assertIsNone(exporter.save_exported_actions_to_csv_file(MagicMock(), export_path, failing_actions()))
+        self.assertEqual(os.path.getsize(file_path), size)
+
+    def test_actions_snapshot_holds_the_latest_row_of_each_action(self):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        settings = {exporter.EXPORT_PATH: export_path}
+        action = load_json_from_file('single_action_from_api.json')
+        for title in ['First', 'Second', 'Latest']:
+            with exporter.open_sql_sink(settings) as sql_sink:
+                sql_sink.write_action(dict(action, title=title))
+        exporter.save_actions_snapshot(MagicMock(), settings, ['csv'])
+        with open(os.path.join(export_path, exporter.ACTIONS_SNAPSHOT_CSV_FILENAME), 'rb') as snapshot_csv:
+            rows = list(exporter.csv.reader(snapshot_csv))
+        expected_row = exporter.transform_action_object_to_list(dict(action, title='Latest'))
+        self.assertEqual(rows, [exporter.ACTIONS_HEADER_ROW, [str(value) for value in expected_row]])
+
+    @patch.object(exporter, 'get_last_successful_actions_export', return_value='2000-01-01T00:00:00.000Z')
+    def test_no_file_is_created_without_actions(self, mock_get_last_successful_actions_export):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        self.assertEqual(exporter.save_exported_actions_to_csv_file(MagicMock(), export_path, iter([])), 0)
+        self.assertEqual(os.listdir(export_path), [])
+
 if __name__ == '__main__':
     unittest.main()
 
@@ -3,7 +3,9 @@
 # Copyright: © SafetyCulture 2016
 
 import os
+import shutil
 import sys
+import tempfile
 import unittest
 import json
 
@@ -221,5 +223,188 @@ class ExporterTestCase(unittest.TestCase):
         os.remove('test 37.csv')
 
 
+class CsvExporterLookupTestCase(unittest.TestCase):
+
+    def test_each_row_has_the_category_of_its_item(self):
+        audit_json = json.load(open(os.path.join(ExporterTestCase.path_to_test_files,
+                                                 'unit_test_single_checkbox_checked.json'), 'r'))
+        item = [item for item in audit_json['items'] if item.get('type') == 'checkbox'][0]
+        audit_json['items'] = [
+            {'item_id': 'section_1', 'label': 'First', 'type': 'section'},
+            dict(item, item_id='item_1', parent_id='section_1'),
+            {'item_id': 'section_2', 'label': 'Second', 'type': 'category', 'parent_id': 'section_1'},
+            dict(item, item_id='item_2', parent_id='section_2'),
+            dict(item, item_id='item_3', parent_id='section_1')
+        ]
+        csv_exporter = csv.CsvExporter(audit_json)
+        category_column = csv.CSV_HEADER_ROW.index('ItemCategory')
+        self.assertEqual([row[category_column] for row in csv_exporter.audit_table[-5:]],
+                         ['', 'First', 'First', 'Second', 'First'])
+
+    def test_registered_converter_converts_items_of_its_type(self):
+        class RatingConverter(csv.ItemConverter):
+            def response(self, item, csv_exporter):
+                return '{0} stars'.format(item['responses']['rating'])
+
+        audit_json = json.load(open(os.path.join(ExporterTestCase.path_to_test_files,
+                                                 'unit_test_single_checkbox_checked.json'), 'r'))
+        audit_json['items'] = [{'item_id': 'item_1', 'label': 'Service', 'type': 'rating', 'responses': {'rating': 4}}]
+        self.assertEqual(csv.CsvExporter(audit_json).audit_table[-1][:3], ['rating', 'Service', ''])
+        csv.register_item_converter('rating', RatingConverter())
+        self.addCleanup(csv.item_converters.pop, 'rating')
+        self.assertEqual(csv.CsvExporter(audit_json).audit_table[-1][:3], ['rating', 'Service', '4 stars'])
+
+
+class BulkCsvSinkTestCase(unittest.TestCase):
+    path_to_test_files = ExporterTestCase.path_to_test_files
+
+    def setUp(self):
+        self.export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_path)
+
+    def load_audit(self, filename, template_id):
+        audit_json = json.load(open(os.path.join(self.path_to_test_files, filename), 'r'))
+        audit_json['template_id'] = template_id
+        return audit_json
+
+    def test_audits_are_appended_to_the_file_of_their_template(self):
+        audits = [self.load_audit('unit_test_single_checkbox_checked.json', 'template_{0}'.format(index % 3))
+                  for index in range(9)]
+        with csv.BulkCsvSink(self.export_path, max_open_files=2) as csv_sink:
+            for audit_json in audits[:6]:
+                csv_sink.write_audit(audit_json)
+        with csv.BulkCsvSink(self.export_path, max_open_files=2) as csv_sink:
+            for audit_json in audits[6:]:
+                csv_sink.write_audit(audit_json)
+
+        expected_path = os.path.join(self.export_path, 'expected.csv')
+        for index in range(3):
+            expected = csv.CsvExporter(audits[index])
+            expected.audit_table = [csv.CSV_HEADER_ROW] + expected.audit_table * 3
+            expected.write_file(expected_path, 'wb')
+            with open(os.path.join(self.export_path, 'template_{0}.csv'.format(index)), 'rb') as bulk_csv:
+                self.assertEqual(bulk_csv.read(), open(expected_path, 'rb').read())
+
+    def test_rows_are_flushed_at_fsync_interval(self):
+        now = [0]
+        audit_json = self.load_audit('unit_test_single_checkbox_checked.json', 'template_1')
+        csv_path = os.path.join(self.export_path, 'template_1.csv')
+        with csv.BulkCsvSink(self.export_path, fsync_interval=10, clock=lambda: now[0]) as csv_sink:
+            csv_sink.write_audit(audit_json)
+            self.assertEqual(os.path.getsize(csv_path), 0)
+            now[0] = 10
+            csv_sink.write_audit(audit_json)
+            self.assertGreater(os.path.getsize(csv_path), 0)
+
+
+class UpsertCsvSinkTestCase(unittest.TestCase):
+    path_to_test_files = ExporterTestCase.path_to_test_files
+
+    def setUp(self):
+        self.export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_path)
+        audit_json = json.load(open(os.path.join(self.path_to_test_files, 'unit_test_single_checkbox_checked.json')))
+        self.audits = [dict(audit_json, audit_id='audit_{0}'.format(index)) for index in range(4)]
+        self.csv_path = os.path.join(self.export_path, audit_json['template_id'] + '.csv')
+
+    def audit_ids_in_file(self):
+        with open(self.csv_path, 'rb') as csv_file:
+            return [audit_id for audit_id, _, _ in csv.iter_audit_row_ranges(csv_file)]
+
+    def test_audit_exported_again_replaces_its_rows(self):
+        with csv.UpsertCsvSink(self.export_path, compaction_ratio=1) as csv_sink:
+            for audit_json in self.audits:
+                csv_sink.write_audit(audit_json)
+            csv_sink.write_audit(self.audits[1])
+            self.assertGreater(csv_sink.stale_bytes(self.audits[1]['template_id']), 0)
+        self.assertEqual(self.audit_ids_in_file(), ['audit_0', 'audit_1', 'audit_2', 'audit_3', 'audit_1'])
+
+        with csv.UpsertCsvSink(self.export_path, compaction_ratio=0) as csv_sink:
+            csv_sink.write_audit(self.audits[2])
+        self.assertEqual(self.audit_ids_in_file(), ['audit_0', 'audit_3', 'audit_1', 'audit_2'])
+        with csv.BulkCsvSink(self.export_path) as csv_sink:
+            csv_sink.remove(self.audits[0]['template_id'])
+            for audit_json in self.audits:
+                csv_sink.write_audit(audit_json)
+        self.assertEqual(self.audit_ids_in_file(), ['audit_0', 'audit_1', 'audit_2', 'audit_3'])
+
+    def test_rows_written_after_the_last_flush_are_cut_off(self):
+        with csv.UpsertCsvSink(self.export_path) as csv_sink:
+            csv_sink.write_audit(self.audits[0])
+        with open(self.csv_path, 'ab') as csv_file:
+            csv_file.write(b'"rows of an exporter that stopped')
+        with csv.UpsertCsvSink(self.export_path) as csv_sink:
+            csv_sink.write_audit(self.audits[1])
+        self.assertEqual(self.audit_ids_in_file(), ['audit_0', 'audit_1'])
+
+    def test_files_written_without_an_index_are_deduplicated(self):
+        with csv.BulkCsvSink(self.export_path) as csv_sink:
+            for audit_json in self.audits + self.audits[:2]:
+                csv_sink.write_audit(audit_json)
+        with csv.UpsertCsvSink(self.export_path) as csv_sink:
+            csv_sink.compact_all()
+        self.assertEqual(self.audit_ids_in_file(), ['audit_2', 'audit_3', 'audit_0', 'audit_1'])
+        with open(self.csv_path, 'rb') as csv_file:
+            self.assertEqual(csv_file.read().count(b'"ItemType","Label"'), 1)
+
+
+@unittest.skipIf(csv.pyarrow is None, 'requires pyarrow')
+class ParquetSinkTestCase(unittest.TestCase):
+    path_to_test_files = ExporterTestCase.path_to_test_files
+
+    def setUp(self):
+        self.export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_path)
+
+    def test_rows_are_typed_and_readable_once_committed(self):
+        audit_json = json.load(open(os.path.join(self.path_to_test_files, 'unit_test_single_checkbox_checked.json')))
+        dataset_path = os.path.join(self.export_path, csv.PARQUET_DIRNAME, audit_json['template_id'])
+        with csv.ParquetSink(self.export_path, row_group_size=10) as parquet_sink:
+            for _ in range(3):
+                parquet_sink.write_audit(audit_json)
+            self.assertEqual(os.listdir(dataset_path), ['part-00000.parquet.tmp'])
+        with csv.ParquetSink(self.export_path) as parquet_sink:
+            parquet_sink.write_audit(audit_json)
+        self.assertEqual(sorted(os.listdir(dataset_path)), ['part-00000.parquet', 'part-00001.parquet'])
+
+        table = csv.pyarrow.parquet.read_table(dataset_path)
+        rows = csv.CsvExporter(audit_json).audit_table
+        self.assertEqual(table.num_rows, len(rows) * 4)
+        self.assertEqual(table.schema.names, csv.CSV_HEADER_ROW)
+        first_row = table.slice(0, 1).to_pylist()[0]
+        self.assertEqual(first_row['ItemID'], rows[0][csv.CSV_HEADER_ROW.index('ItemID')])
+        self.assertIs(first_row['Inactive'], False)
+        self.assertEqual(first_row['AuditDuration'], float(audit_json['audit_data']['duration']))
+        self.assertEqual(first_row['DateModified'].strftime('%Y-%m-%dT%H:%M:%S'),
+                         audit_json['audit_data']['date_modified'][:19])
+
+
+class BulkConvertTestCase(unittest.TestCase):
+    path_to_test_files = ExporterTestCase.path_to_test_files
+
+    def setUp(self):
+        self.export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_path)
+
+    def bulk_convert(self, output_dir, jobs):
+        output_path = os.path.join(self.export_path, output_dir)
+        os.makedirs(output_path)
+        json_paths = csv.find_audit_json_files([self.path_to_test_files])
+        self.assertEqual(csv.bulk_convert(json_paths, output_path, jobs), len(json_paths))
+        output = {}
+        for file_name in os.listdir(output_path):
+            with open(os.path.join(output_path, file_name), 'rb') as bulk_csv:
+                output[file_name] = bulk_csv.read()
+        return output
+
+    def test_processes_give_the_same_files_as_a_single_process(self):
+        single_process_output = self.bulk_convert('single', 1)
+        self.assertEqual(self.bulk_convert('pool', 3), single_process_output)
+
+        audit_json = json.load(open(os.path.join(self.path_to_test_files, 'unit_test_single_checkbox_checked.json')))
+        template_csv = single_process_output[audit_json['template_id'] + '.csv']
+        self.assertEqual(template_csv.count(b'"ItemType","Label"'), 1)
+
+
 if __name__ == '__main__':
     unittest.main()
@@ -74,6 +74,26 @@ class ExporterTestCase(unittest.TestCase):
         config_settings = [{'media_sync_offset_in_seconds': 0}, {'media_sync_offset_in_seconds': 9000}]
         for config_setting in config_settings:
             self.assertEqual(exp.load_setting_media_sync_offset(logger, config_setting), config_setting['media_sync_offset_in_seconds'])
+    def test_use_default_if_workers_setting_is_missing_or_invalid(self):
+        config_settings = [{'export_options': {}}, {'export_options': {'workers': None}},
+                           {'export_options': {'workers': 0}}, {'export_options': {'workers': 'abc'}}]
+        for config_setting in config_settings:
+            self.assertEqual(exp.load_setting_workers(logger, config_setting), exp.DEFAULT_WORKERS)
+
+    def test_use_user_supplied_workers_if_valid(self):
+        config_setting = {'export_options': {'workers': 8}}
+        self.assertEqual(exp.load_setting_workers(logger, config_setting), 8)
+
+    def test_use_default_if_json_backend_setting_is_missing_or_invalid(self):
+        config_settings = [{'export_options': {}}, {'export_options': {'json_backend': 'yaml'}},
+                           {'export_options': {'json_backend': 3}}]
+        for config_setting in config_settings:
+            self.assertEqual(exp.load_setting_json_backend(logger, config_setting), exp.sp.DEFAULT_JSON_BACKEND)
+
+    def test_use_user_supplied_json_backend_if_valid(self):
+        config_setting = {'export_options': {'json_backend': 'ordered'}}
+        self.assertEqual(exp.load_setting_json_backend(logger, config_setting), 'ordered')
+
 
 if __name__ == '__main__':
     unittest.main()
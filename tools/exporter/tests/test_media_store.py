@@ -0,0 +1,78 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+
+import os
+import shutil
+import sys
+import tempfile
+import unittest
+from mock import MagicMock
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'exporter'))
+import exporter as exp
+
+
+class StubMediaDownloader(object):
+    """
+    Saves each media file with the given content, recording the media it was asked for
+    """
+
+    def __init__(self, contents):
+        self.contents = contents
+        self.requested = []
+
+    def download(self, audit_id, media_files):
+        results = {}
+        for media_id, file_path in media_files.items():
+            self.requested.append(media_id)
+            with open(file_path, 'wb') as media_file:
+                media_file.write(self.contents[media_id])
+            results[media_id] = len(self.contents[media_id])
+        return results
+
+
+class MediaStoreTestCase(unittest.TestCase):
+
+    def setUp(self):
+        self.export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.export_path)
+        self.store_path = os.path.join(self.export_path, exp.MEDIA_STORE_DIRNAME)
+        self.media_downloader = StubMediaDownloader({'logo': b'logo', 'photo_1': b'photo', 'photo_2': b'photo'})
+
+    def media_files(self, audit_id, media_ids):
+        audit_path = os.path.join(self.export_path, 'media', audit_id)
+        if not os.path.isdir(audit_path):
+            os.makedirs(audit_path)
+        return dict((media_id, os.path.join(audit_path, media_id + '.jpg')) for media_id in media_ids)
+
+    def test_media_shared_by_audits_is_downloaded_once(self):
+        media_store = exp.MediaStore(MagicMock(), self.media_downloader, self.store_path)
+        first = self.media_files('audit_1', ['logo', 'photo_1'])
+        second = self.media_files('audit_2', ['logo'])
+        self.assertEqual(media_store.download('audit_1', first), {'logo': 4, 'photo_1': 5})
+        self.assertEqual(media_store.download('audit_2', second), {'logo': 0})
+        media_store.close()
+        self.assertEqual(sorted(self.media_downloader.requested), ['logo', 'photo_1'])
+        self.assertTrue(os.path.samefile(first['logo'], second['logo']))
+        with open(second['logo'], 'rb') as media_file:
+            self.assertEqual(media_file.read(), b'logo')
+
+    def test_index_persists_and_duplicate_content_is_stored_once(self):
+        media_store = exp.MediaStore(MagicMock(), self.media_downloader, self.store_path)
+        media_store.download('audit_1', self.media_files('audit_1', ['photo_1', 'photo_2']))
+        media_store.close()
+        self.assertEqual(media_store.duplicates, 1)
+        self.assertEqual(sorted(os.listdir(self.store_path)), [exp.MEDIA_STORE_INDEX_FILENAME, 'photo_1.jpg'])
+
+        media_store = exp.MediaStore(MagicMock(), self.media_downloader, self.store_path)
+        media_files = self.media_files('audit_2', ['photo_2'])
+        self.assertEqual(media_store.download('audit_2', media_files), {'photo_2': 0})
+        media_store.close()
+        self.assertEqual(len(self.media_downloader.requested), 2)
+        with open(media_files['photo_2'], 'rb') as media_file:
+            self.assertEqual(media_file.read(), b'photo')
+
+
+if __name__ == '__main__':
+    unittest.main()
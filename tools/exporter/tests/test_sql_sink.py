@@ -0,0 +1,73 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+
+import json
+import os
+import shutil
+import sqlite3
+import sys
+import tempfile
+import unittest
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'exporter'))
+import exporter as exp
+
+path_to_test_files = os.path.dirname(__file__)
+
+
+def load_json_from_file(*path):
+    return json.load(open(os.path.join(path_to_test_files, *path), 'r'))
+
+
+class SqlSinkTestCase(unittest.TestCase):
+
+    def setUp(self):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        self.database_path = os.path.join(export_path, exp.SQL_EXPORT_FILENAME)
+
+    def open_sql_sink(self, batch_size=exp.DEFAULT_SQL_BATCH_SIZE):
+        return exp.SqlSink(sqlite3.connect(self.database_path, check_same_thread=False), batch_size=batch_size)
+
+    def query(self, sql, parameters=()):
+        database = sqlite3.connect(self.database_path)
+        try:
+            return database.execute(sql, parameters).fetchall()
+        finally:
+            database.close()
+
+    def test_audit_written_again_replaces_its_rows(self):
+        audit_json = load_json_from_file('csv_test_files', 'unit_test_single_checkbox_checked.json')
+        item_count = len(audit_json['header_items']) + len(audit_json['items'])
+        with self.open_sql_sink(batch_size=item_count * 2) as sql_sink:
+            sql_sink.write_audit(audit_json)
+            self.assertEqual(self.query('SELECT COUNT(*) FROM audit_items'), [(0,)])
+            sql_sink.write_audit(dict(audit_json, audit_id='audit_2'))
+            self.assertEqual(self.query('SELECT COUNT(*) FROM audit_items'), [(item_count * 2,)])
+        self.assertEqual(self.query('SELECT COUNT(*) FROM audit_items WHERE TemplateID = ?',
+                                    (audit_json['template_id'],)), [(item_count * 2,)])
+
+        audit_json['items'] = audit_json['items'][:2]
+        with self.open_sql_sink() as sql_sink:
+            sql_sink.write_audit(audit_json)
+        self.assertEqual(self.query('SELECT COUNT(*) FROM audit_items WHERE AuditID = ?', (audit_json['audit_id'],)),
+                         [(len(audit_json['header_items']) + 2,)])
+        self.assertEqual(self.query('SELECT DISTINCT DateModified, AuditDuration, Inactive FROM audit_items '
+                                    'WHERE AuditID = ?', (audit_json['audit_id'],)),
+                         [(audit_json['audit_data']['date_modified'], audit_json['audit_data']['duration'], 0)])
+
+    def test_action_written_again_replaces_its_row(self):
+        action = load_json_from_file('actions_export_test_files', 'single_action_from_api.json')
+        with self.open_sql_sink() as sql_sink:
+            sql_sink.write_action(action)
+            sql_sink.write_action(dict(action, title='Renamed'))
+        with self.open_sql_sink() as sql_sink:
+            sql_sink.write_action(dict(action, action_id='action_2'))
+        self.assertEqual(self.query('SELECT actionId, title, statusCode FROM actions ORDER BY actionId'),
+                         [('action_2', action['title'], action['status']),
+                          (action['action_id'], 'Renamed', action['status'])])
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,191 @@
+# coding=utf-8
+# Author: SafetyCulture
+# Copyright: © SafetyCulture 2016
+
+import json
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+import time
+import unittest
+from mock import MagicMock, patch
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', '..', 'exporter'))
+import exporter as exp
+from safetypy import safetypy as sp
+
+
+def make_audits(count):
+    return [{'audit_id': 'audit_{0}'.format(index), 'modified_at': '2017-03-{0:02d}T00:00:00.000Z'.format(index + 1)}
+            for index in range(count)]
+
+
+class SyncWatermarkTestCase(unittest.TestCase):
+
+    def test_marker_only_moves_past_audits_completed_without_a_gap(self):
+        sync_watermark = exp.SyncWatermark()
+        audits = make_audits(4)
+        positions = [sync_watermark.add(audit) for audit in audits]
+        sync_watermark.complete(positions[1])
+        self.assertIsNone(sync_watermark.advance())
+        sync_watermark.complete(positions[0])
+        sync_watermark.complete(positions[3])
+        self.assertEqual(sync_watermark.advance(), audits[1]['modified_at'])
+        self.assertIsNone(sync_watermark.advance())
+        sync_watermark.complete(positions[2], exported=None)
+        self.assertEqual(sync_watermark.advance(), audits[3]['modified_at'])
+
+    def test_failed_audit_holds_marker(self):
+        sync_watermark = exp.SyncWatermark()
+        audits = make_audits(3)
+        positions = [sync_watermark.add(audit) for audit in audits]
+        sync_watermark.complete(positions[0])
+        sync_watermark.complete(positions[2])
+        self.assertEqual(sync_watermark.advance(), audits[0]['modified_at'])
+        self.assertIsNone(sync_watermark.advance())
+
+
+class SyncStateTestCase(unittest.TestCase):
+
+    def setUp(self):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        self.sync_state = exp.SyncState(os.path.join(state_dir, exp.SYNC_STATE_FILENAME))
+        self.addCleanup(self.sync_state.close)
+
+    def test_failed_and_interrupted_exports_are_left_to_do(self):
+        audits = make_audits(3)
+        for audit in audits:
+            self.sync_state.start(audit['audit_id'], audit['modified_at'], 'pdf')
+            self.sync_state.start(audit['audit_id'], audit['modified_at'], 'json')
+        self.sync_state.finish('audit_0', 'pdf', '/exports/audit_0.pdf')
+        self.sync_state.finish('audit_0', 'json', '/exports/audit_0.json')
+        self.sync_state.finish('audit_1', 'pdf', None)
+        self.sync_state.finish('audit_1', 'json', '/exports/audit_1.json')
+        self.sync_state.finish('audit_2', 'json', '/exports/audit_2.json')
+        self.assertEqual(self.sync_state.remaining(), [(audits[1], ['pdf']), (audits[2], ['pdf'])])
+        self.assertEqual((self.sync_state.count(exp.EXPORT_DONE), self.sync_state.count(exp.EXPORT_FAILED)), (4, 1))
+
+        self.sync_state.start('audit_1', audits[1]['modified_at'], 'pdf')
+        self.sync_state.finish('audit_1', 'pdf', '/exports/audit_1.pdf')
+        status = self.sync_state.status('audit_1', 'pdf')
+        self.assertEqual((status['status'], status['attempts'], status['output_path']),
+                         (exp.EXPORT_DONE, 2, '/exports/audit_1.pdf'))
+
+    def test_sync_markers(self):
+        self.assertIsNone(self.sync_state.get_marker(exp.AUDITS_SYNC_MARKER))
+        self.sync_state.set_marker(exp.AUDITS_SYNC_MARKER, '2017-03-01T00:00:00.000Z')
+        self.sync_state.set_marker(exp.AUDITS_SYNC_MARKER, '2017-03-02T00:00:00.000Z')
+        self.assertEqual(self.sync_state.get_marker(exp.AUDITS_SYNC_MARKER), '2017-03-02T00:00:00.000Z')
+        self.assertIsNone(self.sync_state.get_marker(exp.ACTIONS_SYNC_MARKER))
+
+
+class SyncExportsTestCase(unittest.TestCase):
+
+    def setUp(self):
+        state_dir = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, state_dir)
+        self.sync_state = exp.SyncState(os.path.join(state_dir, exp.SYNC_STATE_FILENAME))
+        self.addCleanup(self.sync_state.close)
+
+    def sync(self, audits, failing_audit_id=None, missing_audit_id=None, retry_failed=False):
+        settings = {exp.EXPORT_FORMATS: ['json'], exp.WORKERS: 4}
+        sc_client = MagicMock()
+        sc_client.iter_audits.return_value = iter(audits)
+        processed = []
+        lock = threading.Lock()
+
+        def process_audit(logger, settings, sc_client, audit, export_requests, media_downloader, sync_state, csv_sink,
+                          parquet_sink, sql_sink):
+            time.sleep(random.uniform(0, 0.01))
+            with lock:
+                processed.append(audit['audit_id'])
+            if audit['audit_id'] == missing_audit_id:
+                return False
+            for export_format in settings[exp.EXPORT_FORMATS]:
+                sync_state.start(audit['audit_id'], audit['modified_at'], export_format)
+                sync_state.finish(audit['audit_id'], export_format,
+                                  None if audit['audit_id'] == failing_audit_id else audit['audit_id'])
+            return True
+
+        with patch.object(exp, 'process_audit', side_effect=process_audit), \
+                patch.object(exp, 'get_sync_state', return_value=self.sync_state), \
+                patch.object(exp, 'update_sync_marker_file') as update_sync_marker_file:
+            if retry_failed:
+                exp.retry_failed_exports(MagicMock(), settings, sc_client)
+            else:
+                exp.sync_exports(MagicMock(), settings, sc_client)
+        return processed, [call[0][0] for call in update_sync_marker_file.call_args_list]
+
+    def test_audits_are_processed_concurrently_and_marker_moves_forward(self):
+        audits = make_audits(20)
+        processed, markers = self.sync(audits)
+        self.assertEqual(sorted(processed), sorted(audit['audit_id'] for audit in audits))
+        self.assertEqual(markers, sorted(markers))
+        self.assertEqual(markers[-1], audits[-1]['modified_at'])
+
+    def test_marker_stops_before_audit_that_could_not_be_downloaded(self):
+        audits = make_audits(20)
+        processed, markers = self.sync(audits, missing_audit_id='audit_5')
+        self.assertLess(len(processed), 20)
+        self.assertTrue(all(marker < audits[5]['modified_at'] for marker in markers))
+
+    def test_only_failed_exports_are_retried(self):
+        audits = make_audits(10)
+        self.sync(audits, failing_audit_id='audit_5')
+        self.assertEqual(self.sync_state.remaining(), [(audits[5], ['json'])])
+        processed, markers = self.sync([], retry_failed=True)
+        self.assertEqual((processed, markers), (['audit_5'], []))
+        self.assertEqual(self.sync_state.remaining(), [])
+
+
+class ProcessAuditTestCase(unittest.TestCase):
+
+    def process_audit(self, export_formats, filename_item_id=None):
+        audit = dict(make_audits(1)[0], template_id='template_1')
+        settings = {exp.EXPORT_FORMATS: export_formats, exp.PREFERENCES: {'template_1': 'preference_1'},
+                    exp.FILENAME_ITEM_ID: filename_item_id, exp.MEDIA_SYNC_OFFSET_IN_SECONDS: 0}
+        sc_client = MagicMock()
+        sc_client.get_audit.return_value = {'audit_id': audit['audit_id'], 'template_id': 'template_1',
+                                            'header_items': [], 'audit_data': {'name': 'Audit Title'}}
+        export_requests = {}
+        self.assertTrue(exp.process_audit(MagicMock(), settings, sc_client, audit, export_requests))
+        return sc_client.get_audit.call_count, export_requests
+
+    def test_audit_json_is_only_downloaded_when_needed(self):
+        self.assertEqual(self.process_audit(['pdf', 'docx', 'actions']), (0, {
+            sp.ExportRequest('audit_0', 'pdf', 'preference_1'): 'audit_0',
+            sp.ExportRequest('audit_0', 'docx', 'preference_1'): 'audit_0'}))
+        self.assertEqual(self.process_audit(['pdf'], exp.AUDIT_TITLE_ITEM_ID),
+                         (1, {sp.ExportRequest('audit_0', 'pdf', 'preference_1'): 'Audit Title'}))
+        with patch.object(exp, 'export_audit_web_report_link'):
+            self.assertEqual(self.process_audit(['pdf', 'web-report-link']),
+                             (1, {sp.ExportRequest('audit_0', 'pdf', 'preference_1'): 'audit_0'}))
+
+
+class ExportOfflineTestCase(unittest.TestCase):
+
+    def test_cached_audits_are_exported_without_duplicating_csv_rows(self):
+        export_path = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, export_path)
+        with open(os.path.join(os.path.dirname(__file__), 'csv_test_files', 'export_inactive_fields_true.json')) as f:
+            audit_json = json.load(f)
+        settings = {exp.EXPORT_FORMATS: ['json', 'csv', 'pdf'], exp.EXPORT_PATH: export_path,
+                    exp.FILENAME_ITEM_ID: None, exp.EXPORT_INACTIVE_ITEMS_TO_CSV: True}
+        with sp.AuditCache(os.path.join(export_path, exp.AUDIT_CACHE_FILENAME)) as audit_cache:
+            audit_cache.put(audit_json)
+            exp.export_offline(MagicMock(), settings, audit_cache)
+            csv_file_path = os.path.join(export_path, audit_json['template_id'] + '.csv')
+            with open(csv_file_path, 'rb') as csv_file:
+                first_export = csv_file.read()
+            exp.export_offline(MagicMock(), settings, audit_cache)
+        with open(csv_file_path, 'rb') as csv_file:
+            self.assertEqual(csv_file.read(), first_export)
+        self.assertTrue(os.path.isfile(os.path.join(export_path, audit_json['audit_id'] + '.json')))
+
+
+if __name__ == '__main__':
+    unittest.main()